@@ -0,0 +1,187 @@
+/**
+ * Model bundle fixture
+ *
+ * Written by ml/models/export-to-json.py (`build_bundle`) from two tiny
+ * LightGBM models: btts (binary, 2 trees, isotonic calibration table) and
+ * 1x2 (multiclass, 1 iteration). The markets share features in different
+ * orders. MODEL_JSON holds the same markets as standalone model.json exports.
+ */
+
+import type { LightGBMModel } from "../ml/lightgbm-inference";
+
+export const MODEL_BUNDLE_TEXT = "{\"format\":\"lgbm-bundle\",\"version\":1,\"features\":[\"homeFormScore\",\"awayFormScore\",\"h2h_overall_matches\",\"homeDaysSince\"],\"markets\":{\"btts\":{\"offset\":0,\"length\":807,\"metadata\":{\"market\":\"btts\",\"num_trees\":2,\"num_class\":1,\"objective\":\"binary sigmoid:1\"},\"features\":[0,1,2]},\"1x2\":{\"offset\":807,\"length\":1060,\"metadata\":{\"market\":\"1x2\",\"num_trees\":3,\"num_class\":3,\"objective\":\"multiclass num_class:3\"},\"features\":[3,1,0]}}}\n{\"tree_info\":[{\"tree_index\":0,\"shrinkage\":1,\"tree_structure\":{\"split_feature\":0,\"threshold\":-0.2824272679813794,\"default_left\":true,\"left_child\":{\"leaf_value\":-0.31855842765089576},\"right_child\":{\"split_feature\":1,\"threshold\":-0.3705319215505141,\"default_left\":true,\"left_child\":{\"leaf_value\":-0.2492887387953217},\"right_child\":{\"leaf_value\":-0.048018340788277686}}}},{\"tree_index\":1,\"shrinkage\":0.1,\"tree_structure\":{\"split_feature\":0,\"threshold\":-0.03315606985644645,\"default_left\":true,\"left_child\":{\"split_feature\":1,\"threshold\":0.6575163417574529,\"default_left\":true,\"left_child\":{\"leaf_value\":-0.12866839229724777},\"right_child\":{\"leaf_value\":0.10934169759279438}},\"right_child\":{\"leaf_value\":0.0916424247647335}}}],\"calibration\":{\"method\":\"isotonic\",\"tables\":[{\"x\":[0.2,0.5,0.8],\"y\":[0.1,0.5,0.9]}]}}{\"tree_info\":[{\"tree_index\":0,\"shrinkage\":1,\"tree_structure\":{\"split_feature\":2,\"threshold\":0.5088980345684155,\"default_left\":true,\"left_child\":{\"split_feature\":1,\"threshold\":-0.8591737812102352,\"default_left\":true,\"left_child\":{\"leaf_value\":-0.906272214298269},\"right_child\":{\"leaf_value\":-1.1032791286913874}},\"right_child\":{\"leaf_value\":-0.8793793386869901}}},{\"tree_index\":1,\"shrinkage\":1,\"tree_structure\":{\"split_feature\":2,\"threshold\":0.8933331249677267,\"default_left\":true,\"left_child\":{\"split_feature\":1,\"threshold\":0.9491118533800075,\"default_left\":true,\"left_child\":{\"leaf_value\":-1.2781921179151738},\"right_child\":{\"leaf_value\":-1.38813019750103}},\"right_child\":{\"leaf_value\":-1.3946175624274757}}},{\"tree_index\":2,\"shrinkage\":1,\"tree_structure\":{\"split_feature\":1,\"threshold\":0.23388969098934054,\"default_left\":true,\"left_child\":{\"split_feature\":2,\"threshold\":-0.8081859573787478,\"default_left\":true,\"left_child\":{\"leaf_value\":-0.906692702075448},\"right_child\":{\"leaf_value\":-1.100726190232963}},\"right_child\":{\"leaf_value\":-0.8978463594350428}}}]}";
+
+export const MODEL_JSON: Record<string, LightGBMModel> = {
+	"btts": {
+		"metadata": {
+			"market": "btts",
+			"num_trees": 2,
+			"num_class": 1,
+			"feature_names": [
+				"homeFormScore",
+				"awayFormScore",
+				"h2h_overall_matches"
+			],
+			"objective": "binary sigmoid:1"
+		},
+		"tree_info": [
+			{
+				"tree_index": 0,
+				"shrinkage": 1,
+				"tree_structure": {
+					"split_feature": 0,
+					"threshold": -0.2824272679813794,
+					"default_left": true,
+					"left_child": {
+						"leaf_value": -0.31855842765089576
+					},
+					"right_child": {
+						"split_feature": 1,
+						"threshold": -0.3705319215505141,
+						"default_left": true,
+						"left_child": {
+							"leaf_value": -0.2492887387953217
+						},
+						"right_child": {
+							"leaf_value": -0.048018340788277686
+						}
+					}
+				}
+			},
+			{
+				"tree_index": 1,
+				"shrinkage": 0.1,
+				"tree_structure": {
+					"split_feature": 0,
+					"threshold": -0.03315606985644645,
+					"default_left": true,
+					"left_child": {
+						"split_feature": 1,
+						"threshold": 0.6575163417574529,
+						"default_left": true,
+						"left_child": {
+							"leaf_value": -0.12866839229724777
+						},
+						"right_child": {
+							"leaf_value": 0.10934169759279438
+						}
+					},
+					"right_child": {
+						"leaf_value": 0.0916424247647335
+					}
+				}
+			}
+		],
+		"feature_names": [
+			"homeFormScore",
+			"awayFormScore",
+			"h2h_overall_matches"
+		],
+		"calibration": {
+			"method": "isotonic",
+			"tables": [
+				{
+					"x": [
+						0.2,
+						0.5,
+						0.8
+					],
+					"y": [
+						0.1,
+						0.5,
+						0.9
+					]
+				}
+			]
+		}
+	},
+	"1x2": {
+		"metadata": {
+			"market": "1x2",
+			"num_trees": 3,
+			"num_class": 3,
+			"feature_names": [
+				"homeDaysSince",
+				"awayFormScore",
+				"homeFormScore"
+			],
+			"objective": "multiclass num_class:3"
+		},
+		"tree_info": [
+			{
+				"tree_index": 0,
+				"shrinkage": 1,
+				"tree_structure": {
+					"split_feature": 2,
+					"threshold": 0.5088980345684155,
+					"default_left": true,
+					"left_child": {
+						"split_feature": 1,
+						"threshold": -0.8591737812102352,
+						"default_left": true,
+						"left_child": {
+							"leaf_value": -0.906272214298269
+						},
+						"right_child": {
+							"leaf_value": -1.1032791286913874
+						}
+					},
+					"right_child": {
+						"leaf_value": -0.8793793386869901
+					}
+				}
+			},
+			{
+				"tree_index": 1,
+				"shrinkage": 1,
+				"tree_structure": {
+					"split_feature": 2,
+					"threshold": 0.8933331249677267,
+					"default_left": true,
+					"left_child": {
+						"split_feature": 1,
+						"threshold": 0.9491118533800075,
+						"default_left": true,
+						"left_child": {
+							"leaf_value": -1.2781921179151738
+						},
+						"right_child": {
+							"leaf_value": -1.38813019750103
+						}
+					},
+					"right_child": {
+						"leaf_value": -1.3946175624274757
+					}
+				}
+			},
+			{
+				"tree_index": 2,
+				"shrinkage": 1,
+				"tree_structure": {
+					"split_feature": 1,
+					"threshold": 0.23388969098934054,
+					"default_left": true,
+					"left_child": {
+						"split_feature": 2,
+						"threshold": -0.8081859573787478,
+						"default_left": true,
+						"left_child": {
+							"leaf_value": -0.906692702075448
+						},
+						"right_child": {
+							"leaf_value": -1.100726190232963
+						}
+					},
+					"right_child": {
+						"leaf_value": -0.8978463594350428
+					}
+				}
+			}
+		],
+		"feature_names": [
+			"homeDaysSince",
+			"awayFormScore",
+			"homeFormScore"
+		]
+	}
+};
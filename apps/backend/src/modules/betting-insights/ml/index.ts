@@ -31,9 +31,26 @@ export {
 export {
 	predictBinary,
 	predictMulticlass,
+	applyCalibrationTable,
 	createFeatureArray,
 	validateFeatures,
+	type CalibrationTable,
+	type ModelCalibration,
 	type LightGBMModel,
 	type BinaryPrediction,
 	type MulticlassPrediction,
 } from "./lightgbm-inference";
+
+export {
+	openModelBundle,
+	type BundleHeader,
+	type BundleMarketEntry,
+	type ModelBundle,
+} from "./model-bundle";
+
+export {
+	indexPredictionTable,
+	lookupPrediction,
+	type PredictionTable,
+	type PredictionTableIndex,
+} from "./prediction-table";
@@ -0,0 +1,145 @@
+/**
+ * Tests for lightgbm-inference.ts
+ *
+ * Calibration lookup tables: endpoints, clamping, binary search and
+ * interpolation, and how binary/multiclass predictions apply them.
+ */
+
+import { describe, expect, it } from "vitest";
+import {
+	applyCalibrationTable,
+	predictBinary,
+	predictMulticlass,
+	type CalibrationTable,
+	type LightGBMModel,
+} from "./lightgbm-inference";
+
+const TABLE: CalibrationTable = {
+	x: [0.1, 0.3, 0.6, 0.9],
+	y: [0.05, 0.2, 0.7, 0.95],
+};
+
+// Single-leaf trees: raw scores are the leaf values themselves
+function constantModel(
+	leafValues: number[],
+	calibration?: LightGBMModel["calibration"],
+): LightGBMModel {
+	return {
+		metadata: {
+			market: "test",
+			num_trees: leafValues.length,
+			num_class: leafValues.length,
+			feature_names: [],
+			objective: leafValues.length > 1 ? "multiclass" : "binary",
+		},
+		tree_info: leafValues.map((value, idx) => ({
+			tree_index: idx,
+			shrinkage: 1,
+			tree_structure: { leaf_value: value },
+		})),
+		feature_names: [],
+		calibration,
+	};
+}
+
+describe("applyCalibrationTable", () => {
+	describe("endpoints and clamping", () => {
+		it("should return the first y at the first knot", () => {
+			expect(applyCalibrationTable(TABLE, 0.1)).toBe(0.05);
+		});
+
+		it("should return the last y at the last knot", () => {
+			expect(applyCalibrationTable(TABLE, 0.9)).toBe(0.95);
+		});
+
+		it("should clamp probabilities below the table", () => {
+			expect(applyCalibrationTable(TABLE, 0)).toBe(0.05);
+			expect(applyCalibrationTable(TABLE, 0.0999)).toBe(0.05);
+		});
+
+		it("should clamp probabilities above the table", () => {
+			expect(applyCalibrationTable(TABLE, 1)).toBe(0.95);
+			expect(applyCalibrationTable(TABLE, 0.95)).toBe(0.95);
+		});
+
+		it("should return the probability unchanged for an empty table", () => {
+			expect(applyCalibrationTable({ x: [], y: [] }, 0.42)).toBe(0.42);
+		});
+
+		it("should map everything to y for a single-knot table", () => {
+			const single = { x: [0.5], y: [0.4] };
+
+			expect(applyCalibrationTable(single, 0.2)).toBe(0.4);
+			expect(applyCalibrationTable(single, 0.5)).toBe(0.4);
+			expect(applyCalibrationTable(single, 0.8)).toBe(0.4);
+		});
+	});
+
+	describe("interpolation", () => {
+		it("should hit interior knots exactly", () => {
+			expect(applyCalibrationTable(TABLE, 0.3)).toBeCloseTo(0.2, 12);
+			expect(applyCalibrationTable(TABLE, 0.6)).toBeCloseTo(0.7, 12);
+		});
+
+		it("should interpolate linearly inside each segment", () => {
+			// Same values as np.interp(p, x, y)
+			expect(applyCalibrationTable(TABLE, 0.2)).toBeCloseTo(0.125, 12);
+			expect(applyCalibrationTable(TABLE, 0.45)).toBeCloseTo(0.45, 12);
+			expect(applyCalibrationTable(TABLE, 0.75)).toBeCloseTo(0.825, 12);
+		});
+
+		it("should find the right segment in a long table", () => {
+			const x = Array.from({ length: 64 }, (_, i) => i / 63);
+			const y = x.map((value) => value * value);
+
+			for (const p of [0.013, 0.25, 0.5, 0.777, 0.999]) {
+				const hi = x.findIndex((value) => value > p);
+				const t = (p - x[hi - 1]) / (x[hi] - x[hi - 1]);
+				const expected = y[hi - 1] + t * (y[hi] - y[hi - 1]);
+				expect(applyCalibrationTable({ x, y }, p)).toBeCloseTo(expected, 12);
+			}
+		});
+
+		it("should keep step tables (repeated y) flat", () => {
+			const step = { x: [0.1, 0.4, 0.41, 0.9], y: [0.2, 0.2, 0.6, 0.6] };
+
+			expect(applyCalibrationTable(step, 0.3)).toBeCloseTo(0.2, 12);
+			expect(applyCalibrationTable(step, 0.7)).toBeCloseTo(0.6, 12);
+		});
+	});
+});
+
+describe("calibrated predictions", () => {
+	it("should leave binary output raw without a calibration block", () => {
+		const result = predictBinary(constantModel([0]), []);
+
+		expect(result.probability).toBeCloseTo(0.5, 12);
+	});
+
+	it("should map binary output through the first table", () => {
+		const result = predictBinary(
+			constantModel([0], { method: "isotonic", tables: [TABLE] }),
+			[],
+		);
+
+		// sigmoid(0) = 0.5 -> between knots 0.3 and 0.6
+		expect(result.probability).toBeCloseTo(0.2 + (0.2 / 0.3) * 0.5, 12);
+	});
+
+	it("should calibrate each class and renormalize multiclass output", () => {
+		const identity = { x: [0, 1], y: [0, 1] };
+		const doubled = { x: [0, 1], y: [0, 2] };
+		const result = predictMulticlass(
+			constantModel([0, 0, 0], {
+				method: "isotonic",
+				tables: [doubled, identity, identity],
+			}),
+			[],
+		);
+
+		// Softmax gives 1/3 each; home doubles to 2/3, then rows sum to 1
+		expect(result.home).toBeCloseTo(0.5, 12);
+		expect(result.draw).toBeCloseTo(0.25, 12);
+		expect(result.away).toBeCloseTo(0.25, 12);
+	});
+});
@@ -8,6 +8,7 @@
  * Supports:
  * - Binary classification (sigmoid output)
  * - Multiclass classification (softmax output)
+ * - Optional post-hoc calibration via piecewise-linear lookup tables
  */
 
 // ============================================================================
@@ -54,6 +55,27 @@ export interface ModelMetadata {
 	objective: string;
 }
 
+/**
+ * Piecewise-linear calibration table (x strictly increasing)
+ *
+ * Fitted offline by ml/models/fit-calibration.py. Isotonic, Platt and
+ * temperature calibrators are all exported in this form.
+ */
+export interface CalibrationTable {
+	x: number[];
+	y: number[];
+}
+
+/**
+ * Calibration block embedded in model.json
+ *
+ * Binary models carry one table; multiclass models one table per class.
+ */
+export interface ModelCalibration {
+	method: string;
+	tables: CalibrationTable[];
+}
+
 /**
  * Complete exported model structure
  */
@@ -61,6 +83,7 @@ export interface LightGBMModel {
 	metadata: ModelMetadata;
 	tree_info: TreeInfo[];
 	feature_names: string[];
+	calibration?: ModelCalibration;
 }
 
 /**
@@ -165,6 +188,56 @@ function softmax(scores: number[]): number[] {
 	return expScores.map((e) => e / sumExp);
 }
 
+// ============================================================================
+// CALIBRATION
+// ============================================================================
+
+/**
+ * Map a raw probability through a calibration table
+ *
+ * Binary search for the enclosing segment, then linear interpolation.
+ * Values outside the table are clamped to the first/last y (same as np.interp).
+ */
+export function applyCalibrationTable(
+	table: CalibrationTable,
+	probability: number,
+): number {
+	const { x, y } = table;
+	const last = x.length - 1;
+	if (last < 0) return probability;
+	if (probability <= x[0]) return y[0];
+	if (probability >= x[last]) return y[last];
+
+	let lo = 0;
+	let hi = last;
+	while (hi - lo > 1) {
+		const mid = (lo + hi) >> 1;
+		if (x[mid] <= probability) {
+			lo = mid;
+		} else {
+			hi = mid;
+		}
+	}
+
+	const t = (probability - x[lo]) / (x[hi] - x[lo]);
+	return y[lo] + t * (y[hi] - y[lo]);
+}
+
+/**
+ * Calibrate multiclass probabilities (one table per class) and renormalize
+ */
+function calibrateMulticlass(
+	calibration: ModelCalibration,
+	probs: number[],
+): number[] {
+	const mapped = probs.map((p, idx) => {
+		const table = calibration.tables[idx];
+		return table ? applyCalibrationTable(table, p) : p;
+	});
+	const sum = mapped.reduce((a, b) => a + b, 0);
+	return sum > 0 ? mapped.map((p) => p / sum) : probs;
+}
+
 // ============================================================================
 // PUBLIC INFERENCE FUNCTIONS
 // ============================================================================
@@ -174,14 +247,16 @@ function softmax(scores: number[]): number[] {
  *
  * @param model - The LightGBM model
  * @param features - Feature values array (ordered by feature_names)
- * @returns Probability of positive class
+ * @returns Probability of positive class (calibrated when the model has a table)
  */
 export function predictBinary(
 	model: LightGBMModel,
 	features: number[],
 ): BinaryPrediction {
 	const scores = computeRawScores(model, features);
-	const probability = sigmoid(scores[0]);
+	const raw = sigmoid(scores[0]);
+	const table = model.calibration?.tables[0];
+	const probability = table ? applyCalibrationTable(table, raw) : raw;
 
 	return { probability };
 }
@@ -191,14 +266,17 @@ export function predictBinary(
  *
  * @param model - The LightGBM model
  * @param features - Feature values array (ordered by feature_names)
- * @returns Probabilities for home, draw, away
+ * @returns Probabilities for home, draw, away (calibrated when the model has tables)
  */
 export function predictMulticlass(
 	model: LightGBMModel,
 	features: number[],
 ): MulticlassPrediction {
 	const scores = computeRawScores(model, features);
-	const probs = softmax(scores);
+	const raw = softmax(scores);
+	const probs = model.calibration
+		? calibrateMulticlass(model.calibration, raw)
+		: raw;
 
 	// LightGBM multiclass order: HOME=0, DRAW=1, AWAY=2
 	return {
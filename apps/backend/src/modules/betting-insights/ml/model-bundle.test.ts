@@ -0,0 +1,154 @@
+/**
+ * Tests for model-bundle.ts
+ *
+ * Bundle round-trip against the export-to-json.py fixture: header-only
+ * opening, offset slicing per market, shared feature indices, lazy caching
+ * and predictions matching LightGBM.
+ */
+
+import { describe, expect, it } from "vitest";
+import {
+	MODEL_BUNDLE_TEXT,
+	MODEL_JSON,
+} from "../__fixtures__/model-bundle";
+import {
+	createFeatureArray,
+	predictBinary,
+	predictMulticlass,
+} from "./lightgbm-inference";
+import { BUNDLE_FORMAT, BUNDLE_VERSION, openModelBundle } from "./model-bundle";
+
+// Rows scored with LightGBM predict_proba when the fixture was written
+const ROW_A = {
+	homeFormScore: 0.0012301533574825742,
+	awayFormScore: 0.17533484346507067,
+	h2h_overall_matches: 2,
+	homeDaysSince: 4,
+};
+const ROW_B = {
+	homeFormScore: -0.2741378553622176,
+	awayFormScore: -0.3770744504010968,
+	h2h_overall_matches: 1,
+	homeDaysSince: 2,
+};
+
+describe("openModelBundle", () => {
+	describe("header", () => {
+		it("should parse the header without decoding any market", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+
+			expect(bundle.header.format).toBe(BUNDLE_FORMAT);
+			expect(bundle.header.version).toBe(BUNDLE_VERSION);
+			expect(bundle.markets()).toEqual(["btts", "1x2"]);
+			expect(bundle.isLoaded("btts")).toBe(false);
+			expect(bundle.isLoaded("1x2")).toBe(false);
+		});
+
+		it("should store each shared feature name once", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+
+			expect(bundle.header.features).toEqual([
+				"homeFormScore",
+				"awayFormScore",
+				"h2h_overall_matches",
+				"homeDaysSince",
+			]);
+		});
+
+		it("should lay out market sections back to back", () => {
+			const { markets } = openModelBundle(MODEL_BUNDLE_TEXT).header;
+			const body = MODEL_BUNDLE_TEXT.slice(MODEL_BUNDLE_TEXT.indexOf("\n") + 1);
+
+			expect(markets.btts.offset).toBe(0);
+			expect(markets["1x2"].offset).toBe(markets.btts.length);
+			expect(markets["1x2"].offset + markets["1x2"].length).toBe(body.length);
+		});
+
+		it("should reject text without a header line", () => {
+			expect(() => openModelBundle('{"format":"lgbm-bundle"}')).toThrow(
+				"missing header line",
+			);
+		});
+
+		it("should reject an unknown format or version", () => {
+			const header = JSON.stringify({
+				format: BUNDLE_FORMAT,
+				version: BUNDLE_VERSION + 1,
+				features: [],
+				markets: {},
+			});
+
+			expect(() => openModelBundle(`${header}\n`)).toThrow(
+				"Unsupported model bundle",
+			);
+		});
+	});
+
+	describe("getModel", () => {
+		it("should decode each market to its standalone model.json", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+
+			expect(bundle.getModel("btts")).toEqual(MODEL_JSON.btts);
+			expect(bundle.getModel("1x2")).toEqual(MODEL_JSON["1x2"]);
+		});
+
+		it("should map feature indices back to each market's own order", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+			const model = bundle.getModel("1x2");
+
+			expect(model.feature_names).toEqual([
+				"homeDaysSince",
+				"awayFormScore",
+				"homeFormScore",
+			]);
+			expect(model.metadata.feature_names).toEqual(model.feature_names);
+		});
+
+		it("should only attach calibration to calibrated markets", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+
+			expect(bundle.getModel("btts").calibration?.method).toBe("isotonic");
+			expect(bundle.getModel("1x2").calibration).toBeUndefined();
+		});
+
+		it("should decode a market once and cache it", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+			const first = bundle.getModel("1x2");
+
+			expect(bundle.isLoaded("1x2")).toBe(true);
+			expect(bundle.isLoaded("btts")).toBe(false);
+			expect(bundle.getModel("1x2")).toBe(first);
+		});
+
+		it("should throw for a market missing from the bundle", () => {
+			const bundle = openModelBundle(MODEL_BUNDLE_TEXT);
+
+			expect(() => bundle.getModel("ou_2_5")).toThrow(
+				"Model not found in bundle: ou_2_5",
+			);
+		});
+	});
+
+	describe("predictions", () => {
+		it("should reproduce LightGBM multiclass probabilities", () => {
+			const model = openModelBundle(MODEL_BUNDLE_TEXT).getModel("1x2");
+			const result = predictMulticlass(model, createFeatureArray(model, ROW_A));
+
+			expect(result.home).toBeCloseTo(0.35185420374335274, 10);
+			expect(result.draw).toBeCloseTo(0.29539218280447355, 10);
+			expect(result.away).toBeCloseTo(0.3527536134521737, 10);
+		});
+
+		it("should apply the embedded calibration table to binary output", () => {
+			const model = openModelBundle(MODEL_BUNDLE_TEXT).getModel("btts");
+
+			// Raw LightGBM: 0.51090429 and 0.40661971, mapped through the table
+			expect(
+				predictBinary(model, createFeatureArray(model, ROW_A)).probability,
+			).toBeCloseTo(0.5145390556731554, 10);
+			expect(
+				predictBinary(model, createFeatureArray(model, ROW_B)).probability,
+			).toBeCloseTo(0.3754929420547496, 10);
+		});
+	});
+});
@@ -0,0 +1,128 @@
+/**
+ * Multi-Market Model Bundle
+ *
+ * Reads the single-file bundle written by `export-to-json.py --bundle`.
+ * Layout: one header line of JSON, then every market section concatenated.
+ * The header holds a shared feature dictionary and, per market, metadata,
+ * feature indices and the section's offset/length in the body.
+ *
+ * Opening a bundle parses only the header; a market's trees are decoded the
+ * first time that market is requested and cached afterwards, so cold start
+ * pays only for the markets a request actually uses.
+ *
+ * Use a `.txt` file name so wrangler's default Text rule imports it as a string.
+ */
+
+import type {
+	LightGBMModel,
+	ModelCalibration,
+	ModelMetadata,
+	TreeInfo,
+} from "./lightgbm-inference";
+
+// ============================================================================
+// TYPES
+// ============================================================================
+
+export const BUNDLE_FORMAT = "lgbm-bundle";
+export const BUNDLE_VERSION = 1;
+
+/**
+ * Index entry for one market in the bundle header
+ */
+export interface BundleMarketEntry {
+	offset: number; // Section start, relative to the body
+	length: number; // Section length in characters (bundle is ASCII)
+	metadata: Omit<ModelMetadata, "feature_names">;
+	features: number[]; // Indices into BundleHeader.features
+}
+
+/**
+ * Bundle header (first line of the bundle)
+ */
+export interface BundleHeader {
+	format: string;
+	version: number;
+	features: string[];
+	markets: Record<string, BundleMarketEntry>;
+}
+
+/**
+ * Per-market section body
+ */
+interface BundleSection {
+	tree_info: TreeInfo[];
+	calibration?: ModelCalibration;
+}
+
+export interface ModelBundle {
+	header: BundleHeader;
+	/** Markets available in the bundle */
+	markets(): string[];
+	/** Whether a market has been decoded yet */
+	isLoaded(market: string): boolean;
+	/** Decode (once) and return a market's model */
+	getModel(market: string): LightGBMModel;
+}
+
+// ============================================================================
+// LOADING
+// ============================================================================
+
+/**
+ * Open a bundle by parsing its header only
+ *
+ * @param text - Full bundle contents
+ * @returns Bundle with lazily decoded markets
+ */
+export function openModelBundle(text: string): ModelBundle {
+	const headerEnd = text.indexOf("\n");
+	if (headerEnd < 0) {
+		throw new Error("Invalid model bundle: missing header line");
+	}
+
+	const header = JSON.parse(text.slice(0, headerEnd)) as BundleHeader;
+	if (header.format !== BUNDLE_FORMAT || header.version !== BUNDLE_VERSION) {
+		throw new Error(
+			`Unsupported model bundle: ${header.format} v${header.version}`,
+		);
+	}
+
+	const bodyStart = headerEnd + 1;
+	const cache = new Map<string, LightGBMModel>();
+
+	function getModel(market: string): LightGBMModel {
+		const cached = cache.get(market);
+		if (cached) return cached;
+
+		const entry = header.markets[market];
+		if (!entry) {
+			throw new Error(`Model not found in bundle: ${market}`);
+		}
+
+		const start = bodyStart + entry.offset;
+		const section = JSON.parse(
+			text.slice(start, start + entry.length),
+		) as BundleSection;
+		const featureNames = entry.features.map((idx) => header.features[idx]);
+
+		const model: LightGBMModel = {
+			metadata: { ...entry.metadata, feature_names: featureNames },
+			tree_info: section.tree_info,
+			feature_names: featureNames,
+		};
+		if (section.calibration) {
+			model.calibration = section.calibration;
+		}
+
+		cache.set(market, model);
+		return model;
+	}
+
+	return {
+		header,
+		markets: () => Object.keys(header.markets),
+		isLoaded: (market) => cache.has(market),
+		getModel,
+	};
+}
@@ -0,0 +1,98 @@
+/**
+ * Tests for prediction-table.ts
+ *
+ * Slot indexing from the table layout and the fallbacks to tree evaluation
+ * (unknown fixture or market, model version mismatch).
+ */
+
+import { describe, expect, it } from "vitest";
+import {
+	indexPredictionTable,
+	lookupPrediction,
+	type PredictionTable,
+} from "./prediction-table";
+
+// Same shape as score-fixtures.py output
+const TABLE: PredictionTable = {
+	version: "combined-hash",
+	generated_at: "2026-01-01T00:00:00+00:00",
+	models: {
+		"1x2": "hash-1x2",
+		btts: "hash-btts",
+		total_goals: "hash-goals",
+	},
+	layout: [
+		{ market: "1x2", type: "multiclass", width: 3 },
+		{ market: "btts", type: "binary", width: 1 },
+		{ market: "total_goals", type: "regression", width: 1 },
+	],
+	fixtures: {
+		"101": [0.5, 0.3, 0.2, 0.61, 2.7],
+		"102": [0.2, 0.25, 0.55, 0.44, 3.1],
+	},
+};
+
+describe("indexPredictionTable", () => {
+	it("should assign consecutive slots in layout order", () => {
+		const index = indexPredictionTable(TABLE);
+
+		expect(index.slots.get("1x2")).toEqual([0, 3]);
+		expect(index.slots.get("btts")).toEqual([3, 1]);
+		expect(index.slots.get("total_goals")).toEqual([4, 1]);
+	});
+
+	it("should index an empty layout", () => {
+		const index = indexPredictionTable({ ...TABLE, layout: [], fixtures: {} });
+
+		expect(index.slots.size).toBe(0);
+	});
+});
+
+describe("lookupPrediction", () => {
+	const index = indexPredictionTable(TABLE);
+
+	describe("slot indexing", () => {
+		it("should return all class probabilities of a multiclass market", () => {
+			expect(lookupPrediction(index, 101, "1x2")).toEqual([0.5, 0.3, 0.2]);
+		});
+
+		it("should return single values for binary and regression markets", () => {
+			expect(lookupPrediction(index, 101, "btts")).toEqual([0.61]);
+			expect(lookupPrediction(index, 102, "total_goals")).toEqual([3.1]);
+		});
+
+		it("should accept string and numeric fixture ids", () => {
+			expect(lookupPrediction(index, "102", "1x2")).toEqual(
+				lookupPrediction(index, 102, "1x2"),
+			);
+		});
+
+		it("should not expose the stored row", () => {
+			lookupPrediction(index, 101, "1x2")?.fill(0);
+
+			expect(lookupPrediction(index, 101, "1x2")).toEqual([0.5, 0.3, 0.2]);
+		});
+	});
+
+	describe("fallbacks", () => {
+		it("should return undefined for a fixture missing from the table", () => {
+			expect(lookupPrediction(index, 999, "btts")).toBeUndefined();
+		});
+
+		it("should return undefined for a market missing from the layout", () => {
+			expect(lookupPrediction(index, 101, "ou_2_5")).toBeUndefined();
+		});
+
+		it("should return undefined when the model version differs", () => {
+			expect(lookupPrediction(index, 101, "btts", "stale-hash")).toBeUndefined();
+		});
+
+		it("should return values when the model version matches", () => {
+			expect(lookupPrediction(index, 101, "btts", "hash-btts")).toEqual([0.61]);
+		});
+
+		it("should return undefined for a version check on an unscored market", () => {
+			expect(lookupPrediction(index, 101, "ou_2_5", "hash-btts")).toBeUndefined();
+		});
+	});
+});
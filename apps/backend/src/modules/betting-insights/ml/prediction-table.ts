@@ -0,0 +1,81 @@
+/**
+ * Precomputed Prediction Table
+ *
+ * Lookup for the table written by ml/models/score-fixtures.py: per-fixture
+ * probabilities for every exported market, scored offline in one batch.
+ * Serving a fixture from the table avoids tree evaluation entirely; callers
+ * fall back to the LightGBM runtime when a fixture is missing or the table
+ * was scored with different models (version mismatch).
+ */
+
+// ============================================================================
+// TYPES
+// ============================================================================
+
+export interface PredictionTableLayoutEntry {
+	market: string;
+	type: "binary" | "multiclass" | "regression";
+	width: number; // Values per fixture for this market (3 for 1X2)
+}
+
+/**
+ * Table as written by score-fixtures.py
+ */
+export interface PredictionTable {
+	version: string;
+	generated_at: string;
+	models: Record<string, string>; // market -> model.json hash
+	layout: PredictionTableLayoutEntry[];
+	fixtures: Record<string, number[]>;
+}
+
+export interface PredictionTableIndex {
+	table: PredictionTable;
+	/** market -> [start, width] in each fixture row */
+	slots: Map<string, [number, number]>;
+}
+
+// ============================================================================
+// LOOKUP
+// ============================================================================
+
+/**
+ * Precompute the per-market slot offsets for a table
+ */
+export function indexPredictionTable(table: PredictionTable): PredictionTableIndex {
+	const slots = new Map<string, [number, number]>();
+	let start = 0;
+	for (const entry of table.layout) {
+		slots.set(entry.market, [start, entry.width]);
+		start += entry.width;
+	}
+	return { table, slots };
+}
+
+/**
+ * Get precomputed values for one fixture and market
+ *
+ * @param index - Indexed prediction table
+ * @param fixtureId - Fixture id used when the table was scored
+ * @param market - Market key (e.g. "1x2", "btts", "ou_2_5")
+ * @param modelVersion - Optional model.json hash the caller expects
+ * @returns Values (probabilities, or the prediction for regression markets),
+ *          or undefined when the caller should evaluate the trees instead
+ */
+export function lookupPrediction(
+	index: PredictionTableIndex,
+	fixtureId: number | string,
+	market: string,
+	modelVersion?: string,
+): number[] | undefined {
+	if (modelVersion !== undefined && index.table.models[market] !== modelVersion) {
+		return undefined;
+	}
+	const slot = index.slots.get(market);
+	const row = index.table.fixtures[String(fixtureId)];
+	if (!slot || !row) {
+		return undefined;
+	}
+	const [start, width] = slot;
+	return row.slice(start, start + width);
+}
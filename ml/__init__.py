@@ -0,0 +1 @@
+"""Python ML pipeline (see cli.py for the `python -m ml` entry point)."""
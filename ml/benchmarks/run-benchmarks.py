@@ -0,0 +1,424 @@
+"""
+Reproducible performance benchmarks for the Python ML pipeline.
+
+Runs the pipeline's hot paths on seeded synthetic data (see synthetic_data.py)
+and saves timings to `ml/benchmarks/results/<scale>/` so runs can be compared
+across commits.
+
+Benchmarks:
+- create_targets    full create-targets run (stage breakdown incl. H2H)
+- prepare_features  train-markets feature preparation on the targets table
+- optuna_trial      one Optuna objective call (btts, fixed parameters)
+- export_model      export-to-json export_model + JSON serialisation
+- offline_metrics   evaluate-offline brier/logloss (binary + multiclass)
+- cli_startup       `python -m ml <command> --help` per command (import cost)
+
+Usage:
+    python ml/benchmarks/run-benchmarks.py --scale 10k
+    python ml/benchmarks/run-benchmarks.py --scale 100k --only create_targets --workers 4
+    python ml/benchmarks/run-benchmarks.py --compare results/10k/a.json results/10k/b.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ML_DIR / "models"))
+sys.path.insert(0, str(ML_DIR / "targets"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from instrumentation import run_report, span  # noqa: E402
+from synthetic_data import SCALES, parse_scale, register_leagues, write_dataset  # noqa: E402
+
+
+BENCHMARKS = [
+    "create_targets",
+    "prepare_features",
+    "optuna_trial",
+    "export_model",
+    "offline_metrics",
+    "cli_startup",
+]
+
+TRIAL_PARAMS = {
+    "learning_rate": 0.05,
+    "num_leaves": 31,
+    "min_child_samples": 20,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "reg_alpha": 0.1,
+    "reg_lambda": 0.1,
+}
+
+
+def load_script(relative: str, name: str):
+    """Import a hyphenated pipeline script as a module."""
+    spec = importlib.util.spec_from_file_location(name, ML_DIR / relative)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_revision() -> tuple[str, bool]:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ML_DIR,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--", "."],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=ML_DIR,
+            ).stdout.strip()
+        )
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def library_versions() -> dict[str, str]:
+    versions = {}
+    for package in ["numpy", "pandas", "lightgbm", "optuna", "scikit-learn", "joblib"]:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = "missing"
+    return versions
+
+
+class Context:
+    """Lazily built inputs shared by the benchmarks of one run."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.matches = parse_scale(args.scale)
+        self.data_dir = Path(args.data_dir) / f"{args.scale}-seed{args.seed}"
+        self.paths = {
+            "raw": self.data_dir / "raw.csv",
+            "features": self.data_dir / "features.csv",
+            "team_map": self.data_dir / "team-map.json",
+            "leagues": self.data_dir / "leagues.json",
+        }
+        self.targets_path = self.data_dir / "training_with_targets.csv"
+        self.work_dir = Path(tempfile.mkdtemp(prefix="ml-bench-"))
+        self._targets: pd.DataFrame | None = None
+        self._split = None
+
+        self.create_targets = load_script("targets/create-targets.py", "create_targets")
+        self.train_markets = load_script("models/train-markets.py", "train_markets")
+        self.export_to_json = load_script("models/export-to-json.py", "export_to_json")
+        self.evaluate_offline = load_script(
+            "models/evaluate-offline.py", "evaluate_offline"
+        )
+        self.train_markets.add_range_markets()
+
+    def ensure_data(self) -> float:
+        start = time.perf_counter()
+        if not (self.paths["raw"].exists() and self.paths["features"].exists()):
+            write_dataset(self.data_dir, self.matches, self.args.seed)
+        elapsed = time.perf_counter() - start
+        register_leagues(
+            self.create_targets, json.loads(self.paths["leagues"].read_text())
+        )
+        with self.paths["raw"].open() as handle:
+            self.raw_rows = sum(1 for _ in handle) - 1
+        return elapsed
+
+    def targets_args(self) -> argparse.Namespace:
+        # create-targets' own parser, so new options come with their defaults.
+        return self.create_targets.parse_args(
+            [
+                "--features", str(self.paths["features"]),
+                "--raw", str(self.paths["raw"]),
+                "--team-map", str(self.paths["team_map"]),
+                "--out", str(self.targets_path),
+                "--workers", str(self.args.workers),
+            ]
+        )
+
+    def targets(self) -> pd.DataFrame:
+        if self._targets is None:
+            if not self.targets_path.exists():
+                self.create_targets.create_targets(self.targets_args())
+            self._targets = pd.read_csv(self.targets_path)
+        return self._targets
+
+    def target_columns(self) -> set[str]:
+        return {config["target"] for config in self.train_markets.MARKETS.values()}
+
+    def split(self):
+        """btts train/val/test matrices using the last three seasons as val/test."""
+        if self._split is None:
+            tm = self.train_markets
+            df = self.targets()
+            seasons = sorted(df["season"].unique())
+            train_end, val, test_start = seasons[-3], seasons[-2], seasons[-1]
+            train, val_df, test = tm.split_by_season(df, train_end, val, test_start)
+            columns = self.target_columns()
+            self._split = (
+                tm.prepare_features(train, columns),
+                train["btts_yes"],
+                tm.prepare_features(val_df, columns),
+                val_df["btts_yes"],
+                test,
+            )
+        return self._split
+
+
+def bench_create_targets(ctx: Context) -> int:
+    ctx.create_targets.create_targets(ctx.targets_args())
+    ctx._targets = None
+    return ctx.raw_rows
+
+
+def bench_prepare_features(ctx: Context) -> int:
+    df = ctx.targets()
+    ctx.train_markets.prepare_features(df, ctx.target_columns())
+    return len(df)
+
+
+def bench_optuna_trial(ctx: Context) -> int:
+    import optuna
+
+    X_train, y_train, X_val, y_val, _ = ctx.split()
+    ctx.train_markets.objective(
+        optuna.trial.FixedTrial(TRIAL_PARAMS), X_train, y_train, X_val, y_val, "binary"
+    )
+    return len(X_train)
+
+
+def _fitted_model_dir(ctx: Context) -> Path:
+    model_dir = ctx.work_dir / "models"
+    model_path = model_dir / "btts" / "model.pkl"
+    if not model_path.exists():
+        import joblib
+        import lightgbm as lgb
+
+        X_train, y_train, _, _, _ = ctx.split()
+        model = lgb.LGBMClassifier(objective="binary", verbose=-1, **TRIAL_PARAMS)
+        model.fit(X_train, y_train)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, model_path)
+    return model_dir
+
+
+def bench_export_model(ctx: Context) -> int:
+    output = ctx.export_to_json.export_model(_fitted_model_dir(ctx), "btts", minify=True)
+    json.dumps(output, separators=(",", ":"))
+    return output["metadata"]["num_trees"]
+
+
+def bench_offline_metrics(ctx: Context) -> int:
+    ev = ctx.evaluate_offline
+    rng = np.random.default_rng(ctx.args.seed)
+    _, _, _, _, test = ctx.split()
+    rows = len(test)
+    y_binary = rng.integers(0, 2, rows).tolist()
+    prob_yes = rng.uniform(0.05, 0.95, rows).tolist()
+    y_multi = rng.integers(0, 3, rows).tolist()
+    prob_rows = rng.dirichlet([2, 1, 1.5], rows).tolist()
+    ev.brier_binary(y_binary, prob_yes)
+    ev.logloss_binary(y_binary, prob_yes)
+    ev.brier_multiclass(y_multi, prob_rows)
+    ev.logloss_multiclass(y_multi, prob_rows)
+    return rows
+
+
+def bench_cli_startup(ctx: Context) -> int:
+    sys.path.insert(0, str(ML_DIR.parent))
+    from ml.cli import COMMANDS
+
+    for command in COMMANDS:
+        with span(command):
+            subprocess.run(
+                [sys.executable, "-m", "ml", command, "--help"],
+                cwd=ML_DIR.parent,
+                capture_output=True,
+                check=True,
+            )
+    return len(COMMANDS)
+
+
+BENCH_FUNCTIONS = {
+    "create_targets": bench_create_targets,
+    "prepare_features": bench_prepare_features,
+    "optuna_trial": bench_optuna_trial,
+    "export_model": bench_export_model,
+    "offline_metrics": bench_offline_metrics,
+    "cli_startup": bench_cli_startup,
+}
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    ctx = Context(args)
+    generation_seconds = ctx.ensure_data()
+    selected = BENCHMARKS if args.only == "all" else args.only.split(",")
+
+    results: dict[str, dict] = {}
+    with run_report("benchmarks", args, sample_rss=True) as report:
+        for name in selected:
+            if name not in BENCH_FUNCTIONS:
+                raise SystemExit(f"Unknown benchmark: {name}")
+            # Warm-up builds shared inputs (targets table, splits, model) and
+            # imports so timed runs measure only the benchmarked code.
+            if args.warmup:
+                BENCH_FUNCTIONS[name](ctx)
+            runs = []
+            rows = None
+            first_span = len(report.spans)
+            for _ in range(args.repeat):
+                with report.span(name) as stage:
+                    rows = BENCH_FUNCTIONS[name](ctx)
+                    stage.rows = rows
+                runs.append(stage.seconds)
+            spans = report.spans[first_span:]
+            stages: dict[str, list[float]] = {}
+            for stage in spans:
+                if stage.path != name:
+                    stages.setdefault(stage.path.split("/", 1)[1], []).append(stage.seconds)
+            results[name] = {
+                "rows": rows,
+                "repeat": args.repeat,
+                "seconds_min": round(min(runs), 4),
+                "seconds_median": round(statistics.median(runs), 4),
+                "runs": [round(value, 4) for value in runs],
+                "peak_rss_mb": round(
+                    max(s.peak_rss_mb or 0.0 for s in spans if s.path == name), 1
+                ),
+                "stages": {
+                    path: round(min(values), 4) for path, values in stages.items()
+                },
+            }
+            print(
+                f"  {name:18} {results[name]['seconds_min']:9.3f}s min  "
+                f"{results[name]['seconds_median']:9.3f}s median  rows={rows}"
+            )
+
+    sha, dirty = git_revision()
+    return {
+        "commit": sha,
+        "dirty": dirty,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "scale": args.scale,
+        "matches": ctx.raw_rows,
+        "seed": args.seed,
+        "workers": args.workers,
+        "generation_seconds": round(generation_seconds, 2),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": library_versions(),
+        "benchmarks": results,
+    }
+
+
+def compare_results(base: dict, head: dict) -> None:
+    print(
+        f"\n📊 {base.get('commit')} → {head.get('commit')} "
+        f"(scale {head.get('scale')}, min seconds)"
+    )
+    print("-" * 64)
+    for name in BENCHMARKS:
+        if name not in base["benchmarks"] or name not in head["benchmarks"]:
+            continue
+        before = base["benchmarks"][name]["seconds_min"]
+        after = head["benchmarks"][name]["seconds_min"]
+        ratio = after / before if before else float("nan")
+        flag = "  ⚠️ slower" if ratio > 1.1 else ""
+        print(f"  {name:18} {before:9.3f} → {after:9.3f}  x{ratio:5.2f}{flag}")
+    print("-" * 64)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the ML pipeline on synthetic data.")
+    parser.add_argument(
+        "--scale",
+        default="10k",
+        help=f"Match count or preset ({', '.join(SCALES)}).",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic data seed.")
+    parser.add_argument(
+        "--only",
+        default="all",
+        help=f"Comma-separated benchmarks ({', '.join(BENCHMARKS)}) or 'all'.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark.")
+    parser.add_argument(
+        "--no-warmup",
+        dest="warmup",
+        action="store_false",
+        help="Skip the untimed warm-up run.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="create-targets --workers value."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default="ml/data/synthetic",
+        help="Cache directory for generated datasets.",
+    )
+    parser.add_argument(
+        "--results-dir",
+        default="ml/benchmarks/results",
+        help="Directory for result JSON files.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Result JSON to compare this run against.",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASE", "HEAD"),
+        default=None,
+        help="Compare two saved result files and exit.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.compare:
+        base, head = (json.loads(Path(path).read_text()) for path in args.compare)
+        compare_results(base, head)
+        return
+
+    print(f"🏁 Benchmarks at scale {args.scale} (seed {args.seed})")
+    results = run_benchmarks(args)
+
+    out_dir = Path(args.results_dir) / args.scale
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    suffix = "-dirty" if results["dirty"] else ""
+    out_path = out_dir / f"{stamp}-{results['commit']}{suffix}.json"
+    out_path.write_text(json.dumps(results, indent=2))
+    print(f"✅ Results written to {out_path}")
+
+    if args.baseline:
+        compare_results(json.loads(Path(args.baseline).read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Seeded synthetic match data for benchmarking the Python ML pipeline.
+
+Produces the same inputs the real pipeline consumes, without the proprietary
+`historical.csv`:
+- `raw.csv`        raw match history (Matches.csv columns used by create-targets)
+- `features.csv`   training feature table (build-training-set.ts columns)
+- `team-map.json`  empty team mapping (synthetic names are already canonical)
+- `leagues.json`   Division code -> leagueId for every generated league
+
+League structure is realistic: 20-team double round-robins, up to 25 seasons,
+and promotion/relegation churn that controls how often a pair meets (H2H
+density). Scale is set by the target match count. Seasons grow first; once the
+25-season cap is reached, extra leagues are added. The first seven leagues
+reuse the real Division codes from `league-name-map.json`; further leagues get
+synthetic codes that callers must register (see `register_leagues`).
+
+Usage:
+    python ml/benchmarks/synthetic_data.py --matches 100000 --out ml/data/synthetic/100k
+"""
+
+import argparse
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+LEAGUE_CONFIG = Path(__file__).resolve().parents[1] / "config" / "league-name-map.json"
+
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "500k": 500_000,
+    "2m": 2_000_000,
+}
+
+TEAMS_PER_LEAGUE = 20
+MAX_SEASONS = 25
+FIRST_SEASON = 2000
+FORM_CHOICES = np.array(["WWWWW", "WWDLW", "LDWWL", "DDLWD", "LLDLW", "WLWLD", "LLLLD"])
+
+FEATURE_COLUMNS = [
+    "date",
+    "season",
+    "leagueId",
+    "leagueName",
+    "homeTeam",
+    "awayTeam",
+    "homeForm",
+    "awayForm",
+    "homeFormScore",
+    "awayFormScore",
+    "homePPG10",
+    "awayPPG10",
+    "homeGF10",
+    "homeGA10",
+    "awayGF10",
+    "awayGA10",
+    "homeDaysSince",
+    "awayDaysSince",
+    "homeHomeFormScore",
+    "awayAwayFormScore",
+    "homeElo",
+    "awayElo",
+    "eloDiff",
+    "homeTier",
+    "awayTier",
+    "tierGap",
+    "result",
+    "homeGoals",
+    "awayGoals",
+]
+
+
+def parse_scale(value: str) -> int:
+    key = value.strip().lower()
+    if key in SCALES:
+        return SCALES[key]
+    return int(float(key))
+
+
+def real_leagues() -> list[tuple[str, int]]:
+    """One Division code per real league id, in league-name-map order."""
+    league_map = json.loads(LEAGUE_CONFIG.read_text())["leagueNameMap"]
+    seen: dict[int, str] = {}
+    for name, league_id in league_map.items():
+        # Division codes (e0, sp1, ...) are what Matches.csv uses.
+        if name.isalnum() and any(ch.isdigit() for ch in name) and league_id not in seen:
+            seen[league_id] = name.upper()
+    return [(code, league_id) for league_id, code in seen.items()]
+
+
+def plan_layout(matches: int, leagues: int | None, seasons: int | None) -> tuple[int, int]:
+    per_season = TEAMS_PER_LEAGUE * (TEAMS_PER_LEAGUE - 1)
+    base_leagues = len(real_leagues())
+    if seasons is None:
+        seasons = min(MAX_SEASONS, max(1, math.ceil(matches / (base_leagues * per_season))))
+    if leagues is None:
+        leagues = max(base_leagues, math.ceil(matches / (seasons * per_season)))
+    return leagues, seasons
+
+
+def round_robin(teams: int) -> np.ndarray:
+    """Double round-robin (circle method) as rows of (round, home, away)."""
+    rotation = list(range(teams))
+    fixtures = []
+    for round_idx in range(teams - 1):
+        for slot in range(teams // 2):
+            home = rotation[slot]
+            away = rotation[teams - 1 - slot]
+            if round_idx % 2 == 1:
+                home, away = away, home
+            fixtures.append((round_idx, home, away))
+        rotation = [rotation[0], rotation[-1], *rotation[1:-1]]
+    first_half = np.array(fixtures)
+    second_half = first_half[:, [0, 2, 1]].copy()
+    second_half[:, 0] += teams - 1
+    return np.vstack([first_half, second_half])
+
+
+def outcome_probabilities(
+    lam_home: np.ndarray, lam_away: np.ndarray, max_goals: int = 10, chunk: int = 100_000
+):
+    """Exact (truncated) Poisson probabilities for home/draw/away and over 2.5."""
+    if len(lam_home) > chunk:
+        parts = [
+            outcome_probabilities(lam_home[i : i + chunk], lam_away[i : i + chunk], max_goals)
+            for i in range(0, len(lam_home), chunk)
+        ]
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+    goals = np.arange(max_goals + 1)
+    log_fact = np.cumsum(np.log(np.maximum(goals, 1)))
+    home_pmf = np.exp(goals * np.log(lam_home[:, None]) - lam_home[:, None] - log_fact)
+    away_pmf = np.exp(goals * np.log(lam_away[:, None]) - lam_away[:, None] - log_fact)
+    grid = home_pmf[:, :, None] * away_pmf[:, None, :]
+    diff = goals[:, None] - goals[None, :]
+    total = goals[:, None] + goals[None, :]
+    p_home = grid[:, diff > 0].sum(axis=1)
+    p_draw = grid[:, diff == 0].sum(axis=1)
+    p_away = grid[:, diff < 0].sum(axis=1)
+    p_over = grid[:, total > 2.5].sum(axis=1)
+    return p_home, p_draw, p_away, p_over
+
+
+def to_odds(prob: np.ndarray, margin: float, rng: np.random.Generator) -> np.ndarray:
+    noisy = prob * (1 + margin) * np.exp(rng.normal(0, 0.03, len(prob)))
+    return np.round(1 / np.clip(noisy, 0.01, 0.99), 2)
+
+
+def generate(
+    matches: int,
+    *,
+    seed: int = 42,
+    leagues: int | None = None,
+    seasons: int | None = None,
+    churn: float = 0.15,
+    missing_stats: float = 0.05,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, int]]:
+    """Return (raw, features, league codes) for roughly `matches` matches."""
+    rng = np.random.default_rng(seed)
+    num_leagues, num_seasons = plan_layout(matches, leagues, seasons)
+    teams = TEAMS_PER_LEAGUE
+    schedule = round_robin(teams)
+    per_season = len(schedule)
+    relegated = max(1, round(churn * teams))
+    pool_size = teams + 2 * relegated
+
+    league_codes = real_leagues()
+    for idx in range(len(league_codes), num_leagues):
+        league_codes.append((f"SYN{idx:03d}", 100_000 + idx))
+    league_codes = league_codes[:num_leagues]
+
+    frames = []
+    for code, league_id in league_codes:
+        attack = rng.normal(0, 0.2, pool_size)
+        defense = rng.normal(0, 0.2, pool_size)
+        names = np.array([f"{code} Club {idx:02d}" for idx in range(pool_size)])
+        current = rng.choice(pool_size, teams, replace=False)
+        for season_idx in range(num_seasons):
+            season = FIRST_SEASON + season_idx
+            if season_idx:
+                # Promotion/relegation keeps some pairs apart for seasons.
+                outside = np.setdiff1d(np.arange(pool_size), current)
+                drop = rng.choice(teams, relegated, replace=False)
+                current = current.copy()
+                current[drop] = rng.choice(outside, relegated, replace=False)
+                attack += rng.normal(0, 0.05, pool_size)
+                defense += rng.normal(0, 0.05, pool_size)
+            order = rng.permutation(current)
+            home_idx = order[schedule[:, 1]]
+            away_idx = order[schedule[:, 2]]
+            start = pd.Timestamp(f"{season}-08-10").value // 86_400_000_000_000
+            day = start + schedule[:, 0] * 7 + rng.integers(0, 3, per_season)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "code": code,
+                        "leagueId": league_id,
+                        "season": season,
+                        "day": day,
+                        "home_idx": home_idx,
+                        "away_idx": away_idx,
+                        "homeTeam": names[home_idx],
+                        "awayTeam": names[away_idx],
+                        "lam_home": np.exp(0.35 + attack[home_idx] - defense[away_idx]),
+                        "lam_away": np.exp(0.1 + attack[away_idx] - defense[home_idx]),
+                        "strength": (attack - defense)[home_idx] - (attack - defense)[away_idx],
+                    }
+                )
+            )
+
+    games = pd.concat(frames, ignore_index=True)
+    n = len(games)
+    lam_home = games["lam_home"].to_numpy()
+    lam_away = games["lam_away"].to_numpy()
+    home_goals = rng.poisson(lam_home)
+    away_goals = rng.poisson(lam_away)
+    ht_home = rng.binomial(home_goals, 0.45)
+    ht_away = rng.binomial(away_goals, 0.45)
+    dates = pd.to_datetime(games["day"].to_numpy(), unit="D").strftime("%Y-%m-%d")
+
+    p_home, p_draw, p_away, p_over = outcome_probabilities(lam_home, lam_away)
+
+    def result_code(home: np.ndarray, away: np.ndarray, labels: tuple[str, str, str]):
+        return np.where(home > away, labels[0], np.where(home < away, labels[2], labels[1]))
+
+    def with_missing(values: np.ndarray) -> np.ndarray:
+        values = values.astype(np.float64)
+        values[rng.random(n) < missing_stats] = np.nan
+        return values
+
+    elo_home = np.round(1500 + 300 * games["strength"].to_numpy() / 2 + rng.normal(0, 40, n), 2)
+    elo_away = np.round(1500 - 300 * games["strength"].to_numpy() / 2 + rng.normal(0, 40, n), 2)
+    raw = pd.DataFrame(
+        {
+            "Division": games["code"],
+            "MatchDate": dates,
+            "HomeTeam": games["homeTeam"],
+            "AwayTeam": games["awayTeam"],
+            "HomeElo": elo_home,
+            "AwayElo": elo_away,
+            "FTHome": home_goals,
+            "FTAway": away_goals,
+            "FTResult": result_code(home_goals, away_goals, ("H", "D", "A")),
+            "HTHome": ht_home,
+            "HTAway": ht_away,
+            "HTResult": result_code(ht_home, ht_away, ("H", "D", "A")),
+            "HomeCorners": with_missing(rng.poisson(5.4, n)),
+            "AwayCorners": with_missing(rng.poisson(4.4, n)),
+            "HomeYellow": with_missing(rng.poisson(1.8, n)),
+            "AwayYellow": with_missing(rng.poisson(2.1, n)),
+            "HomeRed": with_missing(rng.poisson(0.07, n)),
+            "AwayRed": with_missing(rng.poisson(0.09, n)),
+            "OddHome": to_odds(p_home, 0.05, rng),
+            "OddDraw": to_odds(p_draw, 0.05, rng),
+            "OddAway": to_odds(p_away, 0.05, rng),
+            "Over25": to_odds(p_over, 0.05, rng),
+            "Under25": to_odds(1 - p_over, 0.05, rng),
+        }
+    )
+
+    def noisy(center: np.ndarray, scale: float, digits: int = 3) -> np.ndarray:
+        return np.round(center + rng.normal(0, scale, n), digits)
+
+    strength = games["strength"].to_numpy()
+    features = pd.DataFrame(
+        {
+            "date": dates,
+            "season": games["season"],
+            "leagueId": games["leagueId"],
+            "leagueName": games["code"],
+            "homeTeam": games["homeTeam"],
+            "awayTeam": games["awayTeam"],
+            "homeForm": FORM_CHOICES[rng.integers(0, len(FORM_CHOICES), n)],
+            "awayForm": FORM_CHOICES[rng.integers(0, len(FORM_CHOICES), n)],
+            "homeFormScore": noisy(50 + 40 * strength, 12, 2),
+            "awayFormScore": noisy(50 - 40 * strength, 12, 2),
+            "homePPG10": noisy(1.4 + strength, 0.3),
+            "awayPPG10": noisy(1.4 - strength, 0.3),
+            "homeGF10": noisy(lam_home, 0.3),
+            "homeGA10": noisy(lam_away, 0.3),
+            "awayGF10": noisy(lam_away, 0.3),
+            "awayGA10": noisy(lam_home, 0.3),
+            "homeDaysSince": rng.integers(3, 15, n),
+            "awayDaysSince": rng.integers(3, 15, n),
+            "homeHomeFormScore": noisy(55 + 40 * strength, 15, 2),
+            "awayAwayFormScore": noisy(45 - 40 * strength, 15, 2),
+            "homeElo": elo_home,
+            "awayElo": elo_away,
+            "eloDiff": np.round(elo_home + 65 - elo_away, 2),
+            "homeTier": 1,
+            "awayTier": 1,
+            "tierGap": 0,
+            "result": result_code(home_goals, away_goals, ("HOME", "DRAW", "AWAY")),
+            "homeGoals": home_goals,
+            "awayGoals": away_goals,
+        }
+    )
+    # build-training-set skips matches until both teams have 5 games of history.
+    season_start = games.groupby(["code", "season"])["day"].transform("min")
+    features = features[(games["day"] >= season_start + 35).to_numpy()]
+    features = features.sort_values("date", kind="stable").reset_index(drop=True)
+    raw = raw.sort_values("MatchDate", kind="stable").reset_index(drop=True)
+    return raw, features[FEATURE_COLUMNS], dict(league_codes)
+
+
+def register_leagues(create_targets_module, league_codes: dict[str, int]) -> None:
+    """Make synthetic Division codes resolvable by create-targets."""
+    for code, league_id in league_codes.items():
+        create_targets_module.LEAGUE_NAME_MAP.setdefault(code.lower(), league_id)
+
+
+def write_dataset(out_dir: Path, matches: int, seed: int, **kwargs) -> dict[str, Path]:
+    raw, features, league_codes = generate(matches, seed=seed, **kwargs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "raw": out_dir / "raw.csv",
+        "features": out_dir / "features.csv",
+        "team_map": out_dir / "team-map.json",
+        "leagues": out_dir / "leagues.json",
+    }
+    raw.to_csv(paths["raw"], index=False)
+    features.to_csv(paths["features"], index=False)
+    paths["team_map"].write_text(json.dumps({"mappings": {}}))
+    paths["leagues"].write_text(json.dumps(league_codes, indent=2))
+    return paths
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic match data.")
+    parser.add_argument(
+        "--matches",
+        default="10k",
+        help=f"Target match count or preset ({', '.join(SCALES)}).",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument("--leagues", type=int, default=None, help="Override league count.")
+    parser.add_argument("--seasons", type=int, default=None, help="Override season count.")
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.15,
+        help="Share of teams relegated per season (lower = denser H2H history).",
+    )
+    parser.add_argument(
+        "--out",
+        default="ml/data/synthetic/10k",
+        help="Output directory.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    paths = write_dataset(
+        Path(args.out),
+        parse_scale(args.matches),
+        args.seed,
+        leagues=args.leagues,
+        seasons=args.seasons,
+        churn=args.churn,
+    )
+    raw_rows = sum(1 for _ in paths["raw"].open()) - 1
+    print(f"✅ Synthetic data ({raw_rows} matches) written to {paths['raw'].parent}")
+
+
+if __name__ == "__main__":
+    main()
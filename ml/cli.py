@@ -0,0 +1,110 @@
+"""
+Single entry point for the Python ML pipeline.
+
+Run from the repository root:
+    python -m ml <command> [options]
+    python -m ml train --markets 1x2,btts --trials 50
+    python -m ml --timing export --help
+
+Each command is one of the pipeline scripts, loaded by path only when it is
+selected: `python -m ml export` never imports the training code, and the
+scripts bind lightgbm/sklearn/optuna/joblib lazily (models/lazy_imports.py),
+so `--help` and light code paths do not pay for them. The scripts keep
+working when run directly (`python ml/models/train-markets.py ...`).
+
+`--timing` prints to stderr how long the CLI took to reach the command's
+`main()`, which heavy modules were already loaded then, and the total run
+time.
+"""
+
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+
+STARTED = time.perf_counter()
+
+ML_DIR = Path(__file__).resolve().parent
+
+# command -> (script relative to ml/, help)
+COMMANDS = {
+    "targets": ("targets/create-targets.py", "Create targets from raw matches + features."),
+    "train": ("models/train-markets.py", "Train LightGBM markets with Optuna."),
+    "export": ("models/export-to-json.py", "Export models to model.json or a bundle."),
+    "weights": ("models/extract-weights.py", "Extract grouped factor weights."),
+    "evaluate": ("models/evaluate-offline.py", "Offline Brier/log loss evaluation."),
+    "calibrate": ("models/fit-calibration.py", "Fit probability calibration tables."),
+    "score": ("models/score-fixtures.py", "Precompute predictions for fixtures."),
+    "serve": ("models/score-worker.py", "Serve predictions from resident models (JSONL)."),
+    "drift": ("models/check-drift.py", "Check feature drift before retraining."),
+    "backtest": ("models/backtest-markets.py", "Backtest betting strategies over historical odds."),
+    "pipeline": ("models/run-pipeline.py", "Run the pipeline, skipping unchanged work."),
+}
+
+
+def load_command(command: str) -> ModuleType:
+    """Import a command's script as a module (hyphenated names allowed)."""
+    path = ML_DIR / COMMANDS[command][0]
+    # Scripts import their siblings (and ml/models helpers) by plain name.
+    for directory in (ML_DIR / "models", path.parent):
+        if str(directory) not in sys.path:
+            sys.path.insert(0, str(directory))
+    name = f"ml_{path.stem.replace('-', '_')}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered like any imported module. Process-pool worker functions must
+    # not live in the scripts: spawned workers (macOS default, forkserver)
+    # cannot re-load a module that was imported by path, so they are kept in
+    # importable siblings (e.g. targets/h2h.py, models/factor_weights.py).
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    width = max(len(command) for command in COMMANDS)
+    listing = "\n".join(
+        f"  {command:<{width}}  {description}"
+        for command, (_, description) in COMMANDS.items()
+    )
+    parser = argparse.ArgumentParser(
+        prog="ml",
+        description="Python ML pipeline commands.",
+        epilog=f"commands:\n{listing}\n\nRun `ml <command> --help` for options.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Print startup and total run time to stderr.",
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    module = load_command(args.command)
+    if args.timing:
+        from lazy_imports import loaded_heavy_modules
+
+        heavy = ", ".join(loaded_heavy_modules()) or "none"
+        print(
+            f"⏱  ml {args.command}: startup {time.perf_counter() - STARTED:.3f}s "
+            f"(heavy modules loaded: {heavy})",
+            file=sys.stderr,
+        )
+
+    # The script parses sys.argv itself, exactly as when run directly.
+    sys.argv = [f"ml {args.command}", *args.args]
+    try:
+        module.main()
+    finally:
+        if args.timing:
+            print(
+                f"⏱  ml {args.command}: total {time.perf_counter() - STARTED:.3f}s",
+                file=sys.stderr,
+            )
@@ -0,0 +1,495 @@
+"""
+Backtest trained markets as a betting strategy over historical odds.
+
+For every fixture the model's probabilities are compared with the bookmaker
+prices carried in the targets table (create-targets.py keeps the raw odds
+columns). The outcome with the largest edge (p * odds - 1) is the candidate
+bet; it is placed when the edge clears a threshold. Every threshold of the
+grid is simulated at once: bets are a (thresholds x fixtures) mask over the
+fixtures in date order, so profit curves, drawdowns and compounding bankrolls
+are cumulative sums/products along one axis rather than a loop over bets.
+
+Staking:
+- flat         one unit per bet
+- kelly_<f>    fraction f of the Kelly stake edge / (odds - 1), capped at
+               --kelly-cap of the current bankroll, compounding from 1.0
+
+Reported per threshold and strategy: bets, profit, ROI (profit / staked),
+hit rate, max drawdown and mean CLV. The odds are one set of prices per
+fixture, not an opening/closing pair, so CLV here is the price taken against
+the de-margined --closing prices: odds * p_close - 1. Betting at the average
+price therefore shows the bookmaker margin as negative CLV; positive CLV
+means the price beat the consensus fair line. The per-league breakdown uses
+flat stakes.
+
+Usage:
+    python ml/models/backtest-markets.py --from-season 2024 [--calibrated]
+
+Examples:
+    python ml/models/backtest-markets.py --markets 1x2 --price max --closing avg
+    python ml/models/backtest-markets.py --kelly 0.1,0.25 --max-edge 0.3
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from calibration import calibrate_probabilities, held_out_rows, overlaps_fit
+from feature_store import BASE_TARGETS, load_table, prepare_features
+from instrumentation import add_instrumentation_args, run_report, span
+from lazy_imports import lazy_import
+
+joblib = lazy_import("joblib")
+
+
+# Markets with bookmaker prices, outcomes in model class order.
+BACKTEST_MARKETS = {
+    "1x2": {
+        "target": "result",
+        "type": "multiclass",
+        "outcomes": ["HOME", "DRAW", "AWAY"],
+        "prices": {
+            "avg": ["OddHome", "OddDraw", "OddAway"],
+            "max": ["MaxHome", "MaxDraw", "MaxAway"],
+        },
+    },
+    "ou_2_5": {
+        "target": "ou_over_2_5",
+        "type": "binary",
+        "outcomes": ["over", "under"],
+        "prices": {
+            "avg": ["Over25", "Under25"],
+            "max": ["MaxOver25", "MaxUnder25"],
+        },
+    },
+}
+PRICE_SETS = ("avg", "max")
+# Targets of the backtested markets plus the base targets the feature store
+# always drops, so X matches the columns the models were trained on.
+TARGET_COLUMNS = set(BASE_TARGETS) | {
+    config["target"] for config in BACKTEST_MARKETS.values()
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Backtest market models against historical bookmaker odds."
+    )
+    parser.add_argument(
+        "--input",
+        default="ml/data/features/training_with_targets.csv",
+        help="CSV with features, targets and odds (training_with_targets.csv).",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default="ml/models/output",
+        help="Directory with trained model.pkl files.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=",".join(BACKTEST_MARKETS),
+        help="Comma-separated market keys with odds (1x2, ou_2_5).",
+    )
+    parser.add_argument(
+        "--from-season", type=int, default=None, help="First season to bet on."
+    )
+    parser.add_argument("--to-season", type=int, default=None, help="Last season to bet on.")
+    parser.add_argument(
+        "--calibrated",
+        action="store_true",
+        help=(
+            "Apply each market's calibration.json before computing edges (rows "
+            "it was fitted on are not bet)."
+        ),
+    )
+    parser.add_argument(
+        "--price",
+        choices=PRICE_SETS,
+        default="avg",
+        help="Odds the bets are placed at (market average or best available).",
+    )
+    parser.add_argument(
+        "--closing",
+        choices=(*PRICE_SETS, "none"),
+        default="avg",
+        help="Odds used as the fair closing line for CLV ('none' to skip).",
+    )
+    parser.add_argument(
+        "--min-edge", type=float, default=0.0, help="Smallest edge threshold."
+    )
+    parser.add_argument(
+        "--max-edge", type=float, default=0.2, help="Largest edge threshold."
+    )
+    parser.add_argument(
+        "--edge-step", type=float, default=0.01, help="Edge threshold grid step."
+    )
+    parser.add_argument(
+        "--kelly",
+        default="0.25",
+        help="Comma-separated Kelly fractions to simulate ('' for flat stakes only).",
+    )
+    parser.add_argument(
+        "--kelly-cap",
+        type=float,
+        default=0.05,
+        help="Largest stake as a share of the current bankroll.",
+    )
+    parser.add_argument(
+        "--min-bets",
+        type=int,
+        default=50,
+        help="Fewest bets for a threshold to be picked as the best one.",
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Report path (default: <model-dir>/reports/backtest.json).",
+    )
+    parser.add_argument(
+        "--feature-store",
+        default=None,
+        help=(
+            "Cache the parsed --input as memory-mapped arrays under this directory "
+            "(keyed by file hash) and read it from there on later runs."
+        ),
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def filter_seasons(df: pd.DataFrame, args: argparse.Namespace) -> pd.DataFrame:
+    if args.from_season is not None:
+        df = df[df["season"] >= args.from_season]
+    if args.to_season is not None:
+        df = df[df["season"] <= args.to_season]
+    return df
+
+
+def price_columns(df: pd.DataFrame, market: str, price_set: str) -> list[str]:
+    columns = BACKTEST_MARKETS[market]["prices"][price_set]
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise SystemExit(
+            f"{market}: odds columns {missing} not in --input "
+            f"(re-run create-targets.py, or pick another --price/--closing)."
+        )
+    return columns
+
+
+def load_calibration(model_dir: Path, market: str) -> dict | None:
+    path = model_dir / market / "calibration.json"
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def predict(
+    model_dir: Path, market: str, X: pd.DataFrame, calibration: dict | None
+) -> np.ndarray:
+    """Outcome probabilities (rows x outcomes) in BACKTEST_MARKETS order."""
+    model_path = model_dir / market / "model.pkl"
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    prob = joblib.load(model_path).predict_proba(X)
+    if calibration is not None:
+        prob = calibrate_probabilities(calibration, prob)
+    if BACKTEST_MARKETS[market]["type"] == "binary":
+        # Classes are (no, yes); outcomes are (yes, no).
+        return prob[:, ::-1]
+    return prob
+
+
+def market_arrays(
+    df: pd.DataFrame, market: str, model_dir: Path, args: argparse.Namespace
+) -> dict[str, np.ndarray]:
+    """Per-fixture arrays for one market, in date order.
+
+    Fixtures without a result or with any missing/invalid price are dropped,
+    and with --calibrated so are those the calibration was fitted on.
+    """
+    spec = BACKTEST_MARKETS[market]
+    columns = price_columns(df, market, args.price)
+    closing_columns = (
+        price_columns(df, market, args.closing) if args.closing != "none" else []
+    )
+    odds_columns = list(dict.fromkeys(columns + closing_columns))
+
+    subset = df[df[spec["target"]].notna()]
+    if spec["type"] == "multiclass":
+        subset = subset[subset[spec["target"]].isin(spec["outcomes"])]
+    valid = (subset[odds_columns] > 1).all(axis=1).to_numpy()
+    subset = subset[valid]
+    calibration = load_calibration(model_dir, market) if args.calibrated else None
+    if calibration is not None:
+        seasons = subset["season"].to_numpy()
+        if overlaps_fit(calibration, seasons):
+            print(
+                f"⚠️  {market}: calibration was fitted on seasons "
+                f"{calibration['seasons']} without a recorded cut-off; calibrated "
+                "results on those seasons are in-sample (re-run fit-calibration.py)",
+                file=sys.stderr,
+            )
+        subset = subset[
+            held_out_rows(calibration, seasons, pd.to_datetime(subset["date"]).to_numpy())
+        ]
+    if subset.empty:
+        return {"prob": np.empty((0, len(spec["outcomes"])))}
+    order = np.argsort(pd.to_datetime(subset["date"]).to_numpy(), kind="stable")
+    subset = subset.iloc[order]
+
+    with span("predict") as stage:
+        prob = predict(
+            model_dir, market, prepare_features(subset, TARGET_COLUMNS), calibration
+        )
+        stage.rows = len(subset)
+
+    target = subset[spec["target"]]
+    if spec["type"] == "multiclass":
+        won = target.to_numpy()[:, None] == np.array(spec["outcomes"])[None, :]
+    else:
+        yes = target.astype(int).to_numpy() == 1
+        won = np.column_stack([yes, ~yes])
+
+    arrays = {
+        "prob": prob,
+        "won": won,
+        "price": subset[columns].to_numpy(dtype=np.float64),
+        "league": subset["leagueId"].to_numpy(),
+    }
+    if closing_columns:
+        implied = 1.0 / subset[closing_columns].to_numpy(dtype=np.float64)
+        arrays["fair"] = implied / implied.sum(axis=1, keepdims=True)
+    return arrays
+
+
+def pick_bets(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """The largest-edge outcome of every fixture, as flat per-fixture arrays."""
+    edge = arrays["prob"] * arrays["price"] - 1.0
+    best = np.argmax(edge, axis=1)
+    rows = np.arange(len(best))
+    odds = arrays["price"][rows, best]
+    won = arrays["won"][rows, best]
+    picks = {
+        "outcome": best,
+        "edge": edge[rows, best],
+        "odds": odds,
+        "won": won,
+        # Profit of one unit staked.
+        "ret": np.where(won, odds - 1.0, -1.0),
+    }
+    if "fair" in arrays:
+        picks["clv"] = odds * arrays["fair"][rows, best] - 1.0
+    return picks
+
+
+def max_drawdown(curve: np.ndarray, start: float) -> np.ndarray:
+    """Largest peak-to-trough fall along the last axis of `curve`."""
+    peak = np.maximum.accumulate(np.maximum(curve, start), axis=-1)
+    return (peak - curve).max(axis=-1, initial=0.0)
+
+
+def flat_stakes(bets: np.ndarray, picks: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """One unit per bet for every threshold row of `bets`."""
+    count = bets.sum(axis=1)
+    profit = np.where(bets, picks["ret"], 0.0)
+    curve = np.cumsum(profit, axis=1)
+    denom = np.maximum(count, 1)
+    result = {
+        "bets": count,
+        "profit": curve[:, -1] if curve.shape[1] else np.zeros(len(bets)),
+        "roi": curve[:, -1] / denom if curve.shape[1] else np.zeros(len(bets)),
+        "hit_rate": (bets & picks["won"]).sum(axis=1) / denom,
+        "max_drawdown": max_drawdown(curve, 0.0),
+    }
+    if "clv" in picks:
+        result["clv"] = np.where(bets, picks["clv"], 0.0).sum(axis=1) / denom
+    return result
+
+
+def kelly_stakes(
+    bets: np.ndarray, picks: dict[str, np.ndarray], fraction: float, cap: float
+) -> dict[str, np.ndarray]:
+    """Fractional Kelly with a compounding bankroll starting at 1.0.
+
+    Drawdown is the largest fall as a share of the running bankroll peak.
+    """
+    kelly = fraction * picks["edge"] / (picks["odds"] - 1.0)
+    stake = np.where(bets, np.clip(kelly, 0.0, cap), 0.0)
+    bankroll = np.cumprod(1.0 + stake * picks["ret"], axis=1)
+    before = np.concatenate([np.ones((len(bets), 1)), bankroll[:, :-1]], axis=1)
+    staked = (stake * before).sum(axis=1)
+    final = bankroll[:, -1] if bankroll.shape[1] else np.ones(len(bets))
+    peak = np.maximum.accumulate(np.maximum(bankroll, 1.0), axis=1)
+    count = bets.sum(axis=1)
+    result = {
+        "bets": count,
+        "final_bankroll": final,
+        "profit": final - 1.0,
+        "roi": (final - 1.0) / np.maximum(staked, 1e-12),
+        "hit_rate": (bets & picks["won"]).sum(axis=1) / np.maximum(count, 1),
+        "max_drawdown": (1.0 - bankroll / peak).max(axis=1, initial=0.0),
+    }
+    if "clv" in picks:
+        result["clv"] = np.where(bets, picks["clv"], 0.0).sum(axis=1) / np.maximum(count, 1)
+    return result
+
+
+def league_breakdown(
+    bets: np.ndarray, picks: dict[str, np.ndarray], league: np.ndarray
+) -> dict[str, dict[str, np.ndarray]]:
+    """Flat-stake bets, ROI, drawdown and CLV per league and threshold.
+
+    Sums come from one (thresholds x fixtures) @ (fixtures x leagues) product;
+    drawdown needs each league's own running curve.
+    """
+    codes, leagues = pd.factorize(pd.Series(league).fillna(-1).astype(np.int64))
+    onehot = np.zeros((len(codes), len(leagues)))
+    onehot[np.arange(len(codes)), codes] = 1.0
+    weights = bets.astype(np.float64)
+    profit = weights * picks["ret"]
+    count = weights @ onehot
+    profit_sum = profit @ onehot
+    clv_sum = (weights * picks["clv"]) @ onehot if "clv" in picks else None
+
+    breakdown = {}
+    for idx, league_id in enumerate(leagues):
+        columns = codes == idx
+        denom = np.maximum(count[:, idx], 1)
+        entry = {
+            "bets": count[:, idx].astype(np.int64),
+            "profit": profit_sum[:, idx],
+            "roi": profit_sum[:, idx] / denom,
+            "max_drawdown": max_drawdown(np.cumsum(profit[:, columns], axis=1), 0.0),
+        }
+        if clv_sum is not None:
+            entry["clv"] = clv_sum[:, idx] / denom
+        breakdown[str(league_id)] = entry
+    return breakdown
+
+
+def rounded(columns: dict[str, np.ndarray]) -> dict[str, list]:
+    return {
+        name: values.tolist() if values.dtype.kind in "iub" else np.round(values, 6).tolist()
+        for name, values in columns.items()
+    }
+
+
+def best_threshold(
+    thresholds: np.ndarray, strategies: dict[str, dict], min_bets: int
+) -> dict | None:
+    """Highest-ROI (strategy, threshold) with at least `min_bets` bets."""
+    best = None
+    for name, result in strategies.items():
+        roi = np.where(result["bets"] >= min_bets, result["roi"], -np.inf)
+        idx = int(np.argmax(roi))
+        if np.isfinite(roi[idx]) and (best is None or roi[idx] > best["roi"]):
+            best = {
+                "strategy": name,
+                "threshold": round(float(thresholds[idx]), 6),
+                "bets": int(result["bets"][idx]),
+                "roi": round(float(roi[idx]), 6),
+                "max_drawdown": round(float(result["max_drawdown"][idx]), 6),
+            }
+            if "clv" in result:
+                best["clv"] = round(float(result["clv"][idx]), 6)
+    return best
+
+
+def backtest_market(
+    df: pd.DataFrame,
+    market: str,
+    model_dir: Path,
+    thresholds: np.ndarray,
+    fractions: list[float],
+    args: argparse.Namespace,
+) -> dict:
+    arrays = market_arrays(df, market, model_dir, args)
+    if len(arrays["prob"]) == 0:
+        return {"market": market, "status": "skipped", "reason": "no priced fixtures"}
+
+    with span("simulate", thresholds=len(thresholds)) as stage:
+        picks = pick_bets(arrays)
+        bets = picks["edge"][None, :] >= thresholds[:, None]
+        strategies = {"flat": flat_stakes(bets, picks)}
+        for fraction in fractions:
+            strategies[f"kelly_{fraction:g}"] = kelly_stakes(
+                bets, picks, fraction, args.kelly_cap
+            )
+        leagues = league_breakdown(bets, picks, arrays["league"])
+        stage.rows = len(picks["edge"])
+
+    outcomes = BACKTEST_MARKETS[market]["outcomes"]
+    return {
+        "market": market,
+        "status": "ok",
+        "fixtures": len(picks["edge"]),
+        "positive_edge": int((picks["edge"] > 0).sum()),
+        "picked_outcomes": {
+            name: int((picks["outcome"] == idx).sum()) for idx, name in enumerate(outcomes)
+        },
+        "best": best_threshold(thresholds, strategies, args.min_bets),
+        "strategies": {name: rounded(result) for name, result in strategies.items()},
+        "leagues": {league: rounded(entry) for league, entry in leagues.items()},
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("backtest-markets", args):
+        backtest(args)
+
+
+def backtest(args: argparse.Namespace) -> None:
+    markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    unknown = [market for market in markets if market not in BACKTEST_MARKETS]
+    if unknown:
+        raise SystemExit(
+            f"No odds mapping for {unknown}; backtestable markets: "
+            f"{', '.join(BACKTEST_MARKETS)}."
+        )
+    if args.edge_step <= 0 or args.max_edge < args.min_edge:
+        raise SystemExit("Edge grid needs --edge-step > 0 and --max-edge >= --min-edge.")
+    thresholds = np.arange(args.min_edge, args.max_edge + args.edge_step / 2, args.edge_step)
+    fractions = [float(value) for value in args.kelly.split(",") if value.strip()]
+
+    with span("load") as stage:
+        df = filter_seasons(load_table(args.input, args.feature_store), args)
+        stage.rows = len(df)
+
+    model_dir = Path(args.model_dir)
+    report = {
+        "input": str(args.input),
+        "seasons": [args.from_season, args.to_season],
+        "price": args.price,
+        "closing": None if args.closing == "none" else args.closing,
+        "calibrated": args.calibrated,
+        "kelly_cap": args.kelly_cap,
+        "thresholds": np.round(thresholds, 6).tolist(),
+        "markets": {},
+    }
+    for market in markets:
+        with span(f"market:{market}"):
+            result = backtest_market(df, market, model_dir, thresholds, fractions, args)
+        report["markets"][market] = result
+        best = result.get("best")
+        if best is None:
+            reason = result.get("reason", f"no threshold with {args.min_bets}+ bets")
+            print(f"⚠️  {market}: {reason}")
+            continue
+        clv = f", CLV {best['clv']:+.3f}" if "clv" in best else ""
+        print(
+            f"📈 {market}: best {best['strategy']} at edge >= {best['threshold']:.2f} "
+            f"-> ROI {best['roi']:+.3f} over {best['bets']} bets, "
+            f"max drawdown {best['max_drawdown']:.3f}{clv}"
+        )
+
+    out_path = Path(args.out) if args.out else model_dir / "reports" / "backtest.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"✅ Backtest report at {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Probability calibration fitted on held-out predictions and shipped as tables.
+
+Every calibrator, whatever the fitting method, is exported as a compact
+piecewise-linear table `{"x": [...], "y": [...]}` with strictly increasing x.
+The runtime maps a raw probability with one binary search and a linear
+interpolation, clamping outside [x[0], x[-1]]; `apply_table` (np.interp) has
+the same semantics.
+
+Methods:
+- platt        sigmoid(a * logit(p) + b)
+- temperature  sigmoid(logit(p) / T), i.e. Platt with b = 0
+- isotonic     monotone step fit (pool adjacent violators)
+
+Platt and temperature are fitted for all curves at once. Curves are padded
+into one (curves x rows) matrix and a batched Newton solve runs on it, so
+calibrating every market is a handful of matrix operations. Multiclass
+markets get one curve per class (one-vs-rest), renormalised after mapping.
+"""
+
+import numpy as np
+
+from lazy_imports import lazy_import
+
+isotonic = lazy_import("sklearn.isotonic")
+
+
+METHODS = ("isotonic", "platt", "temperature")
+EPS = 1e-6
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, EPS, 1 - EPS)
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
+
+
+def fit_platt_batch(
+    curves: list[tuple[np.ndarray, np.ndarray]],
+    *,
+    fit_bias: bool = True,
+    iterations: int = 50,
+    ridge: float = 1e-6,
+) -> np.ndarray:
+    """Fit (a, b) for every (prob, label) curve with one batched Newton solve.
+
+    Returns a (curves, 2) array. With `fit_bias=False` b stays 0 (temperature
+    scaling, T = 1 / a).
+    """
+    if not curves:
+        return np.zeros((0, 2))
+    width = max(len(p) for p, _ in curves)
+    logits = np.zeros((len(curves), width))
+    labels = np.zeros((len(curves), width))
+    mask = np.zeros((len(curves), width))
+    for row, (p, y) in enumerate(curves):
+        logits[row, : len(p)] = _logit(np.asarray(p, dtype=np.float64))
+        labels[row, : len(p)] = y
+        mask[row, : len(p)] = 1.0
+
+    a = np.ones(len(curves))
+    b = np.zeros(len(curves))
+    for _ in range(iterations):
+        q = _sigmoid(a[:, None] * logits + b[:, None])
+        residual = (q - labels) * mask
+        curvature = q * (1 - q) * mask
+        grad_a = (residual * logits).sum(axis=1)
+        h_aa = (curvature * logits**2).sum(axis=1) + ridge
+        if fit_bias:
+            grad_b = residual.sum(axis=1)
+            h_ab = (curvature * logits).sum(axis=1)
+            h_bb = curvature.sum(axis=1) + ridge
+            det = h_aa * h_bb - h_ab**2
+            step_a = (h_bb * grad_a - h_ab * grad_b) / det
+            step_b = (h_aa * grad_b - h_ab * grad_a) / det
+        else:
+            step_a = grad_a / h_aa
+            step_b = np.zeros_like(b)
+        a -= step_a
+        b -= step_b
+        if max(np.abs(step_a).max(), np.abs(step_b).max()) < 1e-9:
+            break
+    return np.column_stack([a, b])
+
+
+def platt_table(a: float, b: float, p: np.ndarray, knots: int) -> dict[str, list[float]]:
+    """Sample the fitted sigmoid at knots evenly spaced in logit space."""
+    lo, hi = _logit(np.array([np.min(p), np.max(p)]))
+    x = _sigmoid(np.linspace(lo, hi, knots))
+    y = _sigmoid(a * _logit(x) + b)
+    return _table(x, y)
+
+
+def isotonic_table(p: np.ndarray, y: np.ndarray, knots: int) -> dict[str, list[float]]:
+    model = isotonic.IsotonicRegression(y_min=EPS, y_max=1 - EPS, out_of_bounds="clip")
+    model.fit(p, y)
+    x = model.X_thresholds_
+    fitted = model.y_thresholds_
+    if len(x) > knots:
+        # Resample at quantiles of the breakpoints to keep the table compact.
+        grid = np.unique(np.quantile(x, np.linspace(0, 1, knots)))
+        fitted = np.interp(grid, x, fitted)
+        x = grid
+    return _table(x, fitted)
+
+
+def _table(x: np.ndarray, y: np.ndarray) -> dict[str, list[float]]:
+    x = np.round(np.asarray(x, dtype=np.float64), 6)
+    y = np.round(np.clip(np.asarray(y, dtype=np.float64), EPS, 1 - EPS), 6)
+    keep = np.concatenate([[True], np.diff(x) > 0])
+    return {"x": x[keep].tolist(), "y": y[keep].tolist()}
+
+
+def fit_tables(
+    curves: list[tuple[np.ndarray, np.ndarray]], method: str, knots: int = 64
+) -> list[dict[str, list[float]]]:
+    """Fit one calibration table per (prob, label) curve."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown calibration method: {method}")
+    if method == "isotonic":
+        return [isotonic_table(p, y, knots) for p, y in curves]
+    params = fit_platt_batch(curves, fit_bias=method == "platt")
+    return [
+        platt_table(a, b, p, knots) for (a, b), (p, _) in zip(params, curves)
+    ]
+
+
+def apply_table(table: dict[str, list[float]], prob: np.ndarray) -> np.ndarray:
+    return np.interp(prob, table["x"], table["y"])
+
+
+def calibrate_probabilities(calibration: dict, prob: np.ndarray) -> np.ndarray:
+    """Apply a market's calibration to predict_proba-style output.
+
+    Binary markets use `tables[0]` on the positive-class column; multiclass
+    markets map every class column and renormalise rows to sum to 1.
+    """
+    tables = calibration["tables"]
+    prob = np.asarray(prob, dtype=np.float64)
+    if prob.ndim == 2 and prob.shape[1] == len(tables) and len(tables) > 1:
+        mapped = np.column_stack(
+            [apply_table(table, prob[:, idx]) for idx, table in enumerate(tables)]
+        )
+        return mapped / mapped.sum(axis=1, keepdims=True)
+    positive = prob[:, 1] if prob.ndim == 2 else prob
+    calibrated = apply_table(tables[0], positive)
+    if prob.ndim == 2:
+        return np.column_stack([1 - calibrated, calibrated])
+    return calibrated
+
+
+def held_out_rows(calibration: dict, seasons: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """Mask of rows the calibration was not fitted on.
+
+    fit-calibration.py records the fitted rows as the `seasons` range up to
+    and including `fit_until`. Tables written before `fit_until` existed only
+    name their seasons; every row is kept for them (callers should warn when
+    those seasons overlap the rows they score).
+    """
+    seasons = np.asarray(seasons)
+    fit_until = calibration.get("fit_until")
+    if fit_until is None or "seasons" not in calibration:
+        return np.ones(len(seasons), dtype=bool)
+    first, last = calibration["seasons"]
+    days = np.asarray(dates, dtype="datetime64[D]")
+    fitted = (seasons >= first) & (seasons <= last) & (days <= np.datetime64(fit_until, "D"))
+    return ~fitted
+
+
+def overlaps_fit(calibration: dict, seasons: np.ndarray) -> bool:
+    """True when a table without `fit_until` was fitted on any of `seasons`."""
+    if calibration.get("fit_until") is not None or "seasons" not in calibration:
+        return False
+    first, last = calibration["seasons"]
+    seasons = np.asarray(seasons)
+    return bool(((seasons >= first) & (seasons <= last)).any())
@@ -0,0 +1,243 @@
+"""
+Check trained markets for feature drift before scheduling a retrain.
+
+train-markets.py writes `<market>/drift.json` next to metrics.json: reference
+histograms of the rows the final model was fit on, binned on the model's own
+split thresholds (see drift.py). This script streams new feature rows through
+those bins in chunks and scores each feature with PSI and a binned KS
+statistic. A market is flagged for retraining when an important feature
+crosses either threshold; the rest can keep their current model.
+
+`--build-reference` writes drift.json for models trained before it existed,
+streaming the reference seasons (e.g. train + validation) from --input.
+
+Usage:
+    python ml/models/check-drift.py --input recent.csv [--fail-on-drift]
+
+Examples:
+    python ml/models/check-drift.py --from-season 2025
+    python ml/models/check-drift.py --build-reference --to-season 2023
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from drift import DEFAULT_MAX_BINS, DriftAccumulator, ReferenceBuilder
+from instrumentation import add_instrumentation_args, run_report, span
+from model_io import load_booster
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Score feature drift of new rows against training references."
+    )
+    parser.add_argument(
+        "--input",
+        default="ml/data/features/training_with_targets.csv",
+        help="CSV with feature rows (same columns as the training table).",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default="ml/models/output",
+        help="Directory with model.pkl/drift.json per market.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=None,
+        help="Comma-separated market keys (default: every market with a reference).",
+    )
+    parser.add_argument(
+        "--from-season", type=int, default=None, help="First season read from --input."
+    )
+    parser.add_argument(
+        "--to-season", type=int, default=None, help="Last season read from --input."
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Rows per chunk while streaming --input.",
+    )
+    parser.add_argument(
+        "--psi-threshold",
+        type=float,
+        default=0.25,
+        help="PSI at or above which a feature counts as drifted.",
+    )
+    parser.add_argument(
+        "--ks-threshold",
+        type=float,
+        default=0.2,
+        help="Binned KS at or above which a feature counts as drifted.",
+    )
+    parser.add_argument(
+        "--min-importance",
+        type=float,
+        default=0.01,
+        help="Ignore drift in features below this share of split gain.",
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Drift report path (default: <model-dir>/drift_report.json).",
+    )
+    parser.add_argument(
+        "--fail-on-drift",
+        action="store_true",
+        help="Exit with status 1 when any market needs retraining.",
+    )
+    parser.add_argument(
+        "--build-reference",
+        action="store_true",
+        help="Write drift.json from --input instead of checking against it.",
+    )
+    parser.add_argument(
+        "--max-bins",
+        type=int,
+        default=DEFAULT_MAX_BINS,
+        help="Maximum value bins per feature for --build-reference.",
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def stream_rows(args: argparse.Namespace):
+    """Yield --input chunks restricted to the requested seasons."""
+    for chunk in pd.read_csv(args.input, chunksize=args.chunk_size):
+        if args.from_season is not None:
+            chunk = chunk[chunk["season"] >= args.from_season]
+        if args.to_season is not None:
+            chunk = chunk[chunk["season"] <= args.to_season]
+        if not chunk.empty:
+            yield chunk
+
+
+def build_references(model_dir: Path, markets: list[str], args: argparse.Namespace) -> None:
+    builders = {}
+    for market in markets:
+        model_path = model_dir / market / "model.pkl"
+        if not model_path.exists():
+            print(f"⚠️  Skipping {market}: model.pkl missing")
+            continue
+        builders[market] = ReferenceBuilder(load_booster(model_path), args.max_bins)
+    if not builders:
+        raise SystemExit("No trained markets to build references for.")
+
+    with span("scan") as stage:
+        stage.rows = 0
+        seasons = set()
+        for chunk in stream_rows(args):
+            seasons.update(int(season) for season in chunk["season"].unique())
+            for builder in builders.values():
+                builder.update(chunk)
+            stage.rows += len(chunk)
+    if not seasons:
+        raise SystemExit("No rows in the requested seasons.")
+
+    for market, builder in builders.items():
+        reference = builder.result()
+        reference["market"] = market
+        reference["seasons"] = [min(seasons), max(seasons)]
+        (model_dir / market / "drift.json").write_text(json.dumps(reference))
+        print(
+            f"✅ {market}: reference over {reference['rows']} rows, "
+            f"{len(reference['features'])} features"
+        )
+
+
+def market_verdict(scores: dict[str, dict], args: argparse.Namespace) -> dict:
+    drifted = [
+        name
+        for name, score in scores.items()
+        if score["importance"] >= args.min_importance
+        and (score["psi"] >= args.psi_threshold or score["ks"] >= args.ks_threshold)
+    ]
+    weighted = sum(score["psi"] * score["importance"] for score in scores.values())
+    return {
+        "retrain": bool(drifted),
+        "drifted": drifted,
+        "weighted_psi": round(weighted, 6),
+        "max_psi": max((score["psi"] for score in scores.values()), default=0.0),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("check-drift", args):
+        check_drift(args)
+
+
+def check_drift(args: argparse.Namespace) -> None:
+    model_dir = Path(args.model_dir)
+    reference_name = "model.pkl" if args.build_reference else "drift.json"
+    if args.markets:
+        markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    else:
+        markets = sorted(path.parent.name for path in model_dir.glob(f"*/{reference_name}"))
+
+    if args.build_reference:
+        build_references(model_dir, markets, args)
+        return
+
+    accumulators = {}
+    for market in markets:
+        reference_path = model_dir / market / "drift.json"
+        if not reference_path.exists():
+            print(f"⚠️  Skipping {market}: drift.json missing (run --build-reference)")
+            continue
+        accumulators[market] = DriftAccumulator(json.loads(reference_path.read_text()))
+    if not accumulators:
+        raise SystemExit("No markets with a drift reference.")
+
+    with span("scan") as stage:
+        stage.rows = 0
+        for chunk in stream_rows(args):
+            for accumulator in accumulators.values():
+                accumulator.update(chunk)
+            stage.rows += len(chunk)
+    rows = next(iter(accumulators.values())).rows
+    if rows == 0:
+        raise SystemExit("No rows in the requested seasons.")
+
+    report = {
+        "input": str(args.input),
+        "seasons": [args.from_season, args.to_season],
+        "rows": rows,
+        "thresholds": {
+            "psi": args.psi_threshold,
+            "ks": args.ks_threshold,
+            "min_importance": args.min_importance,
+        },
+        "markets": {},
+    }
+    for market, accumulator in accumulators.items():
+        scores = accumulator.result()
+        verdict = market_verdict(scores, args)
+        report["markets"][market] = {
+            **verdict,
+            "reference_seasons": accumulator.reference.get("seasons"),
+            "features": scores,
+        }
+        flag = "🔁 retrain" if verdict["retrain"] else "✅ stable"
+        drifted = ", ".join(verdict["drifted"][:5])
+        print(
+            f"{flag} {market}: max PSI {verdict['max_psi']:.3f}, "
+            f"weighted PSI {verdict['weighted_psi']:.3f}"
+            + (f" ({drifted})" if drifted else "")
+        )
+
+    retrain = [market for market, entry in report["markets"].items() if entry["retrain"]]
+    report["retrain"] = retrain
+    out_path = Path(args.out) if args.out else model_dir / "drift_report.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"✅ Drift report at {out_path} ({len(retrain)}/{len(accumulators)} to retrain)")
+    if args.fail_on_drift and retrain:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Feature drift between a model's training rows and new feature rows.
+
+Reference histograms use the model's own split thresholds as bin edges. These
+thresholds are LightGBM bin boundaries, so the bins are exactly the
+partitions the trees can tell apart: movement inside a bin cannot change a
+prediction, and features the model never splits on are not monitored
+(nor are time-index features such as `season`).
+Features with many thresholds are thinned to at most `max_bins` bins, and
+only real thresholds are kept. Missing values get their own bin, which
+matches how LightGBM routes them.
+
+Drift is scored per feature with:
+- psi  population stability index over the bins (missing bin included)
+- ks   largest gap between the binned CDFs of non-missing values (a lower
+       bound on the exact two-sample KS statistic)
+
+`DriftAccumulator` only keeps bin counts, so new data can be scanned in
+chunks of any size.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_MAX_BINS = 20
+PSI_EPS = 1e-4
+# Time-index features: new rows are out of range by construction, not drift.
+EXCLUDED_FEATURES = ("season",)
+
+
+def split_thresholds(booster) -> dict[str, np.ndarray]:
+    """Sorted unique numerical split thresholds per feature name."""
+    model_json = booster.dump_model()
+    names = model_json["feature_names"]
+    thresholds: dict[str, set[float]] = {}
+    for tree in model_json.get("tree_info", []):
+        stack = [tree["tree_structure"]]
+        while stack:
+            node = stack.pop()
+            if "leaf_value" in node:
+                continue
+            if node.get("decision_type", "<=") == "<=":
+                name = names[node["split_feature"]]
+                thresholds.setdefault(name, set()).add(float(node["threshold"]))
+            stack.append(node["left_child"])
+            stack.append(node["right_child"])
+    return {name: np.array(sorted(values)) for name, values in thresholds.items()}
+
+
+def bin_counts(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Counts per bin (len(edges) + 1 value bins, then the missing bin).
+
+    A value lands in bin i when edges[i-1] < value <= edges[i], which matches
+    LightGBM's `value <= threshold` goes-left rule.
+    """
+    missing = np.isnan(values)
+    bins = np.searchsorted(edges, values[~missing], side="left")
+    counts = np.bincount(bins, minlength=len(edges) + 1)
+    return np.append(counts, missing.sum())
+
+
+def thin_edges(
+    edges: np.ndarray, counts: np.ndarray, max_bins: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge adjacent bins down to at most `max_bins` value bins.
+
+    Kept edges sit at reference-mass quantiles and are always original
+    thresholds; returns the kept edges and the merged counts.
+    """
+    values = counts[:-1]
+    total = values.sum()
+    if len(edges) < max_bins:
+        return edges, counts
+    if total == 0:
+        keep = np.arange(0, len(edges), int(np.ceil(len(edges) / (max_bins - 1))))
+    else:
+        # Quantile level reached at each edge; keep the first edge of every level.
+        levels = np.floor(np.cumsum(values[:-1]) / total * max_bins).astype(int)
+        keep = np.flatnonzero(np.diff(levels, prepend=0) > 0)[: max_bins - 1]
+    merged = np.add.reduceat(values, np.concatenate(([0], keep + 1)))
+    return edges[keep], np.append(merged, counts[-1])
+
+
+def _count_chunk(
+    edges: dict[str, np.ndarray], counts: dict[str, np.ndarray], chunk: pd.DataFrame
+) -> None:
+    for name, feature_edges in edges.items():
+        if name in chunk.columns:
+            values = chunk[name].to_numpy(dtype=np.float64)
+        else:
+            values = np.full(len(chunk), np.nan)
+        counts[name] += bin_counts(values, feature_edges)
+
+
+class ReferenceBuilder:
+    """Streams training rows into a booster's split-threshold bins."""
+
+    def __init__(self, booster, max_bins: int = DEFAULT_MAX_BINS) -> None:
+        self.max_bins = max_bins
+        self.names = booster.feature_name()
+        gain = booster.feature_importance(importance_type="gain")
+        total_gain = float(gain.sum()) or 1.0
+        self.importance = {
+            name: round(float(value) / total_gain, 6)
+            for name, value in zip(self.names, gain)
+        }
+        self.edges = {
+            name: edges
+            for name, edges in split_thresholds(booster).items()
+            if name not in EXCLUDED_FEATURES
+        }
+        self.counts = {
+            name: np.zeros(len(edges) + 2, dtype=np.int64)
+            for name, edges in self.edges.items()
+        }
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        _count_chunk(self.edges, self.counts, chunk)
+
+    def result(self) -> dict:
+        features = {}
+        for name in self.names:
+            if name not in self.edges:
+                continue
+            edges, counts = thin_edges(self.edges[name], self.counts[name], self.max_bins)
+            features[name] = {
+                "importance": self.importance[name],
+                "edges": edges.tolist(),
+                "counts": counts.tolist(),
+            }
+        return {
+            "rows": self.rows,
+            "max_bins": self.max_bins,
+            "features": features,
+            "unused": [name for name in self.names if name not in features],
+        }
+
+
+def reference_histograms(
+    booster,
+    X: pd.DataFrame,
+    max_bins: int = DEFAULT_MAX_BINS,
+) -> dict:
+    """Reference histograms for every feature the booster splits on."""
+    builder = ReferenceBuilder(booster, max_bins)
+    builder.update(X)
+    return builder.result()
+
+
+def psi(expected: np.ndarray, actual: np.ndarray, eps: float = PSI_EPS) -> float:
+    p = np.clip(expected / max(expected.sum(), 1), eps, None)
+    q = np.clip(actual / max(actual.sum(), 1), eps, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """KS statistic on binned CDFs, ignoring the trailing missing bin."""
+    p, q = expected[:-1], actual[:-1]
+    if p.sum() == 0 or q.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(p) / p.sum() - np.cumsum(q) / q.sum())))
+
+
+class DriftAccumulator:
+    """Streams new feature rows into the bins of one reference."""
+
+    def __init__(self, reference: dict) -> None:
+        self.reference = reference
+        self.edges = {
+            name: np.asarray(spec["edges"], dtype=np.float64)
+            for name, spec in reference["features"].items()
+        }
+        self.counts = {
+            name: np.zeros(len(spec["counts"]), dtype=np.int64)
+            for name, spec in reference["features"].items()
+        }
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        _count_chunk(self.edges, self.counts, chunk)
+
+    def result(self) -> dict[str, dict]:
+        """Per-feature psi, ks and missing share, highest psi first."""
+        scores = {}
+        for name, spec in self.reference["features"].items():
+            expected = np.asarray(spec["counts"], dtype=np.float64)
+            actual = self.counts[name].astype(np.float64)
+            scores[name] = {
+                "psi": round(psi(expected, actual), 6),
+                "ks": round(binned_ks(expected, actual), 6),
+                "missing": round(float(actual[-1] / max(actual.sum(), 1)), 6),
+                "importance": spec["importance"],
+            }
+        return dict(sorted(scores.items(), key=lambda item: -item[1]["psi"]))
@@ -1,11 +1,20 @@
 import argparse
 import json
 import math
+import sys
+from dataclasses import dataclass
 from pathlib import Path
 
-import joblib
+import numpy as np
 import pandas as pd
 
+from calibration import calibrate_probabilities, held_out_rows, overlaps_fit
+from feature_store import load_table, prepare_features
+from instrumentation import add_instrumentation_args, run_report, span
+from lazy_imports import lazy_import
+
+joblib = lazy_import("joblib")
+
 
 MARKETS = {
     "1x2": {"target": "result", "type": "multiclass"},
@@ -43,48 +52,46 @@ def parse_args() -> argparse.Namespace:
         "--from-season", type=int, default=None, help="Start season filter."
     )
     parser.add_argument("--to-season", type=int, default=None, help="End season filter.")
+    parser.add_argument(
+        "--calibrated",
+        action="store_true",
+        help=(
+            "Apply each market's calibration.json before scoring (rows it was "
+            "fitted on are left out)."
+        ),
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Bootstrap resamples for confidence intervals (0 = off).",
+    )
+    parser.add_argument(
+        "--ci", type=float, default=0.95, help="Confidence level for intervals."
+    )
+    parser.add_argument(
+        "--compare-dir",
+        default=None,
+        help="Baseline model directory; reports paired deltas (model - baseline).",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Bootstrap seed.")
+    parser.add_argument(
+        "--breakdown",
+        default=None,
+        help="Write a per-(leagueId, season) metric table (CSV) to this path.",
+    )
+    parser.add_argument(
+        "--feature-store",
+        default=None,
+        help=(
+            "Cache the parsed --input as memory-mapped arrays under this directory "
+            "(keyed by file hash) and read it from there on later runs."
+        ),
+    )
+    add_instrumentation_args(parser)
     return parser.parse_args()
 
 
-def prepare_features(df: pd.DataFrame, target_columns: set[str]) -> pd.DataFrame:
-    numeric_df = df.select_dtypes(include=["number"]).copy()
-    drop_cols = [
-        "homeGoals",
-        "awayGoals",
-        "totalGoals",
-        "HTHome",
-        "HTAway",
-        "HomeCorners",
-        "AwayCorners",
-        "HomeYellow",
-        "AwayYellow",
-        "HomeRed",
-        "AwayRed",
-        "fh_goals_total",
-        "sh_goals_total",
-        "home_cards",
-        "away_cards",
-        "total_cards",
-        "home_corners",
-        "away_corners",
-        "total_corners",
-    ]
-    drop_cols.extend(sorted(target_columns))
-    for col in drop_cols:
-        if col in numeric_df.columns:
-            numeric_df = numeric_df.drop(columns=[col])
-    for col in list(numeric_df.columns):
-        if (
-            col.startswith("ou_over_")
-            or col.startswith("total_range_")
-            or col.startswith("home_range_")
-            or col.startswith("away_range_")
-            or col.startswith("clean_sheet_")
-        ):
-            numeric_df = numeric_df.drop(columns=[col])
-    return numeric_df
-
-
 def brier_binary(y_true, prob_yes) -> float:
     return sum((p - y) ** 2 for p, y in zip(prob_yes, y_true)) / len(y_true)
 
@@ -115,6 +122,94 @@ def logloss_multiclass(y_true, prob_rows) -> float:
     return total / len(y_true)
 
 
+def row_losses(y: np.ndarray, prob: np.ndarray, market_type: str) -> np.ndarray:
+    """Per-row (brier, logloss) as a (2, rows) array; means match the functions above."""
+    eps = 1e-12
+    if market_type == "multiclass":
+        actual = np.eye(prob.shape[1])[y]
+        brier = ((prob - actual) ** 2).sum(axis=1)
+        picked = np.clip(prob[np.arange(len(y)), y], eps, 1 - eps)
+        logloss = -np.log(picked)
+    else:
+        p = prob[:, 1]
+        brier = (p - y) ** 2
+        p = np.clip(p, eps, 1 - eps)
+        logloss = -(y * np.log(p) + (1 - y) * np.log(1 - p))
+    return np.vstack([brier, logloss])
+
+
+def bootstrap_means(
+    rows: np.ndarray, resamples: int, seed, max_elements: int = 2_000_000
+) -> np.ndarray:
+    """Means of `rows` (metrics x rows) over bootstrap resamples of the rows.
+
+    Each resample is turned into a vector of row counts (one flat bincount
+    per chunk), and all metrics are averaged with a single matrix product.
+    Every metric sees the same resamples, so paired differences stay paired.
+    Chunks hold at most `max_elements` indices. Returns (metrics, resamples).
+    """
+    rng = np.random.default_rng(seed)
+    n = rows.shape[1]
+    means = np.empty((rows.shape[0], resamples))
+    step = max(1, max_elements // n)
+    for start in range(0, resamples, step):
+        size = min(step, resamples - start)
+        idx = rng.integers(0, n, size=(size, n))
+        idx += (np.arange(size) * n)[:, None]
+        counts = np.bincount(idx.ravel(), minlength=size * n).reshape(size, n)
+        means[:, start : start + size] = rows @ counts.T.astype(np.float64) / n
+    return means
+
+
+def add_bootstrap_intervals(
+    results: list[dict],
+    loss_rows: dict[str, np.ndarray],
+    resamples: int,
+    level: float,
+    seed: int,
+) -> None:
+    """Attach bootstrap intervals to every result with per-row losses.
+
+    Markets scored on the same number of rows share one resampling pass,
+    with their loss rows stacked into a single matrix.
+    """
+    by_size: dict[int, list[str]] = {}
+    for market, rows in loss_rows.items():
+        by_size.setdefault(rows.shape[1], []).append(market)
+
+    by_market = {result["market"]: result for result in results}
+    for group_idx, (size, markets) in enumerate(sorted(by_size.items())):
+        stacked = np.vstack([loss_rows[market] for market in markets])
+        means = bootstrap_means(stacked, resamples, [seed, group_idx])
+        offset = 0
+        for market in markets:
+            result = by_market[market]
+            result["ci"] = {
+                "level": level,
+                "resamples": resamples,
+                "brier": interval(means[offset], level),
+                "logloss": interval(means[offset + 1], level),
+            }
+            if "compare" in result:
+                brier_delta, logloss_delta = means[offset + 2], means[offset + 3]
+                result["compare"].update(
+                    {
+                        "brier_delta_ci": interval(brier_delta, level),
+                        "logloss_delta_ci": interval(logloss_delta, level),
+                        # Share of resamples in which the model beats the baseline.
+                        "p_better_brier": float((brier_delta < 0).mean()),
+                        "p_better_logloss": float((logloss_delta < 0).mean()),
+                    }
+                )
+            offset += loss_rows[market].shape[0]
+
+
+def interval(samples: np.ndarray, level: float) -> list[float]:
+    tail = (1 - level) / 2
+    low, high = np.quantile(samples, [tail, 1 - tail])
+    return [float(low), float(high)]
+
+
 def load_model(model_dir: Path, market: str):
     model_path = model_dir / market / "model.pkl"
     if not model_path.exists():
@@ -132,15 +227,125 @@ def filter_seasons(df: pd.DataFrame, args: argparse.Namespace) -> pd.DataFrame:
     return df
 
 
-def evaluate_market(df: pd.DataFrame, market: str, model_dir: Path) -> dict:
+def load_calibration(model_dir: Path, market: str) -> dict | None:
+    path = model_dir / market / "calibration.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def calibration_holdout(
+    subset: pd.DataFrame, market: str, model_dirs: list[Path]
+) -> pd.DataFrame:
+    """Leave out the rows the markets' calibration tables were fitted on."""
+    keep = np.ones(len(subset), dtype=bool)
+    seasons = subset["season"].to_numpy()
+    for model_dir in model_dirs:
+        calibration = load_calibration(model_dir, market)
+        if calibration is None:
+            continue
+        if overlaps_fit(calibration, seasons):
+            print(
+                f"⚠️  {market}: {model_dir} calibration was fitted on seasons "
+                f"{calibration['seasons']} without a recorded cut-off; calibrated "
+                "metrics on those seasons are in-sample (re-run fit-calibration.py)",
+                file=sys.stderr,
+            )
+        keep &= held_out_rows(
+            calibration, seasons, pd.to_datetime(subset["date"]).to_numpy()
+        )
+    return subset[keep]
+
+
+BREAKDOWN_KEYS = ["leagueId", "season"]
+
+
+@dataclass
+class MarketLosses:
+    rows: np.ndarray  # metrics x rows, see row_losses
+    index: pd.Index  # df rows the losses belong to
+    metrics: list[str]
+
+
+def metric_cube(df: pd.DataFrame, losses: dict[str, MarketLosses]) -> pd.DataFrame:
+    """Tidy metric table: one row per market x leagueId x season.
+
+    Loss sums for every (leagueId, season) group come from one bincount per
+    metric over the per-row losses. Per-league, per-season and overall
+    rollups (key "all") are summed from those groups rather than the rows.
+    """
+    tables = []
+    for market, item in losses.items():
+        keys = df.loc[item.index, BREAKDOWN_KEYS].fillna(-1).astype(np.int64)
+        codes, groups = pd.MultiIndex.from_frame(keys).factorize()
+        sums = pd.DataFrame(
+            {
+                metric: np.bincount(codes, weights=values, minlength=len(groups))
+                for metric, values in zip(item.metrics, item.rows)
+            }
+        )
+        sums.insert(0, "rows", np.bincount(codes, minlength=len(groups)))
+        for level, key in enumerate(BREAKDOWN_KEYS):
+            sums.insert(level, key, groups.get_level_values(level).astype(str))
+
+        value_columns = ["rows", *item.metrics]
+        by_league = sums.groupby("leagueId", as_index=False)[value_columns].sum()
+        by_league["season"] = "all"
+        by_season = sums.groupby("season", as_index=False)[value_columns].sum()
+        by_season["leagueId"] = "all"
+        total = sums[value_columns].sum().to_frame().T
+        total["leagueId"] = "all"
+        total["season"] = "all"
+
+        table = pd.concat([sums, by_league, by_season, total], ignore_index=True)
+        table[item.metrics] = table[item.metrics].div(table["rows"], axis=0)
+        table.insert(0, "market", market)
+        tables.append(table)
+
+    cube = pd.concat(tables, ignore_index=True)
+    cube["rows"] = cube["rows"].astype(np.int64)
+    return cube.sort_values(["market", *BREAKDOWN_KEYS], ignore_index=True)
+
+
+def predict_market(
+    model_dir: Path, market: str, X: pd.DataFrame, calibrated: bool
+) -> tuple[np.ndarray, dict | None]:
+    prob = load_model(model_dir, market).predict_proba(X)
+    calibration = load_calibration(model_dir, market) if calibrated else None
+    if calibration is not None:
+        prob = calibrate_probabilities(calibration, prob)
+    return prob, calibration
+
+
+def evaluate_market(
+    df: pd.DataFrame,
+    market: str,
+    model_dir: Path,
+    *,
+    calibrated: bool = False,
+    compare_dir: Path | None = None,
+    loss_rows: bool = False,
+) -> tuple[dict, MarketLosses | None]:
+    """Score one market; optionally also return per-row losses.
+
+    Rows are (brier, logloss) plus, with `compare_dir`, the paired per-row
+    deltas against the baseline model, for bootstrap resampling and the
+    breakdown table.
+    """
     if market not in MARKETS:
-        return {"market": market, "status": "skipped", "reason": "unknown market"}
+        return {"market": market, "status": "skipped", "reason": "unknown market"}, None
 
     target = MARKETS[market]["target"]
     market_type = MARKETS[market]["type"]
     subset = df[df[target].notna()].copy()
     if subset.empty:
-        return {"market": market, "status": "skipped", "reason": "empty target"}
+        return {"market": market, "status": "skipped", "reason": "empty target"}, None
+    if calibrated:
+        dirs = [model_dir] if compare_dir is None else [model_dir, compare_dir]
+        subset = calibration_holdout(subset, market, dirs)
+        if subset.empty:
+            reason = "every row was used to fit the calibration"
+            return {"market": market, "status": "skipped", "reason": reason}, None
 
     if market_type == "multiclass":
         subset = subset[subset[target].isin(["HOME", "DRAW", "AWAY"])]
@@ -150,36 +355,99 @@ def evaluate_market(df: pd.DataFrame, market: str, model_dir: Path) -> dict:
         y = subset[target].astype(int).tolist()
 
     target_columns = {config["target"] for config in MARKETS.values()}
-    X = prepare_features(subset, target_columns)
-
-    model = load_model(model_dir, market)
-    prob = model.predict_proba(X)
-
-    if market_type == "multiclass":
-        brier = brier_multiclass(y, prob.tolist())
-        loss = logloss_multiclass(y, prob.tolist())
-    else:
-        prob_yes = [row[1] for row in prob]
-        brier = brier_binary(y, prob_yes)
-        loss = logloss_binary(y, prob_yes)
-
-    return {
+    with span("prepare") as stage:
+        X = prepare_features(subset, target_columns)
+        stage.rows = len(X)
+
+    with span("predict") as stage:
+        prob, calibration = predict_market(model_dir, market, X, calibrated)
+        stage.rows = len(X)
+
+    with span("metrics"):
+        if market_type == "multiclass":
+            brier = brier_multiclass(y, prob.tolist())
+            loss = logloss_multiclass(y, prob.tolist())
+        else:
+            prob_yes = [row[1] for row in prob]
+            brier = brier_binary(y, prob_yes)
+            loss = logloss_binary(y, prob_yes)
+
+    result = {
         "market": market,
         "status": "ok",
         "rows": len(y),
         "brier": brier,
         "logloss": loss,
+        "calibration": calibration["method"] if calibration is not None else None,
     }
+    if not loss_rows and compare_dir is None:
+        return result, None
+
+    # Per-row losses are computed once; resampling never re-runs prediction.
+    y_array = np.asarray(y)
+    rows = row_losses(y_array, prob, market_type)
+    metrics = ["brier", "logloss"]
+    if compare_dir is not None:
+        with span("predict_baseline"):
+            base_prob, _ = predict_market(compare_dir, market, X, calibrated)
+        deltas = rows - row_losses(y_array, base_prob, market_type)
+        result["compare"] = {
+            "model_dir": str(compare_dir),
+            "brier_delta": float(deltas[0].mean()),
+            "logloss_delta": float(deltas[1].mean()),
+        }
+        rows = np.vstack([rows, deltas])
+        metrics += ["brier_delta", "logloss_delta"]
+    return result, MarketLosses(rows, subset.index, metrics)
 
 
 def main() -> None:
     args = parse_args()
-    df = pd.read_csv(args.input)
-    df = filter_seasons(df, args)
+    with run_report("evaluate-offline", args):
+        evaluate(args)
+
+
+def evaluate(args: argparse.Namespace) -> None:
+    with span("load") as stage:
+        df = load_table(args.input, args.feature_store)
+        df = filter_seasons(df, args)
+        stage.rows = len(df)
 
     markets = [m.strip() for m in args.markets.split(",") if m.strip()]
     model_dir = Path(args.model_dir)
-    results = [evaluate_market(df, m, model_dir) for m in markets]
+    compare_dir = Path(args.compare_dir) if args.compare_dir else None
+    results = []
+    losses = {}
+    for market in markets:
+        with span(f"market:{market}"):
+            result, market_losses = evaluate_market(
+                df,
+                market,
+                model_dir,
+                calibrated=args.calibrated,
+                compare_dir=compare_dir,
+                loss_rows=args.bootstrap > 0 or args.breakdown is not None,
+            )
+        results.append(result)
+        if market_losses is not None:
+            losses[market] = market_losses
+
+    if args.bootstrap > 0 and losses:
+        with span("bootstrap", resamples=args.bootstrap):
+            add_bootstrap_intervals(
+                results,
+                {market: item.rows for market, item in losses.items()},
+                args.bootstrap,
+                args.ci,
+                args.seed,
+            )
+    if args.breakdown is not None and losses:
+        with span("breakdown") as stage:
+            cube = metric_cube(df, losses)
+            out_path = Path(args.breakdown)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            cube.to_csv(out_path, index=False, float_format="%.6f")
+            stage.rows = len(cube)
     print(json.dumps(results, indent=2))
 
 
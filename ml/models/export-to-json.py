@@ -9,20 +9,31 @@ The export is MINIFIED to reduce bundle size for Cloudflare Workers:
 - Removes training diagnostics (gain, weights, counts)
 - Removes debug identifiers (split_index, leaf_index)
 
+--bundle PATH writes all exported markets into one bundle file instead of
+per-market model.json files (see build_bundle for the layout).
+
+If fit-calibration.py has written `<market>/calibration.json`, its lookup
+tables are embedded under a top-level "calibration" key (disable with
+--no-calibration).
+
 Usage:
-    python ml/models/export-to-json.py [--markets MARKETS] [--no-minify]
+    python ml/models/export-to-json.py [--markets MARKETS] [--no-minify] [--no-calibration]
 
 Examples:
     python ml/models/export-to-json.py
     python ml/models/export-to-json.py --markets 1x2,btts
     python ml/models/export-to-json.py --no-minify  # Keep all fields
+    python ml/models/export-to-json.py --bundle ml/models/output/models.bundle.txt
 """
 
 import argparse
 import json
 from pathlib import Path
 
-import joblib
+from instrumentation import add_instrumentation_args, run_report, span
+from lazy_imports import lazy_import
+
+joblib = lazy_import("joblib")
 
 
 # Markets to export by default
@@ -42,6 +53,9 @@ DEFAULT_MARKETS = [
 KEEP_SPLIT_FIELDS = {"split_feature", "threshold", "default_left", "left_child", "right_child"}
 KEEP_LEAF_FIELDS = {"leaf_value"}
 
+BUNDLE_FORMAT = "lgbm-bundle"
+BUNDLE_VERSION = 1
+
 
 def minify_node(node: dict) -> dict:
     """
@@ -89,6 +103,61 @@ def minify_tree_info(tree_info: list) -> list:
     return minified_trees
 
 
+def bundle_section(output: dict) -> str:
+    """Serialize the part of a model that lives in the bundle body."""
+    section = {
+        key: value
+        for key, value in output.items()
+        if key not in ("metadata", "feature_names")
+    }
+    return json.dumps(section, separators=(",", ":"))
+
+
+def build_bundle(sections: dict[str, tuple[dict, str]]) -> str:
+    """
+    Combine exported markets into a single bundle.
+
+    Layout: one header line of JSON, then every market section concatenated.
+    The header holds a shared feature dictionary and, per market, its
+    metadata, feature indices into the dictionary and the section's
+    offset/length relative to the start of the body. Output is ASCII
+    (json.dumps escapes everything else), so character and byte offsets
+    agree and the runtime can decode one market without touching the rest.
+    """
+    features: list[str] = []
+    feature_ids: dict[str, int] = {}
+    markets = {}
+    offset = 0
+    for market, (output, section) in sections.items():
+        ids = []
+        for name in output["feature_names"]:
+            if name not in feature_ids:
+                feature_ids[name] = len(features)
+                features.append(name)
+            ids.append(feature_ids[name])
+        metadata = {
+            key: value
+            for key, value in output["metadata"].items()
+            if key != "feature_names"
+        }
+        markets[market] = {
+            "offset": offset,
+            "length": len(section),
+            "metadata": metadata,
+            "features": ids,
+        }
+        offset += len(section)
+
+    header = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "features": features,
+        "markets": markets,
+    }
+    body = "".join(section for _, section in sections.values())
+    return json.dumps(header, separators=(",", ":")) + "\n" + body
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Export LightGBM models to JSON format."
@@ -108,37 +177,34 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Disable minification (keep all fields).",
     )
+    parser.add_argument(
+        "--no-calibration",
+        action="store_true",
+        help="Do not embed calibration tables from calibration.json.",
+    )
+    parser.add_argument(
+        "--bundle",
+        default=None,
+        help="Write one multi-market bundle to this path instead of model.json files.",
+    )
+    add_instrumentation_args(parser)
     return parser.parse_args()
 
 
-def export_model(model_dir: Path, market: str, *, minify: bool = True) -> dict:
-    """Export a single model to JSON format.
+def export_booster(
+    booster, market: str, *, minify: bool = True, model_json: dict | None = None
+) -> dict:
+    """Build the exported JSON structure for a LightGBM booster.
     
     Args:
-        model_dir: Directory containing model subdirectories
-        market: Market name (e.g., "1x2", "btts")
+        booster: Trained lightgbm.Booster
+        market: Market name stored in metadata
         minify: If True, strip unnecessary fields to reduce size
-    
-    Returns:
-        Dict with model data, or None if model not found
+        model_json: Existing booster.dump_model() output to reuse
     """
-    model_path = model_dir / market / "model.pkl"
-    
-    if not model_path.exists():
-        print(f"⚠️  Model not found: {model_path}")
-        return None
-    
-    print(f"📦 Loading model: {market}")
-    model = joblib.load(model_path)
-    
-    # Get the booster from the model
-    if hasattr(model, "booster_"):
-        booster = model.booster_
-    else:
-        booster = model
-    
     # Dump the model to JSON format
-    model_json = booster.dump_model()
+    if model_json is None:
+        model_json = booster.dump_model()
     
     # Extract feature names
     feature_names = model_json.get("feature_names", [])
@@ -161,44 +227,102 @@ def export_model(model_dir: Path, market: str, *, minify: bool = True) -> dict:
     }
     
     # Create output structure
-    output = {
+    return {
         "metadata": metadata,
         "tree_info": tree_info,
         "feature_names": feature_names,
     }
+
+
+def export_model(
+    model_dir: Path, market: str, *, minify: bool = True, calibration: bool = True
+) -> dict:
+    """Export a single model to JSON format.
+    
+    Args:
+        model_dir: Directory containing model subdirectories
+        market: Market name (e.g., "1x2", "btts")
+        minify: If True, strip unnecessary fields to reduce size
+        calibration: If True, embed calibration.json tables when present
+    
+    Returns:
+        Dict with model data, or None if model not found
+    """
+    model_path = model_dir / market / "model.pkl"
+    
+    if not model_path.exists():
+        print(f"⚠️  Model not found: {model_path}")
+        return None
+    
+    print(f"📦 Loading model: {market}")
+    model = joblib.load(model_path)
+    
+    # Get the booster from the model
+    if hasattr(model, "booster_"):
+        booster = model.booster_
+    else:
+        booster = model
+    
+    output = export_booster(booster, market, minify=minify)
+
+    calibration_path = model_dir / market / "calibration.json"
+    if calibration and calibration_path.exists():
+        fitted = json.loads(calibration_path.read_text())
+        output["calibration"] = {
+            "method": fitted["method"],
+            "tables": fitted["tables"],
+        }
     
     return output
 
 
 def main() -> None:
     args = parse_args()
+    with run_report("export-to-json", args):
+        export_models(args)
+
+
+def export_models(args: argparse.Namespace) -> None:
     model_dir = Path(args.model_dir)
     markets = [m.strip() for m in args.markets.split(",") if m.strip()]
     minify = not args.no_minify
+    calibration = not args.no_calibration
+    bundle_path = Path(args.bundle) if args.bundle else None
     
     print(f"🚀 Exporting models: {markets}")
     print(f"📁 Model directory: {model_dir}")
     print(f"🗜️  Minification: {'ENABLED' if minify else 'DISABLED'}")
     
     results = []
+    sections: dict[str, tuple[dict, str]] = {}
     
     for market in markets:
-        output = export_model(model_dir, market, minify=minify)
-        if output is None:
-            continue
-        
-        # Write JSON file (no indent when minified for smaller size)
-        output_path = model_dir / market / "model.json"
-        if minify:
-            # Compact JSON without whitespace
-            output_path.write_text(json.dumps(output, separators=(',', ':')))
-        else:
-            # Pretty-printed JSON for debugging
-            output_path.write_text(json.dumps(output, indent=2))
+        with span(f"market:{market}") as stage:
+            output = export_model(
+                model_dir, market, minify=minify, calibration=calibration
+            )
+            if output is None:
+                continue
+
+            if bundle_path is not None:
+                section = bundle_section(output)
+                sections[market] = (output, section)
+                json_size = len(section) / 1024
+            else:
+                # Write JSON file (no indent when minified for smaller size)
+                output_path = model_dir / market / "model.json"
+                if minify:
+                    # Compact JSON without whitespace
+                    output_path.write_text(json.dumps(output, separators=(',', ':')))
+                else:
+                    # Pretty-printed JSON for debugging
+                    output_path.write_text(json.dumps(output, indent=2))
+                json_size = output_path.stat().st_size / 1024
+            stage.meta["num_trees"] = output["metadata"]["num_trees"]
+            stage.meta["calibrated"] = "calibration" in output
         
         # Calculate sizes
         pkl_size = (model_dir / market / "model.pkl").stat().st_size / 1024
-        json_size = output_path.stat().st_size / 1024
         
         results.append({
             "market": market,
@@ -208,9 +332,14 @@ def main() -> None:
             "json_size_kb": round(json_size, 1),
         })
         
+        calibrated = (
+            f", {output['calibration']['method']} calibration"
+            if "calibration" in output
+            else ""
+        )
         print(f"✅ Exported {market}: {output['metadata']['num_trees']} trees, "
               f"{len(output['feature_names'])} features, "
-              f"{round(json_size, 1)}KB")
+              f"{round(json_size, 1)}KB{calibrated}")
     
     # Print summary
     print("\n📊 Export Summary:")
@@ -221,6 +350,13 @@ def main() -> None:
               f"{r['num_features']:3} features | {r['json_size_kb']:8.1f} KB")
     print("-" * 60)
     print(f"  {'TOTAL':12} | {' '*4}       | {' '*3}          | {total_json_size:8.1f} KB")
+
+    if bundle_path is not None and sections:
+        with span("bundle"):
+            bundle_path.parent.mkdir(parents=True, exist_ok=True)
+            bundle_path.write_text(build_bundle(sections))
+        print(f"\n📦 Bundle: {bundle_path} ({len(sections)} markets, "
+              f"{bundle_path.stat().st_size / 1024:.1f} KB)")
     
     if minify:
         print("\n💡 Models are minified. Use --no-minify to keep all fields.")
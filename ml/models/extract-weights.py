@@ -2,54 +2,17 @@ import argparse
 import json
 from pathlib import Path
 
-import joblib
+import numpy as np
 import pandas as pd
 
+from factor_weights import contrib_weights_by_market, group_feature, normalize_weights
+from feature_store import open_store
+from instrumentation import add_instrumentation_args, run_report, span
+from lazy_imports import lazy_import
+from model_io import load_market_spec
+from permutation_importance import permutation_importances
 
-FACTOR_GROUPS = {
-    "form": {
-        "homeFormScore",
-        "awayFormScore",
-        "homePPG10",
-        "awayPPG10",
-    },
-    "attackStrength": {
-        "homeGF10",
-        "awayGF10",
-    },
-    "defenseStrength": {
-        "homeGA10",
-        "awayGA10",
-    },
-    "homeAwayStrength": {
-        "homeHomeFormScore",
-        "awayAwayFormScore",
-    },
-    "rest": {
-        "homeDaysSince",
-        "awayDaysSince",
-    },
-    "meta": {
-        "season",
-        "leagueId",
-    },
-}
-
-
-def normalize_weights(raw: dict[str, float]) -> dict[str, float]:
-    total = sum(raw.values())
-    if total <= 0:
-        return {k: 0.0 for k in raw}
-    return {k: round(v / total, 6) for k, v in raw.items()}
-
-
-def group_feature(feature: str) -> str:
-    if feature.startswith("h2h_"):
-        return "h2h"
-    for group, members in FACTOR_GROUPS.items():
-        if feature in members:
-            return group
-    return "other"
+joblib = lazy_import("joblib")
 
 
 def extract_model_weights(model_path: Path) -> dict[str, float]:
@@ -64,6 +27,104 @@ def extract_model_weights(model_path: Path) -> dict[str, float]:
     return normalize_weights(grouped)
 
 
+def load_sample(
+    input_path: Path,
+    sample_rows: int,
+    seed: int,
+    from_season: int | None = None,
+    chunk_size: int = 100_000,
+    store_root: str | None = None,
+) -> pd.DataFrame:
+    """Uniformly sample rows from a CSV without loading it whole.
+
+    Every row gets a random key and the `sample_rows` smallest keys are kept
+    while streaming, so memory is bounded by sample size plus one chunk.
+    With a feature store the keys are drawn from the same generator in one
+    call over the season column, so the same rows are selected without
+    parsing the CSV, and only those rows are read from the store.
+    """
+    rng = np.random.default_rng(seed)
+    if store_root is not None:
+        store = open_store(input_path, store_root)
+        seasons = store.meta("season")
+        if from_season is not None:
+            positions = np.flatnonzero(seasons >= from_season)
+        else:
+            positions = np.arange(len(seasons))
+        keys = rng.random(len(positions))
+        chosen = np.argsort(keys, kind="stable")[:sample_rows]
+        return store.frame(np.sort(positions[chosen]))
+    sample: pd.DataFrame | None = None
+    # Keys live beside the sample rather than as a column: inserting one into
+    # every chunk of the wide targets table fragments it.
+    keys = np.empty(0)
+    offset = 0
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        if from_season is not None:
+            chunk = chunk[chunk["season"] >= from_season]
+        sample = chunk if sample is None else pd.concat([sample, chunk])
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(keys) > sample_rows:
+            keep = np.argpartition(keys, sample_rows - 1)[:sample_rows]
+            sample, keys = sample.iloc[keep], keys[keep]
+    if sample is None:
+        return pd.DataFrame()
+    return sample.sort_index()
+
+
+def extract_contrib_weights(
+    model_paths: dict[str, Path], args: argparse.Namespace
+) -> dict[str, dict[str, float]]:
+    with span("sample") as stage:
+        sample = load_sample(
+            Path(args.input),
+            args.sample_rows,
+            args.seed,
+            args.from_season,
+            store_root=args.feature_store,
+        )
+        stage.rows = len(sample)
+    return contrib_weights_by_market(
+        model_paths, sample, args.batch_size, args.workers, args.spill_dir
+    )
+
+
+def extract_permutation_weights(
+    model_dir: Path, markets: list[str], args: argparse.Namespace
+) -> dict[str, dict[str, float]]:
+    specs = [
+        spec
+        for spec in (load_market_spec(model_dir, market) for market in markets)
+        if spec is not None
+    ]
+    with span("sample") as stage:
+        sample = load_sample(
+            Path(args.input),
+            args.sample_rows,
+            args.seed,
+            args.from_season,
+            store_root=args.feature_store,
+        )
+        stage.rows = len(sample)
+    with span("permute", markets=len(specs), workers=args.workers):
+        raw = permutation_importances(
+            sample,
+            specs,
+            group_feature,
+            repeats=args.repeats,
+            seed=args.seed,
+            workers=args.workers,
+            spill_dir=args.spill_dir,
+        )
+    # Groups whose shuffling does not hurt the loss carry no weight.
+    return {
+        market: normalize_weights({g: max(v, 0.0) for g, v in groups.items()})
+        for market, groups in raw.items()
+    }
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Extract grouped factor weights from LightGBM models."
@@ -83,11 +144,72 @@ def parse_args() -> argparse.Namespace:
         default="all",
         help="Comma-separated market keys or 'all'.",
     )
+    parser.add_argument(
+        "--method",
+        choices=["split", "contrib", "permutation"],
+        default="split",
+        help=(
+            "split = split-count importances; contrib = mean |SHAP| via "
+            "pred_contrib; permutation = loss increase when a group is shuffled."
+        ),
+    )
+    parser.add_argument(
+        "--input",
+        default="ml/data/features/training_with_targets.csv",
+        help="Training table sampled by --method contrib/permutation.",
+    )
+    parser.add_argument(
+        "--from-season",
+        type=int,
+        default=None,
+        help="Only sample rows from this season on (e.g. held-out seasons).",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Shuffles per factor group for --method permutation.",
+    )
+    parser.add_argument(
+        "--sample-rows",
+        type=int,
+        default=20_000,
+        help="Rows sampled from --input for contributions.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=2_048,
+        help="Rows per pred_contrib call (bounds peak memory).",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes for markets in parallel."
+    )
+    parser.add_argument(
+        "--spill-dir",
+        default=None,
+        help="Share worker data via memory-mapped files here instead of /dev/shm.",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Sampling seed.")
+    parser.add_argument(
+        "--feature-store",
+        default=None,
+        help=(
+            "Cache the parsed --input as memory-mapped arrays under this directory "
+            "(keyed by file hash) and read it from there on later runs."
+        ),
+    )
+    add_instrumentation_args(parser)
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    with run_report("extract-weights", args):
+        extract_weights(args)
+
+
+def extract_weights(args: argparse.Namespace) -> None:
     model_dir = Path(args.model_dir)
 
     if args.markets == "all":
@@ -97,12 +219,22 @@ def main() -> None:
     else:
         markets = [m.strip() for m in args.markets.split(",") if m.strip()]
 
-    results: dict[str, dict[str, float]] = {}
-    for market in markets:
-        model_path = model_dir / market / "model.pkl"
-        if not model_path.exists():
-            continue
-        results[market] = extract_model_weights(model_path)
+    model_paths = {
+        market: model_dir / market / "model.pkl"
+        for market in markets
+        if (model_dir / market / "model.pkl").exists()
+    }
+
+    with span(args.method, markets=len(model_paths)):
+        if args.method == "contrib":
+            results = extract_contrib_weights(model_paths, args)
+        elif args.method == "permutation":
+            results = extract_permutation_weights(model_dir, list(model_paths), args)
+        else:
+            results = {
+                market: extract_model_weights(path)
+                for market, path in model_paths.items()
+            }
 
     out_path = Path(args.out)
     out_path.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,134 @@
+"""
+Factor groups and pred_contrib-based group weights for extract-weights.py.
+
+`contrib_weights_by_market` fans markets out over a process pool; the sample
+is placed in shared memory once (see shared_dataset.py). The pool's worker
+functions live here rather than in the script so spawned workers can import
+them by name.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+from shared_dataset import SharedDataset, SharedDatasetHandle, attach
+
+joblib = lazy_import("joblib")
+
+
+FACTOR_GROUPS = {
+    "form": {
+        "homeFormScore",
+        "awayFormScore",
+        "homePPG10",
+        "awayPPG10",
+    },
+    "attackStrength": {
+        "homeGF10",
+        "awayGF10",
+    },
+    "defenseStrength": {
+        "homeGA10",
+        "awayGA10",
+    },
+    "homeAwayStrength": {
+        "homeHomeFormScore",
+        "awayAwayFormScore",
+    },
+    "rest": {
+        "homeDaysSince",
+        "awayDaysSince",
+    },
+    "meta": {
+        "season",
+        "leagueId",
+    },
+}
+
+
+def normalize_weights(raw: dict[str, float]) -> dict[str, float]:
+    total = sum(raw.values())
+    if total <= 0:
+        return {k: 0.0 for k in raw}
+    return {k: round(v / total, 6) for k, v in raw.items()}
+
+
+def group_feature(feature: str) -> str:
+    if feature.startswith("h2h_"):
+        return "h2h"
+    for group, members in FACTOR_GROUPS.items():
+        if feature in members:
+            return group
+    return "other"
+
+
+def contrib_weights(model_path: Path, sample: pd.DataFrame, batch_size: int) -> dict[str, float]:
+    """Group mean |SHAP| contributions from LightGBM's native pred_contrib."""
+    model = joblib.load(model_path)
+    booster = model.booster_ if hasattr(model, "booster_") else model
+    feature_names = booster.feature_name()
+    num_features = len(feature_names)
+
+    abs_sum = np.zeros(num_features, dtype=np.float64)
+    rows = 0
+    for start in range(0, len(sample), batch_size):
+        batch = sample.iloc[start : start + batch_size]
+        X = batch.reindex(columns=feature_names).to_numpy(dtype=np.float64)
+        contrib = booster.predict(X, pred_contrib=True)
+        # Multiclass output is [class0 features + bias, class1 ..., ...].
+        contrib = contrib.reshape(len(X), -1, num_features + 1)[:, :, :num_features]
+        abs_sum += np.abs(contrib).sum(axis=(0, 1))
+        rows += len(X)
+
+    if rows == 0:
+        return {}
+
+    groups = [group_feature(feature) for feature in feature_names]
+    group_names = list(dict.fromkeys(groups))
+    group_index = np.array([group_names.index(group) for group in groups])
+    totals = np.bincount(group_index, weights=abs_sum / rows, minlength=len(group_names))
+    return normalize_weights(
+        {group: float(total) for group, total in zip(group_names, totals)}
+    )
+
+
+_WORKER_SAMPLE: pd.DataFrame | None = None
+
+
+def _init_worker(handle: SharedDatasetHandle) -> None:
+    global _WORKER_SAMPLE
+    _WORKER_SAMPLE = attach(handle).frame()
+
+
+def _contrib_worker(model_path: Path, batch_size: int) -> dict[str, float]:
+    return contrib_weights(model_path, _WORKER_SAMPLE, batch_size)
+
+
+def contrib_weights_by_market(
+    model_paths: dict[str, Path],
+    sample: pd.DataFrame,
+    batch_size: int,
+    workers: int = 1,
+    spill_dir: str | None = None,
+) -> dict[str, dict[str, float]]:
+    if workers <= 1:
+        return {
+            market: contrib_weights(path, sample, batch_size)
+            for market, path in model_paths.items()
+        }
+
+    # The sample lives in shared memory; workers attach it instead of unpickling a copy.
+    columns = list(sample.select_dtypes(include=["number"]).columns)
+    with SharedDataset.from_frame(
+        sample, columns, season_column=None, directory=spill_dir
+    ) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared.handle,)
+    ) as pool:
+        futures = {
+            market: pool.submit(_contrib_worker, path, batch_size)
+            for market, path in model_paths.items()
+        }
+        return {market: future.result() for market, future in futures.items()}
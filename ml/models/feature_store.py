@@ -0,0 +1,257 @@
+"""
+Shared feature preparation and a persistent memory-mapped feature store.
+
+`prepare_features` is the single definition of which columns of
+training_with_targets.csv are model inputs; train-markets.py and
+evaluate-offline.py both use it.
+
+The feature store materializes a parsed training table once as `.npy` files:
+
+    <root>/<key>/
+        manifest.json       columns, targets, categories, source, key parts
+        X.npy               float64 prepared feature matrix (rows x features)
+        targets/<name>.npy  target columns (string targets as float codes)
+        meta/<name>.npy     row metadata (date, season, leagueId)
+
+The key is a SHA-256 of the input file's bytes plus the drop rules below, so
+editing the CSV or the rules builds a new entry and an unchanged input is
+opened with `np.load(mmap_mode="r")` instead of being re-parsed.
+`load_table` rebuilds a DataFrame with the same numeric columns, targets and
+metadata that scripts read from the CSV (free-text columns such as team names
+are not kept).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+STORE_VERSION = 1
+
+# Result columns and raw match stats that must never be used as features.
+DROP_COLUMNS = [
+    "homeGoals",
+    "awayGoals",
+    "totalGoals",
+    "HTHome",
+    "HTAway",
+    "HomeCorners",
+    "AwayCorners",
+    "HomeYellow",
+    "AwayYellow",
+    "HomeRed",
+    "AwayRed",
+    "fh_goals_total",
+    "sh_goals_total",
+    "home_cards",
+    "away_cards",
+    "total_cards",
+    "home_corners",
+    "away_corners",
+    "total_corners",
+    # Bookmaker odds (carried for backtest-markets.py).
+    "OddHome",
+    "OddDraw",
+    "OddAway",
+    "MaxHome",
+    "MaxDraw",
+    "MaxAway",
+    "Over25",
+    "Under25",
+    "MaxOver25",
+    "MaxUnder25",
+]
+DROP_PREFIXES = (
+    "ou_over_",
+    "total_range_",
+    "home_range_",
+    "away_range_",
+    "clean_sheet_",
+)
+# Targets not covered by the rules above (string targets are non-numeric and
+# never features, but the store keeps them as targets).
+BASE_TARGETS = ["result", "btts_yes", "fh_result"]
+META_COLUMNS = ["date", "season", "leagueId"]
+
+
+def prepare_features(df: pd.DataFrame, target_columns: set[str]) -> pd.DataFrame:
+    numeric_df = df.select_dtypes(include=["number"]).copy()
+    drop_cols = list(DROP_COLUMNS)
+    drop_cols.extend(sorted(target_columns))
+    for col in drop_cols:
+        if col in numeric_df.columns:
+            numeric_df = numeric_df.drop(columns=[col])
+    for col in list(numeric_df.columns):
+        if col.startswith(DROP_PREFIXES):
+            numeric_df = numeric_df.drop(columns=[col])
+    return numeric_df
+
+
+def rules_fingerprint() -> dict:
+    return {
+        "version": STORE_VERSION,
+        "drop_columns": DROP_COLUMNS,
+        "drop_prefixes": list(DROP_PREFIXES),
+        "base_targets": BASE_TARGETS,
+    }
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_key(input_path: Path) -> str:
+    rules = json.dumps(rules_fingerprint(), sort_keys=True).encode()
+    digest = hashlib.sha256(file_digest(input_path).encode() + rules)
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class FeatureStore:
+    path: Path
+    manifest: dict
+
+    @property
+    def X(self) -> np.ndarray:
+        return np.load(self.path / "X.npy", mmap_mode="r")
+
+    @property
+    def columns(self) -> list[str]:
+        return self.manifest["columns"]
+
+    def target(self, name: str, rows: np.ndarray | None = None) -> np.ndarray:
+        """Target values; string targets are decoded to an object array."""
+        values = np.load(self.path / "targets" / f"{name}.npy", mmap_mode="r")
+        if rows is not None:
+            values = values[rows]
+        categories = self.manifest["categories"].get(name)
+        if categories is None:
+            return values
+        labels = np.array(categories + [np.nan], dtype=object)
+        codes = np.where(np.isnan(values), len(categories), values).astype(np.int64)
+        return labels[codes]
+
+    def meta(self, name: str) -> np.ndarray:
+        return np.load(self.path / "meta" / f"{name}.npy", mmap_mode="r")
+
+    def frame(self, rows: np.ndarray | None = None) -> pd.DataFrame:
+        """Features, targets and metadata as one DataFrame.
+
+        Columns come back in CSV order and integer columns get their dtype back,
+        so downstream `prepare_features` output matches the CSV path. With
+        `rows` (sorted row positions) only those rows are read from the
+        memory-mapped arrays, and they keep their positions as index.
+        """
+        X = self.X if rows is None else self.X[rows]
+        position = {name: idx for idx, name in enumerate(self.columns)}
+        integers = set(self.manifest["integer_columns"])
+        data = {}
+        for name in self.manifest["order"]:
+            if name in self.manifest["meta"]:
+                values = self.meta(name)
+                data[name] = values if rows is None else values[rows]
+            elif name in position:
+                values = X[:, position[name]]
+                data[name] = values.astype(np.int64) if name in integers else values
+            else:
+                values = self.target(name, rows)
+                data[name] = values.astype(np.int64) if name in integers else values
+        return pd.DataFrame(data, index=rows)
+
+
+def build_store(df: pd.DataFrame, path: Path, manifest: dict) -> None:
+    """Write `df` as a store entry at `path` (atomically, via a temp dir)."""
+    features = prepare_features(df, set(BASE_TARGETS))
+    meta = [name for name in META_COLUMNS if name in df.columns]
+    # Every dropped numeric column plus the string targets is kept as a target.
+    targets = [
+        name
+        for name in df.columns
+        if name not in features.columns
+        and name not in meta
+        and (pd.api.types.is_numeric_dtype(df[name]) or name in BASE_TARGETS)
+    ]
+    integer_columns = [
+        name
+        for name in list(features.columns) + targets
+        if pd.api.types.is_integer_dtype(df[name])
+    ]
+    kept = set(features.columns) | set(targets) | set(meta)
+    order = [name for name in df.columns if name in kept]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        (tmp / "targets").mkdir()
+        (tmp / "meta").mkdir()
+        np.save(tmp / "X.npy", features.to_numpy(dtype=np.float64))
+        categories = {}
+        for name in targets:
+            values = df[name]
+            if pd.api.types.is_numeric_dtype(values):
+                array = values.to_numpy(dtype=np.float64)
+            else:
+                codes, labels = pd.factorize(values, sort=True)
+                array = np.where(codes < 0, np.nan, codes.astype(np.float64))
+                categories[name] = [str(label) for label in labels]
+            np.save(tmp / "targets" / f"{name}.npy", array)
+        for name in meta:
+            values = df[name]
+            if pd.api.types.is_numeric_dtype(values):
+                array = values.to_numpy()
+            else:
+                array = values.astype(str).to_numpy(dtype=str)
+            np.save(tmp / "meta" / f"{name}.npy", array)
+
+        manifest = {
+            **manifest,
+            "rows": len(df),
+            "columns": list(features.columns),
+            "integer_columns": integer_columns,
+            "order": order,
+            "targets": targets,
+            "categories": categories,
+            "meta": meta,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def open_store(input_path: str | Path, root: str | Path) -> FeatureStore:
+    """Open the store entry for `input_path`, building it on first use."""
+    input_path = Path(input_path)
+    key = store_key(input_path)
+    path = Path(root) / key
+    if not (path / "manifest.json").exists():
+        df = pd.read_csv(input_path)
+        manifest = {"key": key, "source": str(input_path), "rules": rules_fingerprint()}
+        try:
+            build_store(df, path, manifest)
+        except OSError:
+            # Another process finished the same entry first.
+            if not (path / "manifest.json").exists():
+                raise
+    return FeatureStore(path, json.loads((path / "manifest.json").read_text()))
+
+
+def load_table(input_path: str | Path, store_root: str | Path | None) -> pd.DataFrame:
+    """Read the training table, through the feature store when a root is given."""
+    if store_root is None:
+        return pd.read_csv(input_path)
+    return open_store(input_path, store_root).frame()
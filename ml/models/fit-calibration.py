@@ -0,0 +1,234 @@
+"""
+Fit probability calibration for trained markets and write calibration tables.
+
+Each classification market's model is scored once on held-out seasons. One
+calibration curve is fitted per market (one per class for 1x2), and all curves
+are fitted in a single batched pass. The result is written to
+`<market>/calibration.json` as piecewise-linear lookup tables. export-to-json
+embeds them in `model.json` and the TypeScript runtime applies them after the
+sigmoid/softmax.
+
+The validation season cannot be used: model.pkl is refit on train +
+validation, so its predictions there are in-sample and too confident to
+calibrate against. The curves are therefore fitted on the earliest
+--fit-fraction of the test-season rows (by date); the later rows are held
+back. calibration.json records the fitted range (`seasons` + `fit_until`),
+and evaluate-offline.py / backtest-markets.py --calibrated leave those rows
+out, so calibrated metrics are out-of-sample. The held-back rows are also
+scored here (`holdout` in calibration.json).
+
+Usage:
+    python ml/models/fit-calibration.py [--method isotonic|platt|temperature]
+
+Examples:
+    python ml/models/fit-calibration.py --from-season 2024
+    python ml/models/fit-calibration.py --method platt --markets 1x2,btts
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from calibration import METHODS, calibrate_probabilities, fit_tables
+from instrumentation import add_instrumentation_args, run_report, span
+from model_io import LABEL_MAP, encode_target, load_booster, load_market_spec
+from permutation_importance import market_loss
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fit calibration tables for trained markets."
+    )
+    parser.add_argument(
+        "--input",
+        default="ml/data/features/training_with_targets.csv",
+        help="CSV with features + targets (training_with_targets.csv).",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default="ml/models/output",
+        help="Directory with trained model.pkl/metrics.json files.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=None,
+        help="Comma-separated market keys (default: every trained classifier).",
+    )
+    parser.add_argument(
+        "--method",
+        choices=METHODS,
+        default="isotonic",
+        help="Calibration method (all are exported as lookup tables).",
+    )
+    parser.add_argument(
+        "--from-season",
+        type=int,
+        default=2024,
+        help="First test season (train-markets --test-start).",
+    )
+    parser.add_argument(
+        "--to-season", type=int, default=None, help="Last test season."
+    )
+    parser.add_argument(
+        "--fit-fraction",
+        type=float,
+        default=0.5,
+        help=(
+            "Earliest share of the test rows (by date) used for fitting; the rest "
+            "is held back for evaluation."
+        ),
+    )
+    parser.add_argument(
+        "--max-knots",
+        type=int,
+        default=64,
+        help="Maximum breakpoints per calibration table.",
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def brier(y: np.ndarray, prob: np.ndarray, market_type: str) -> float:
+    if market_type == "multiclass":
+        actual = np.eye(prob.shape[1])[y]
+        return float(np.mean(((prob - actual) ** 2).sum(axis=1)))
+    return float(np.mean((prob - y) ** 2))
+
+
+def score(y: np.ndarray, prob: np.ndarray, market_type: str) -> dict[str, float]:
+    return {
+        "logloss": round(market_loss(y, prob, market_type), 6),
+        "brier": round(brier(y, prob, market_type), 6),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("fit-calibration", args):
+        fit_calibration(args)
+
+
+def fit_calibration(args: argparse.Namespace) -> None:
+    model_dir = Path(args.model_dir)
+    if args.markets:
+        markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    else:
+        markets = sorted(
+            path.parent.name for path in model_dir.glob("*/metrics.json")
+        )
+
+    specs = []
+    for market in markets:
+        spec = load_market_spec(model_dir, market)
+        if spec is None:
+            print(f"⚠️  Skipping {market}: model.pkl or metrics.json missing")
+        elif spec.market_type == "regression":
+            print(f"⚠️  Skipping {market}: regression market")
+        else:
+            specs.append(spec)
+    if not specs:
+        raise SystemExit("No classification markets to calibrate.")
+
+    with span("load") as stage:
+        df = pd.read_csv(args.input)
+        df = df[df["season"] >= args.from_season]
+        if args.to_season is not None:
+            df = df[df["season"] <= args.to_season]
+        stage.rows = len(df)
+    if df.empty:
+        raise SystemExit("No rows in the requested seasons.")
+    if not 0 < args.fit_fraction <= 1:
+        raise SystemExit("--fit-fraction must be in (0, 1].")
+
+    # Whole days only, so one matchday is never split between fit and holdout.
+    dates = pd.to_datetime(df["date"]).dt.normalize()
+    ordered = np.sort(dates.to_numpy())
+    fit_until = ordered[max(int(np.ceil(len(ordered) * args.fit_fraction)) - 1, 0)]
+    fitted = (dates <= fit_until).to_numpy()
+
+    # Score every market first, then fit all curves in one pass.
+    scored = []
+    curves = []
+    with span("predict") as stage:
+        for spec in specs:
+            if spec.target not in df.columns:
+                print(f"⚠️  Skipping {spec.market}: {spec.target} not in input")
+                continue
+            y, mask = encode_target(df[spec.target], spec.market_type)
+            if not mask.any():
+                print(f"⚠️  Skipping {spec.market}: no labelled rows")
+                continue
+            in_fit = fitted[mask]
+            if not in_fit.any():
+                print(f"⚠️  Skipping {spec.market}: no labelled rows to fit on")
+                continue
+            booster = load_booster(spec.model_path)
+            X = df.loc[mask].reindex(columns=booster.feature_name())
+            prob = booster.predict(X.to_numpy(dtype=np.float64))
+            fit_y, fit_prob = y[in_fit], prob[in_fit]
+            if spec.market_type == "multiclass":
+                market_curves = [
+                    (fit_prob[:, idx], (fit_y == idx).astype(np.float64))
+                    for idx in range(prob.shape[1])
+                ]
+            else:
+                market_curves = [(fit_prob, fit_y.astype(np.float64))]
+            scored.append((spec, y, prob, in_fit, len(curves), len(market_curves)))
+            curves.extend(market_curves)
+        stage.rows = sum(len(y) for _, y, _, _, _, _ in scored)
+
+    with span("fit") as stage:
+        tables = fit_tables(curves, args.method, args.max_knots)
+        stage.meta["curves"] = len(curves)
+
+    fit_day = str(pd.Timestamp(fit_until).date())
+    print(
+        f"📐 Calibration ({args.method}) on seasons >= {args.from_season} "
+        f"up to {fit_day}"
+    )
+    for spec, y, prob, in_fit, start, width in scored:
+        calibration = {"method": args.method, "tables": tables[start : start + width]}
+        calibrated = calibrate_probabilities(calibration, prob)
+        held = ~in_fit
+        payload = {
+            "market": spec.market,
+            "target": spec.target,
+            "type": spec.market_type,
+            **calibration,
+            "classes": list(LABEL_MAP) if spec.market_type == "multiclass" else None,
+            "seasons": [
+                int(df["season"].min()),
+                int(df["season"].max()),
+            ],
+            "fit_until": fit_day,
+            "rows": int(in_fit.sum()),
+            "raw": score(y[in_fit], prob[in_fit], spec.market_type),
+            "calibrated": score(y[in_fit], calibrated[in_fit], spec.market_type),
+            "holdout": (
+                {
+                    "rows": int(held.sum()),
+                    "raw": score(y[held], prob[held], spec.market_type),
+                    "calibrated": score(y[held], calibrated[held], spec.market_type),
+                }
+                if held.any()
+                else None
+            ),
+        }
+        (model_dir / spec.market / "calibration.json").write_text(
+            json.dumps(payload, indent=2)
+        )
+        knots = sum(len(table["x"]) for table in calibration["tables"])
+        # Report the held-back rows when there are any (out-of-sample).
+        shown = payload["holdout"] or payload
+        print(
+            f"  {spec.market:12} | {payload['rows']:7} fit rows | {knots:4} knots | "
+            f"{'holdout' if payload['holdout'] else 'in-sample'} logloss "
+            f"{shown['raw']['logloss']:.4f} -> {shown['calibrated']['logloss']:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Lightweight stage instrumentation for the Python ML pipeline.
+
+Scripts wrap their body in `run_report(...)` and mark stages with `span(...)`:
+
+    with run_report("train-markets", args):
+        with span("load") as stage:
+            df = pd.read_csv(args.input)
+            stage.rows = len(df)
+
+Each span records wall time, resident memory at start/end and the peak seen
+while it was open, plus an optional row count and free-form metadata. Spans
+nest, so per-market stages show up as e.g. `market:btts/optuna`.
+
+`--report PATH` writes a machine-readable JSON run report and `--profile PATH`
+dumps cProfile stats (open with `python -m pstats PATH` or snakeviz). Without
+either flag spans are still timed but nothing is sampled or written.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> float | None:
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE / 2**20
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def max_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Process-lifetime peak RSS (ru_maxrss is KB on Linux, bytes on macOS)."""
+    value = resource.getrusage(who).ru_maxrss
+    return value / 2**20 if sys.platform == "darwin" else value / 2**10
+
+
+class RssSampler:
+    """Background thread raising `peak_rss_mb` on every open span."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.open_spans: list["Span"] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        for stage in list(self.open_spans):
+            if stage.peak_rss_mb is None or rss > stage.peak_rss_mb:
+                stage.peak_rss_mb = rss
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+@dataclass
+class Span:
+    name: str
+    path: str
+    meta: dict[str, Any] = field(default_factory=dict)
+    rows: int | None = None
+    seconds: float = 0.0
+    rss_start_mb: float | None = None
+    rss_end_mb: float | None = None
+    peak_rss_mb: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "name": self.name,
+            "path": self.path,
+            "seconds": round(self.seconds, 4),
+        }
+        if self.rows is not None:
+            data["rows"] = int(self.rows)
+        for key in ("rss_start_mb", "rss_end_mb", "peak_rss_mb"):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = round(value, 1)
+        data.update(self.meta)
+        return data
+
+
+class RunReport:
+    def __init__(self, script: str, args: argparse.Namespace | dict | None = None) -> None:
+        self.script = script
+        self.args = vars(args) if isinstance(args, argparse.Namespace) else dict(args or {})
+        self.started_at = datetime.now(timezone.utc)
+        self.spans: list[Span] = []
+        self.trials: dict[str, list[dict[str, Any]]] = {}
+        self.counters: dict[str, int] = {}
+        self._stack: list[Span] = []
+        self._start = time.perf_counter()
+        self.sampler: RssSampler | None = None
+
+    @contextmanager
+    def span(self, name: str, **meta: Any) -> Iterator[Span]:
+        parent = self._stack[-1].path + "/" if self._stack else ""
+        stage = Span(name=name, path=parent + name, meta=meta)
+        if self.sampler is not None:
+            stage.rss_start_mb = current_rss_mb()
+            stage.peak_rss_mb = stage.rss_start_mb
+            self.sampler.open_spans.append(stage)
+        self._stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self._stack.pop()
+            if self.sampler is not None:
+                self.sampler.sample()
+                self.sampler.open_spans.remove(stage)
+                stage.rss_end_mb = current_rss_mb()
+            self.spans.append(stage)
+
+    def count(self, name: str, value: int) -> None:
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def optuna_callback(self, key: str):
+        """Optuna `callbacks=` entry recording each trial's duration and value."""
+        trials = self.trials.setdefault(key, [])
+
+        def callback(study, trial) -> None:
+            duration = trial.duration.total_seconds() if trial.duration else None
+            # Multi-objective trials carry a list of values.
+            values = trial.values
+            trials.append(
+                {
+                    "number": trial.number,
+                    "state": trial.state.name,
+                    "seconds": round(duration, 4) if duration is not None else None,
+                    "value": values[0] if values and len(values) == 1 else values,
+                }
+            )
+
+        return callback
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "script": self.script,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self._start, 4),
+            "peak_rss_mb": round(max_rss_mb(), 1),
+            "children_peak_rss_mb": round(max_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            "args": {key: _jsonable(value) for key, value in self.args.items()},
+            "counters": self.counters,
+            "spans": [stage.to_dict() for stage in self.spans],
+            "optuna_trials": self.trials,
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return str(value)
+
+
+_ACTIVE: list[RunReport] = []
+
+
+def add_instrumentation_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON run report (stage timings, memory, row counts).",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Write cProfile stats for the whole run to this path.",
+    )
+
+
+@contextmanager
+def run_report(
+    script: str, args: argparse.Namespace, *, sample_rss: bool = False
+) -> Iterator[RunReport]:
+    """Activate a run report for the enclosed block.
+
+    Honours `args.report` / `args.profile` when present (see
+    `add_instrumentation_args`). `sample_rss` samples memory even when no
+    report file is requested, for callers that read the spans themselves.
+    """
+    report_path = getattr(args, "report", None)
+    profile_path = getattr(args, "profile", None)
+    report = RunReport(script, args)
+    if report_path or sample_rss:
+        report.sampler = RssSampler()
+        report.sampler.start()
+
+    profiler = cProfile.Profile() if profile_path else None
+    _ACTIVE.append(report)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield report
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            Path(profile_path).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path)
+        _ACTIVE.pop()
+        if report.sampler is not None:
+            report.sampler.stop()
+        if report_path:
+            path = Path(report_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report.to_dict(), indent=2))
+
+
+def active_report() -> RunReport | None:
+    return _ACTIVE[-1] if _ACTIVE else None
+
+
+@contextmanager
+def span(name: str, **meta: Any) -> Iterator[Span]:
+    """Time a stage on the active report (a detached no-op span otherwise)."""
+    report = active_report()
+    if report is None:
+        yield Span(name=name, path=name, meta=meta)
+        return
+    with report.span(name, **meta) as stage:
+        yield stage
+
+
+def optuna_callbacks(key: str) -> list:
+    report = active_report()
+    return [report.optuna_callback(key)] if report is not None else []
+
+
+def count(name: str, value: int) -> None:
+    report = active_report()
+    if report is not None:
+        report.count(name, value)
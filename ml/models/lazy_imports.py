@@ -0,0 +1,58 @@
+"""
+Deferred imports for heavy dependencies.
+
+`lightgbm`, `sklearn`, `optuna` and `joblib` together take seconds to import.
+Scripts bind them at module level with `lazy_import` so `--help`, argument
+errors and code paths that never touch them do not pay that cost: the real
+import runs on first attribute access.
+
+    lgb = lazy_import("lightgbm")
+    lgb.LGBMClassifier(...)   # lightgbm is imported here
+
+The proxy is not registered in `sys.modules`, so other imports of the same
+package (e.g. unpickling a model) go through the normal import system and see
+the same module objects.
+"""
+
+import importlib
+import sys
+from types import ModuleType
+
+
+HEAVY_MODULES = ("lightgbm", "sklearn", "optuna", "joblib")
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str) -> None:
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType | LazyModule:
+    """Return `name` if it is already imported, else a lazy stand-in."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def loaded_heavy_modules() -> list[str]:
+    """Heavy dependencies that have been imported so far."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,153 @@
+"""
+Inference-cost measures for trained LightGBM boosters.
+
+The edge runtime walks every tree for every prediction, so a model's cost is
+driven by its size and depth rather than its accuracy:
+- nodes            total split + leaf nodes across all trees
+- expected_visits  splits evaluated per prediction, weighting each leaf's
+                   depth by the share of training rows that reached it
+- bytes            size of the minified model.json as written by
+                   export-to-json.py (without calibration tables)
+
+Used by train-markets.py --cost for multi-objective tuning, i.e. once per
+Optuna trial, so everything is read from LightGBM's native text model
+(`model_to_string`, about 10x cheaper than `dump_model`, which serializes the
+same trees to JSON and parses them back). `bytes` is summed from the
+serialized length of every field export-to-json.py keeps, so the model is
+never minified or re-serialized; for numerical splits it equals the exported
+length exactly (categorical thresholds are counted as written in the text
+model).
+"""
+
+import json
+import math
+from collections.abc import Iterator
+
+import numpy as np
+
+
+COST_MEASURES = ("nodes", "expected_visits", "bytes")
+
+# Minified JSON around the values, as export-to-json.py writes it.
+LEAF_BYTES = len('{"leaf_value":}')
+SPLIT_BYTES = len(
+    '{"split_feature":,"threshold":,"default_left":,"left_child":,"right_child":}'
+)
+TREE_BYTES = len('{"tree_index":,"shrinkage":,"tree_structure":}')
+MODEL_BYTES = len('{"metadata":,"tree_info":[],"feature_names":}')
+# LightGBM decision_type bit for "missing values go left".
+DEFAULT_LEFT_MASK = 2
+
+
+def _number_len(token: str) -> int:
+    """Length of a text-model number once it went through JSON and Python.
+
+    dump_model writes the same digits (with infinities as +-1e300 and NaN as
+    0); json.loads turns integral tokens into ints and the rest into floats,
+    which json.dumps writes with repr.
+    """
+    if not any(char in token for char in ".eEnN"):
+        return len(str(int(token)))
+    value = float(token)
+    if math.isnan(value):
+        return 1
+    if math.isinf(value):
+        value = math.copysign(1e300, value)
+    return len(repr(value))
+
+
+def _sections(model_text: str) -> tuple[dict[str, str], Iterator[dict[str, str]]]:
+    """Header fields and the key=value fields of every tree block."""
+    body = model_text.split("\nend of trees", 1)[0]
+    head, *blocks = body.split("\nTree=")
+    header = dict(line.split("=", 1) for line in head.splitlines() if "=" in line)
+
+    def trees() -> Iterator[dict[str, str]]:
+        for block in blocks:
+            index, *lines = block.splitlines()
+            fields = dict(line.split("=", 1) for line in lines if "=" in line)
+            fields["tree_index"] = index
+            yield fields
+
+    return header, trees()
+
+
+def _tree_cost(fields: dict[str, str]) -> tuple[int, float, int]:
+    """(nodes, expected split visits, exported bytes) of one tree."""
+    leaf_values = fields["leaf_value"].split()
+    num_leaves = len(leaf_values)
+    size = sum(LEAF_BYTES + _number_len(value) for value in leaf_values)
+    if num_leaves == 1:
+        return 1, 0.0, size
+
+    left = [int(child) for child in fields["left_child"].split()]
+    right = [int(child) for child in fields["right_child"].split()]
+    decisions = [int(value) for value in fields["decision_type"].split()]
+    size += sum(
+        SPLIT_BYTES
+        + _number_len(feature)
+        + _number_len(threshold)
+        + (4 if decision & DEFAULT_LEFT_MASK else 5)
+        for feature, threshold, decision in zip(
+            fields["split_feature"].split(), fields["threshold"].split(), decisions
+        )
+    )
+
+    # Children are split after their parent, so one pass in index order
+    # assigns every depth; leaves are stored as ~leaf_index.
+    depth = [0] * len(left)
+    leaf_depth = np.zeros(num_leaves)
+    for node in range(len(left)):
+        for child in (left[node], right[node]):
+            if child >= 0:
+                depth[child] = depth[node] + 1
+            else:
+                leaf_depth[~child] = depth[node] + 1
+
+    counts = np.array(fields.get("leaf_count", "").split(), dtype=np.float64)
+    if len(counts) == num_leaves and counts.sum() > 0:
+        visits = float(leaf_depth @ counts / counts.sum())
+    else:
+        # No leaf counts: assume every leaf is equally likely.
+        visits = float(leaf_depth.mean())
+    return 2 * num_leaves - 1, visits, size
+
+
+def model_cost(booster, market: str = "") -> dict[str, float]:
+    """Return node count, expected split visits and exported bytes."""
+    header, trees = _sections(booster.model_to_string())
+    nodes = 0
+    expected_visits = 0.0
+    size = 0
+    num_trees = 0
+    for fields in trees:
+        tree_nodes, visits, tree_bytes = _tree_cost(fields)
+        nodes += tree_nodes
+        expected_visits += visits
+        size += (
+            TREE_BYTES
+            + _number_len(fields["tree_index"])
+            + _number_len(fields.get("shrinkage", "1"))
+            + tree_bytes
+        )
+        num_trees += 1
+
+    feature_names = header.get("feature_names", "").split()
+    metadata = {
+        "market": market,
+        "num_trees": num_trees,
+        "num_class": int(header.get("num_class", 1)),
+        "feature_names": feature_names,
+        "objective": header.get("objective", ""),
+    }
+    size += (
+        MODEL_BYTES
+        + len(json.dumps(metadata, separators=(",", ":")))
+        + len(json.dumps(feature_names, separators=(",", ":")))
+        + max(num_trees - 1, 0)  # commas between trees
+    )
+    return {
+        "nodes": nodes,
+        "expected_visits": round(expected_visits, 2),
+        "bytes": size,
+    }
@@ -0,0 +1,69 @@
+"""
+Loading trained markets from a model directory.
+
+Every market lives in `<model-dir>/<market>/`: `model.pkl` and `metrics.json`
+from train-markets.py, plus `model.json` once export-to-json.py has run.
+Shared by the scripts that read trained models (calibration, drift, weights,
+scoring).
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+joblib = lazy_import("joblib")
+
+
+LABEL_MAP = {"HOME": 0, "DRAW": 1, "AWAY": 2}
+
+
+@dataclass(frozen=True)
+class MarketSpec:
+    market: str
+    model_path: Path
+    target: str
+    market_type: str
+
+
+def load_market_spec(model_dir: Path, market: str) -> MarketSpec | None:
+    """Read target/type from the market's metrics.json (written by train-markets)."""
+    metrics_path = model_dir / market / "metrics.json"
+    model_path = model_dir / market / "model.pkl"
+    if not metrics_path.exists() or not model_path.exists():
+        return None
+    metrics = json.loads(metrics_path.read_text())
+    return MarketSpec(
+        market=market,
+        model_path=model_path,
+        target=metrics["target"],
+        market_type=metrics["type"],
+    )
+
+
+def load_booster(model_path: Path):
+    model = joblib.load(model_path)
+    return model.booster_ if hasattr(model, "booster_") else model
+
+
+def model_version(model_json_path: Path) -> str:
+    """Short hash of an exported model.json, the version every serving path reports."""
+    return hashlib.sha256(model_json_path.read_bytes()).hexdigest()[:12]
+
+
+def encode_target(values: pd.Series, market_type: str) -> tuple[np.ndarray, np.ndarray]:
+    """Return (labels, row mask) for rows usable by the market."""
+    if market_type == "multiclass":
+        encoded = values.map(LABEL_MAP)
+    else:
+        encoded = pd.to_numeric(values, errors="coerce")
+    mask = encoded.notna().to_numpy()
+    labels = encoded[mask].to_numpy(dtype=np.float64)
+    if market_type != "regression":
+        labels = labels.astype(np.int64)
+    return labels, mask
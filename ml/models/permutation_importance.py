@@ -0,0 +1,178 @@
+"""
+Grouped permutation importance for trained LightGBM markets.
+
+Each factor group (all of its features together) is shuffled across rows and
+the increase in validation loss is the group's importance: log loss for
+binary/multiclass markets, squared error for regression markets.
+
+Work is organised so nothing is computed twice:
+- one float64 feature matrix (union of every model's features) is built once
+  and shared by all markets; each model reads its own column view
+- each market's baseline predictions are computed once and reused for
+  every group and repeat
+- markets fan out over a process pool; the matrix, labels and masks are
+  placed in shared memory once (see shared_dataset.py) and workers attach
+  read-only views instead of receiving a pickled copy
+
+Used by extract-weights.py --method permutation.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model_io import MarketSpec, encode_target, load_booster
+from shared_dataset import SharedDataset, SharedDatasetHandle, attach
+
+
+EPS = 1e-12
+
+
+def market_loss(y: np.ndarray, preds: np.ndarray, market_type: str) -> float:
+    if market_type == "regression":
+        return float(np.mean((preds - y) ** 2))
+    if market_type == "multiclass":
+        picked = preds[np.arange(len(y)), y]
+        return float(-np.mean(np.log(np.clip(picked, EPS, 1 - EPS))))
+    p = np.clip(preds, EPS, 1 - EPS)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+@dataclass
+class SharedData:
+    X: np.ndarray
+    columns: dict[str, int]
+    labels: dict[str, np.ndarray]
+    masks: dict[str, np.ndarray]
+    specs: dict[str, MarketSpec]
+    feature_groups: dict[str, str]
+    repeats: int
+    seed: int
+
+
+def market_importance(data: SharedData, market: str) -> dict[str, float]:
+    """Loss increase per factor group for one market.
+
+    Baseline predictions are made once; each group then reuses one scratch
+    copy of the market's matrix, only overwriting the group's columns.
+    """
+    spec = data.specs[market]
+    booster = load_booster(spec.model_path)
+    feature_names = booster.feature_name()
+    cols = [data.columns[name] for name in feature_names]
+    X_market = np.ascontiguousarray(data.X[data.masks[market]][:, cols])
+    y = data.labels[market]
+    baseline = market_loss(y, booster.predict(X_market), spec.market_type)
+
+    groups: dict[str, list[int]] = {}
+    for idx, name in enumerate(feature_names):
+        groups.setdefault(data.feature_groups[name], []).append(idx)
+
+    market_idx = list(data.specs).index(market)
+    X_perm = X_market.copy()
+    importances: dict[str, float] = {}
+    for group_idx, (group, group_cols) in enumerate(groups.items()):
+        losses = []
+        for repeat in range(data.repeats):
+            rng = np.random.default_rng([data.seed, market_idx, group_idx, repeat])
+            order = rng.permutation(len(X_market))
+            X_perm[:, group_cols] = X_market[order][:, group_cols]
+            losses.append(market_loss(y, booster.predict(X_perm), spec.market_type))
+        X_perm[:, group_cols] = X_market[:, group_cols]
+        importances[group] = float(np.mean(losses)) - baseline
+    return importances
+
+
+_WORKER_DATA: SharedData | None = None
+
+
+def _init_worker(data: SharedData, handle: SharedDatasetHandle) -> None:
+    global _WORKER_DATA
+    view = attach(handle)
+    _WORKER_DATA = replace(
+        data,
+        X=view.X,
+        labels={market: view.arrays[f"labels/{market}"] for market in data.specs},
+        masks={market: view.arrays[f"mask/{market}"] for market in data.specs},
+    )
+
+
+def _market_task(market: str) -> dict[str, float]:
+    return market_importance(_WORKER_DATA, market)
+
+
+def build_shared_data(
+    sample: pd.DataFrame,
+    specs: list[MarketSpec],
+    group_of: Callable[[str], str],
+    repeats: int,
+    seed: int,
+) -> SharedData:
+    feature_names: list[str] = []
+    for spec in specs:
+        for name in load_booster(spec.model_path).feature_name():
+            if name not in feature_names:
+                feature_names.append(name)
+
+    X = sample.reindex(columns=feature_names).to_numpy(dtype=np.float64)
+    labels: dict[str, np.ndarray] = {}
+    masks: dict[str, np.ndarray] = {}
+    for spec in specs:
+        if spec.target not in sample.columns:
+            labels[spec.market] = np.empty(0)
+            masks[spec.market] = np.zeros(len(sample), dtype=bool)
+            continue
+        labels[spec.market], masks[spec.market] = encode_target(
+            sample[spec.target], spec.market_type
+        )
+
+    return SharedData(
+        X=X,
+        columns={name: idx for idx, name in enumerate(feature_names)},
+        labels=labels,
+        masks=masks,
+        specs={spec.market: spec for spec in specs},
+        feature_groups={name: group_of(name) for name in feature_names},
+        repeats=repeats,
+        seed=seed,
+    )
+
+
+def permutation_importances(
+    sample: pd.DataFrame,
+    specs: list[MarketSpec],
+    group_of: Callable[[str], str],
+    *,
+    repeats: int = 3,
+    seed: int = 42,
+    workers: int = 1,
+    spill_dir: str | Path | None = None,
+) -> dict[str, dict[str, float]]:
+    """Return raw (unnormalized) loss increase per market and factor group.
+
+    `group_of` maps a model feature name to its factor group.
+    Markets with no labelled rows in `sample` are omitted.
+    `spill_dir` backs the worker-shared arrays with memory-mapped files
+    instead of /dev/shm.
+    """
+    data = build_shared_data(sample, specs, group_of, repeats, seed)
+    markets = [spec.market for spec in specs if data.masks[spec.market].any()]
+
+    if workers <= 1:
+        return {market: market_importance(data, market) for market in markets}
+
+    arrays = {"X": data.X}
+    for market in data.specs:
+        arrays[f"labels/{market}"] = data.labels[market]
+        arrays[f"mask/{market}"] = data.masks[market]
+    # Workers get the small metadata pickled and the arrays by name.
+    meta = replace(data, X=np.empty((0, 0)), labels={}, masks={})
+    with SharedDataset(arrays, directory=spill_dir) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(meta, shared.handle)
+    ) as pool:
+        futures = {market: pool.submit(_market_task, market) for market in markets}
+        return {market: future.result() for market, future in futures.items()}
@@ -0,0 +1,437 @@
+"""
+Poisson / Dixon-Coles team-strength model.
+
+Goals are modelled as independent Poisson counts:
+
+    log lambda_home = off_home[league] + attack[home] - defence[away]
+    log lambda_away = off_away[league] + attack[away] - defence[home]
+
+`off_*` are the (decay-weighted) log mean goals of the league, so home
+advantage comes from the league offsets and team parameters are deviations
+from the league average, shared across leagues (promoted teams keep their
+history). The fit is iteratively reweighted least squares: every step is one
+ridge-penalised weighted least-squares problem over a sparse design matrix
+with two non-zeros per row, solved through its sparse normal equations
+(X'WX + alpha I) beta = X'Wz with a direct sparse solver. The penalty shrinks
+teams with little history towards the league average. Matches are
+weighted by exp(-ln 2 * age / half_life), as in Dixon & Coles (1997).
+
+The Dixon-Coles correction rho for 0-0, 1-0, 0-1 and 1-1 scores is fitted
+afterwards by a vectorized grid search of its weighted log-likelihood.
+
+`walk_forward_xg` refits at fixed checkpoints on earlier matches only, so
+expected goals can be used as features without leaking results;
+`TeamStrength` is a fitted model that can be saved, loaded and turned into
+probabilities for every goal market (`goal_market_probabilities`).
+"""
+
+import hashlib
+import json
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+
+DEFAULT_HALF_LIFE_DAYS = 365.0
+DEFAULT_ALPHA = 2.0
+DEFAULT_REFIT_DAYS = 30
+MAX_GOALS = 10
+# Rows lighter than this are left out of a fit (about 6.6 half-lives old).
+MIN_WEIGHT = 0.01
+RHO_GRID = np.round(np.arange(-0.3, 0.3001, 0.005), 3)
+IRLS_TOL = 1e-6
+IRLS_MAX_ITER = 25
+
+RANGE_MARKET = re.compile(r"^(total|home|away)_range_(\d+)_(\d+)$")
+OU_MARKET = re.compile(r"^ou_(\d+)_5$")
+
+
+@dataclass
+class MatchHistory:
+    """Played matches in date order, encoded for fitting."""
+
+    days: np.ndarray  # days since epoch
+    home: np.ndarray  # team codes
+    away: np.ndarray
+    league: np.ndarray  # league codes
+    home_goals: np.ndarray
+    away_goals: np.ndarray
+    teams: pd.Index
+    leagues: pd.Index
+    design: sparse.csr_matrix  # rows 2i (home goals) and 2i+1 (away goals)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        home_goals: str = "FTHome",
+        away_goals: str = "FTAway",
+    ) -> "MatchHistory":
+        df = df.dropna(subset=["date", "leagueId", "homeTeam", "awayTeam", home_goals, away_goals])
+        dates = pd.to_datetime(df["date"])
+        order = np.argsort(dates.to_numpy(), kind="stable")
+        df = df.iloc[order]
+        days = (pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")).astype(np.int64)
+
+        teams = pd.Index(pd.unique(pd.concat([df["homeTeam"], df["awayTeam"]]).astype(str)))
+        leagues = pd.Index(pd.unique(df["leagueId"].astype(np.int64)))
+        home = teams.get_indexer(df["homeTeam"].astype(str))
+        away = teams.get_indexer(df["awayTeam"].astype(str))
+        n, t = len(df), len(teams)
+
+        # Columns: attack[0:t], defence[t:2t].
+        rows = np.repeat(np.arange(2 * n), 2)
+        cols = np.empty(4 * n, dtype=np.int64)
+        cols[0::4], cols[1::4] = home, t + away
+        cols[2::4], cols[3::4] = away, t + home
+        values = np.tile([1.0, -1.0], 2 * n)
+        design = sparse.csr_matrix((values, (rows, cols)), shape=(2 * n, 2 * t))
+
+        return cls(
+            days=days,
+            home=home,
+            away=away,
+            league=leagues.get_indexer(df["leagueId"].astype(np.int64)),
+            home_goals=df[home_goals].to_numpy(dtype=np.float64),
+            away_goals=df[away_goals].to_numpy(dtype=np.float64),
+            teams=teams,
+            leagues=leagues,
+            design=design,
+        )
+
+
+def decay_weights(days: np.ndarray, at_day: int, half_life_days: float) -> np.ndarray:
+    return np.exp(-math.log(2) * (at_day - days) / half_life_days)
+
+
+def league_offsets(
+    league: np.ndarray,
+    home_goals: np.ndarray,
+    away_goals: np.ndarray,
+    weights: np.ndarray,
+    n_leagues: int,
+) -> np.ndarray:
+    """(n_leagues + 1, 2) log mean home/away goals; the last row is global."""
+    total = np.bincount(league, weights=weights, minlength=n_leagues)
+    home = np.bincount(league, weights=weights * home_goals, minlength=n_leagues)
+    away = np.bincount(league, weights=weights * away_goals, minlength=n_leagues)
+    overall = np.array([[home.sum(), away.sum()]]) / max(total.sum(), 1e-12)
+    means = np.column_stack([home, away]) / np.maximum(total, 1e-12)[:, None]
+    # Leagues without (weighted) matches fall back to the global mean.
+    means = np.where(total[:, None] > 0, means, overall)
+    return np.log(np.maximum(np.vstack([means, overall]), 1e-6))
+
+
+def fit_strengths(
+    design: sparse.csr_matrix,
+    goals: np.ndarray,
+    offset: np.ndarray,
+    weights: np.ndarray,
+    alpha: float,
+    beta: np.ndarray | None = None,
+) -> tuple[np.ndarray, int]:
+    """Ridge Poisson regression by IRLS; returns (coefficients, iterations).
+
+    `goals`, `offset` and `weights` are per design row; `beta` warm-starts.
+    """
+    beta = np.zeros(design.shape[1]) if beta is None else beta.copy()
+    ridge = alpha * sparse.identity(design.shape[1], format="csc")
+    transposed = design.T.tocsr()
+    for iteration in range(1, IRLS_MAX_ITER + 1):
+        linear = design @ beta
+        mu = np.exp(offset + linear)
+        working = linear + (goals - mu) / mu
+        irls_weights = weights * mu
+        gram = (transposed @ sparse.diags(irls_weights) @ design).tocsc() + ridge
+        updated = spsolve(gram, transposed @ (irls_weights * working))
+        change = np.max(np.abs(updated - beta)) if len(beta) else 0.0
+        beta = updated
+        if change < IRLS_TOL:
+            break
+    return beta, iteration
+
+
+def dixon_coles_tau(
+    home_goals: np.ndarray,
+    away_goals: np.ndarray,
+    lam_home: np.ndarray,
+    lam_away: np.ndarray,
+    rho: np.ndarray | float,
+) -> np.ndarray:
+    """Low-score correction factor; broadcasts rho against the rows."""
+    rho = np.asarray(rho, dtype=np.float64)[..., None]
+    tau = np.ones(np.broadcast_shapes(rho.shape, lam_home.shape))
+    low00 = (home_goals == 0) & (away_goals == 0)
+    low01 = (home_goals == 0) & (away_goals == 1)
+    low10 = (home_goals == 1) & (away_goals == 0)
+    low11 = (home_goals == 1) & (away_goals == 1)
+    tau = np.where(low00, 1 - lam_home * lam_away * rho, tau)
+    tau = np.where(low01, 1 + lam_home * rho, tau)
+    tau = np.where(low10, 1 + lam_away * rho, tau)
+    return np.where(low11, 1 - rho, tau)
+
+
+def fit_rho(
+    home_goals: np.ndarray,
+    away_goals: np.ndarray,
+    lam_home: np.ndarray,
+    lam_away: np.ndarray,
+    weights: np.ndarray,
+) -> float:
+    """Weighted maximum-likelihood rho over RHO_GRID (only low scores matter)."""
+    low = (home_goals <= 1) & (away_goals <= 1)
+    if not low.any():
+        return 0.0
+    tau = dixon_coles_tau(
+        home_goals[low], away_goals[low], lam_home[low], lam_away[low], RHO_GRID
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        loglik = np.where(tau > 0, np.log(np.where(tau > 0, tau, 1.0)), -np.inf)
+    score = loglik @ weights[low]
+    return float(RHO_GRID[int(np.argmax(score))])
+
+
+@dataclass
+class TeamStrength:
+    """A fitted model: team attack/defence, league offsets and rho."""
+
+    teams: list[str]
+    attack: np.ndarray
+    defence: np.ndarray
+    leagues: list[int]
+    offsets: np.ndarray  # (len(leagues) + 1, 2); last row is the global mean
+    rho: float
+    fitted_through: str
+    matches: int
+    half_life_days: float
+    alpha: float
+
+    def expected_goals(
+        self, home: pd.Series, away: pd.Series, league: pd.Series
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Expected home/away goals; unknown teams and leagues get the average."""
+        teams = pd.Index(self.teams)
+        attack = np.append(self.attack, 0.0)
+        defence = np.append(self.defence, 0.0)
+        home_idx = teams.get_indexer(pd.Series(home).astype(str))
+        away_idx = teams.get_indexer(pd.Series(away).astype(str))
+        league_codes = pd.to_numeric(pd.Series(league), errors="coerce").fillna(-1)
+        league_idx = pd.Index(self.leagues).get_indexer(league_codes.astype(np.int64))
+        offsets = self.offsets[np.where(league_idx < 0, len(self.leagues), league_idx)]
+        lam_home = np.exp(offsets[:, 0] + attack[home_idx] - defence[away_idx])
+        lam_away = np.exp(offsets[:, 1] + attack[away_idx] - defence[home_idx])
+        return lam_home, lam_away
+
+    @property
+    def version(self) -> str:
+        payload = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:12]
+
+    def to_dict(self) -> dict:
+        return {
+            "fitted_through": self.fitted_through,
+            "matches": self.matches,
+            "half_life_days": self.half_life_days,
+            "alpha": self.alpha,
+            "rho": self.rho,
+            "teams": self.teams,
+            "attack": np.round(self.attack, 6).tolist(),
+            "defence": np.round(self.defence, 6).tolist(),
+            "leagues": self.leagues,
+            "offsets": np.round(self.offsets, 6).tolist(),
+        }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Path) -> "TeamStrength":
+        data = json.loads(Path(path).read_text())
+        return cls(
+            teams=data["teams"],
+            attack=np.asarray(data["attack"], dtype=np.float64),
+            defence=np.asarray(data["defence"], dtype=np.float64),
+            leagues=data["leagues"],
+            offsets=np.asarray(data["offsets"], dtype=np.float64),
+            rho=float(data["rho"]),
+            fitted_through=data["fitted_through"],
+            matches=int(data["matches"]),
+            half_life_days=float(data["half_life_days"]),
+            alpha=float(data["alpha"]),
+        )
+
+
+class StrengthFitter:
+    """Fits TeamStrength as of any date, warm-starting from the previous fit."""
+
+    def __init__(
+        self,
+        history: MatchHistory,
+        half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+        alpha: float = DEFAULT_ALPHA,
+    ) -> None:
+        self.history = history
+        self.half_life_days = half_life_days
+        self.alpha = alpha
+        self.beta = None
+        self.iterations = 0
+        # Oldest match still heavier than MIN_WEIGHT, as an age in days.
+        self.window = int(half_life_days * math.log2(1 / MIN_WEIGHT))
+
+    def fit(self, at_day: int) -> TeamStrength | None:
+        """Strengths from matches strictly before `at_day` (None if none)."""
+        h = self.history
+        start = int(np.searchsorted(h.days, at_day - self.window, side="left"))
+        stop = int(np.searchsorted(h.days, at_day, side="left"))
+        if stop <= start:
+            return None
+        weights = decay_weights(h.days[start:stop], at_day, self.half_life_days)
+        league = h.league[start:stop]
+        home_goals, away_goals = h.home_goals[start:stop], h.away_goals[start:stop]
+        offsets = league_offsets(league, home_goals, away_goals, weights, len(h.leagues))
+
+        design = h.design[2 * start : 2 * stop]
+        goals = np.column_stack([home_goals, away_goals]).ravel()
+        offset = offsets[league].ravel()
+        row_weights = np.repeat(weights, 2)
+        self.beta, iterations = fit_strengths(
+            design, goals, offset, row_weights, self.alpha, self.beta
+        )
+        self.iterations += iterations
+
+        t = len(h.teams)
+        attack, defence = self.beta[:t], self.beta[t:]
+        home, away = h.home[start:stop], h.away[start:stop]
+        lam_home = np.exp(offsets[league, 0] + attack[home] - defence[away])
+        lam_away = np.exp(offsets[league, 1] + attack[away] - defence[home])
+        rho = fit_rho(home_goals, away_goals, lam_home, lam_away, weights)
+
+        # Only teams that played inside the window carry information.
+        seen = np.zeros(t, dtype=bool)
+        seen[home] = True
+        seen[away] = True
+        return TeamStrength(
+            teams=h.teams[seen].tolist(),
+            attack=attack[seen].copy(),
+            defence=defence[seen].copy(),
+            leagues=[int(value) for value in h.leagues],
+            offsets=offsets,
+            rho=rho,
+            fitted_through=str(np.datetime64(int(h.days[stop - 1]), "D")),
+            matches=stop - start,
+            half_life_days=self.half_life_days,
+            alpha=self.alpha,
+        )
+
+
+def walk_forward_xg(
+    fitter: StrengthFitter,
+    fixtures: pd.DataFrame,
+    refit_days: int = DEFAULT_REFIT_DAYS,
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """Expected goals for `fixtures` using only earlier matches.
+
+    The model is refit every `refit_days` from the first played match; a
+    fixture uses the latest fit made on or before its date. Fixtures before
+    the first fit get NaN. Returns (home xg, away xg, number of fits).
+    """
+    days = (
+        pd.to_datetime(fixtures["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    )
+    lam_home = np.full(len(fixtures), np.nan)
+    lam_away = np.full(len(fixtures), np.nan)
+    history = fitter.history
+    if len(history.days) == 0 or len(fixtures) == 0:
+        return lam_home, lam_away, 0
+
+    first = int(history.days[0]) + refit_days
+    checkpoints = np.arange(first, max(int(days.max()), first) + 1, refit_days)
+    period = np.searchsorted(checkpoints, days, side="right") - 1
+    fits = 0
+    for idx in np.unique(period[period >= 0]):
+        model = fitter.fit(int(checkpoints[idx]))
+        fits += 1
+        if model is None:
+            continue
+        rows = np.flatnonzero(period == idx)
+        subset = fixtures.iloc[rows]
+        lam_home[rows], lam_away[rows] = model.expected_goals(
+            subset["homeTeam"], subset["awayTeam"], subset["leagueId"]
+        )
+    return lam_home, lam_away, fits
+
+
+def score_matrix(
+    lam_home: np.ndarray, lam_away: np.ndarray, rho: float, max_goals: int = MAX_GOALS
+) -> np.ndarray:
+    """(rows, max_goals + 1, max_goals + 1) scoreline probabilities."""
+    goals = np.arange(max_goals + 1)
+    log_factorial = np.array([math.lgamma(k + 1) for k in goals])
+    lam_home = np.asarray(lam_home, dtype=np.float64)[:, None]
+    lam_away = np.asarray(lam_away, dtype=np.float64)[:, None]
+    home = np.exp(goals * np.log(lam_home) - lam_home - log_factorial)
+    away = np.exp(goals * np.log(lam_away) - lam_away - log_factorial)
+    matrix = home[:, :, None] * away[:, None, :]
+    lh, la = lam_home[:, 0], lam_away[:, 0]
+    matrix[:, 0, 0] *= 1 - lh * la * rho
+    matrix[:, 0, 1] *= 1 + lh * rho
+    matrix[:, 1, 0] *= 1 + la * rho
+    matrix[:, 1, 1] *= 1 - rho
+    matrix = np.clip(matrix, 0.0, None)
+    # Renormalise the mass lost to truncation and the correction.
+    return matrix / matrix.sum(axis=(1, 2), keepdims=True)
+
+
+def is_goal_market(market: str) -> bool:
+    return (
+        market in ("1x2", "btts", "clean_sheet_home", "clean_sheet_away")
+        or RANGE_MARKET.match(market) is not None
+        or OU_MARKET.match(market) is not None
+    )
+
+
+def goal_market_probabilities(
+    matrix: np.ndarray, markets: list[str]
+) -> dict[str, np.ndarray]:
+    """Probabilities per market key (train-markets naming): (rows, 3) for 1x2
+    as HOME/DRAW/AWAY, (rows,) positive-class probability otherwise."""
+    home = matrix.sum(axis=2)
+    away = matrix.sum(axis=1)
+    size = matrix.shape[1]
+    total = np.zeros((len(matrix), 2 * size - 1))
+    for goals in range(size):
+        total[:, goals : goals + size] += matrix[:, goals, :]
+
+    margin = np.subtract.outer(np.arange(size), np.arange(size))
+    result = {}
+    for market in markets:
+        if market == "1x2":
+            result[market] = np.column_stack(
+                [
+                    matrix[:, margin > 0].sum(axis=1),
+                    matrix[:, margin == 0].sum(axis=1),
+                    matrix[:, margin < 0].sum(axis=1),
+                ]
+            )
+        elif market == "btts":
+            result[market] = 1 - home[:, 0] - away[:, 0] + matrix[:, 0, 0]
+        elif market == "clean_sheet_home":
+            result[market] = away[:, 0]
+        elif market == "clean_sheet_away":
+            result[market] = home[:, 0]
+        elif match := OU_MARKET.match(market):
+            result[market] = total[:, int(match.group(1)) + 1 :].sum(axis=1)
+        elif match := RANGE_MARKET.match(market):
+            side, low, high = match.group(1), int(match.group(2)), int(match.group(3))
+            counts = {"total": total, "home": home, "away": away}[side]
+            result[market] = counts[:, low : high + 1].sum(axis=1)
+        else:
+            raise KeyError(f"Not a goal market: {market}")
+    return result
@@ -0,0 +1,455 @@
+"""
+Run create-targets -> train-markets -> export-to-json -> extract-weights,
+re-executing only what changed.
+
+Every stage, and every market within train and export, gets a key: a SHA-256
+over the content of its inputs, its configuration and the code that produces
+it. The keys of the last successful run are stored in
+`<model-dir>/pipeline_state.json`. A stage or market is skipped when its key
+is unchanged and its recorded outputs are still on disk with the same hash.
+
+Keys:
+- targets  --features/--raw/--team-map files, config/league-name-map.json,
+           targets args, create-targets code
+- train    per market: hashes of the columns the market reads (its features,
+           target and season) in the targets table, its MARKETS entry, train
+           args, train-markets code (incl. imported helpers) and library
+           versions
+- export   per market: model.pkl and calibration.json hashes, export args,
+           export code
+- weights  every model.pkl hash, the targets table, weights args, code
+
+So when only corner columns change, only the corners markets are retrained
+and re-exported, and the goal markets keep their models.
+
+Stage options are passed through unchanged (--train-args etc.) and are part
+of the keys. Stages run as `python -m ml <command>` subprocesses.
+
+Usage:
+    python ml/models/run-pipeline.py --train-args "--trials 30 --train-end 2022 --val 2023 --test-start 2024"
+    python ml/models/run-pipeline.py --dry-run
+    python ml/models/run-pipeline.py --stages train,export --force total_corners
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+from importlib import metadata
+from pathlib import Path
+
+import pandas as pd
+
+from feature_store import prepare_features
+from instrumentation import add_instrumentation_args, run_report, span
+
+
+ML_DIR = Path(__file__).resolve().parents[1]
+MODELS_DIR = ML_DIR / "models"
+STAGES = ["targets", "train", "export", "weights"]
+STAGE_SCRIPTS = {
+    "targets": ML_DIR / "targets" / "create-targets.py",
+    "train": MODELS_DIR / "train-markets.py",
+    "export": MODELS_DIR / "export-to-json.py",
+    "weights": MODELS_DIR / "extract-weights.py",
+}
+# Files read by a stage that are neither arguments nor imported code.
+STAGE_CONFIG = {"targets": [ML_DIR / "config" / "league-name-map.json"]}
+LIBRARIES = ["lightgbm", "scikit-learn", "numpy", "pandas", "optuna"]
+
+IMPORT_RE = re.compile(r"^\s*(?:from|import)\s+([A-Za-z_]\w*)", re.MULTILINE)
+SCRIPT_RE = re.compile(r"[\"']([\w-]+\.py)[\"']")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run the ML pipeline, skipping stages and markets whose inputs are unchanged."
+    )
+    parser.add_argument("--features", default="ml/data/features/training.csv")
+    parser.add_argument("--raw", default="ml/data/raw/historical.csv")
+    parser.add_argument("--team-map", default="ml/data/team-name-map.json")
+    parser.add_argument(
+        "--targets",
+        default="ml/data/features/training_with_targets.csv",
+        help="Targets table (create-targets output, train input).",
+    )
+    parser.add_argument("--model-dir", default="ml/models/output")
+    parser.add_argument(
+        "--markets",
+        default="all",
+        help="Comma-separated market keys or 'all'.",
+    )
+    parser.add_argument(
+        "--weights-out", default=None, help="Default: <model-dir>/weights.json."
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Comma-separated subset of {','.join(STAGES)}.",
+    )
+    parser.add_argument("--targets-args", default="", help="Extra create-targets options.")
+    parser.add_argument("--train-args", default="", help="Extra train-markets options.")
+    parser.add_argument("--export-args", default="", help="Extra export-to-json options.")
+    parser.add_argument("--weights-args", default="", help="Extra extract-weights options.")
+    parser.add_argument(
+        "--force",
+        default=None,
+        help="Re-run regardless of keys: 'all', stage names and/or market keys.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the plan without running it."
+    )
+    parser.add_argument(
+        "--state", default=None, help="Default: <model-dir>/pipeline_state.json."
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def digest(*parts) -> str:
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def file_hash(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    sha = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(1 << 20):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def code_hash(script: Path) -> str:
+    """Hash a script plus the ml/models modules and scripts it pulls in."""
+    hashes = {}
+    stack = [script]
+    while stack:
+        path = stack.pop()
+        if path in hashes:
+            continue
+        text = path.read_text()
+        hashes[path] = hashlib.sha256(text.encode()).hexdigest()
+        names = [f"{name}.py" for name in IMPORT_RE.findall(text)]
+        names += SCRIPT_RE.findall(text)
+        for name in names:
+            for directory in (path.parent, MODELS_DIR):
+                candidate = directory / name
+                if candidate.exists() and candidate not in hashes:
+                    stack.append(candidate)
+    return digest(sorted((str(path.relative_to(ML_DIR)), value) for path, value in hashes.items()))
+
+
+def library_versions() -> dict[str, str]:
+    versions = {}
+    for package in LIBRARIES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = "missing"
+    return versions
+
+
+def load_markets() -> dict[str, dict]:
+    """train-markets' MARKETS, including the generated range markets."""
+    spec = importlib.util.spec_from_file_location("train_markets", STAGE_SCRIPTS["train"])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.add_range_markets()
+    return module.MARKETS
+
+
+def column_hashes(df: pd.DataFrame) -> dict[str, str]:
+    return {
+        name: hashlib.sha256(
+            pd.util.hash_pandas_object(df[name], index=False).to_numpy().tobytes()
+        ).hexdigest()
+        for name in df.columns
+    }
+
+
+def split_args(value: str) -> list[str]:
+    return shlex.split(value) if value else []
+
+
+def run_command(command: str, arguments: list[str]) -> None:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ML_DIR.parent), env.get("PYTHONPATH")])
+    )
+    cmd = [sys.executable, "-m", "ml", command, *arguments]
+    print(f"▶️  {shlex.join(cmd[1:])}")
+    result = subprocess.run(cmd, env=env)
+    if result.returncode != 0:
+        raise SystemExit(f"❌ ml {command} failed with exit status {result.returncode}")
+
+
+class Pipeline:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.model_dir = Path(args.model_dir)
+        self.targets_path = Path(args.targets)
+        self.weights_out = Path(args.weights_out or self.model_dir / "weights.json")
+        self.state_path = Path(args.state or self.model_dir / "pipeline_state.json")
+        self.state = (
+            json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        )
+        self.force = {
+            item.strip() for item in (args.force or "").split(",") if item.strip()
+        }
+
+    def forced(self, *names: str) -> bool:
+        return "all" in self.force or any(name in self.force for name in names)
+
+    def save_state(self) -> None:
+        if self.args.dry_run:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        tmp.replace(self.state_path)
+
+    def up_to_date(self, entry: dict | None, key: str, outputs: dict[str, Path]) -> bool:
+        """Same key as last run and every output still has its recorded hash."""
+        if entry is None or entry.get("key") != key:
+            return False
+        recorded = entry.get("outputs", {})
+        return all(recorded.get(name) == file_hash(path) for name, path in outputs.items())
+
+    # ------------------------------------------------------------------ stages
+
+    def run_targets(self) -> None:
+        args = self.args
+        extra = split_args(args.targets_args)
+        inputs = {
+            name: file_hash(Path(path))
+            for name, path in (
+                ("features", args.features),
+                ("raw", args.raw),
+                ("team_map", args.team_map),
+            )
+        }
+        config = {str(path.name): file_hash(path) for path in STAGE_CONFIG["targets"]}
+        key = digest(inputs, config, extra, code_hash(STAGE_SCRIPTS["targets"]))
+        outputs = {
+            "targets": self.targets_path,
+            "team_strength": self.model_dir / "team_strength.json",
+        }
+        if self.up_to_date(self.state.get("targets"), key, outputs) and not self.forced("targets"):
+            print("⏭️  targets: unchanged")
+            return
+        print("🔁 targets: inputs changed")
+        if args.dry_run:
+            return
+        run_command(
+            "targets",
+            [
+                "--features", args.features,
+                "--raw", args.raw,
+                "--team-map", args.team_map,
+                "--out", str(self.targets_path),
+                "--strength-out", str(outputs["team_strength"]),
+                *extra,
+            ],
+        )
+        self.state["targets"] = {
+            "key": key,
+            "outputs": {name: file_hash(path) for name, path in outputs.items()},
+        }
+        self.save_state()
+
+    def market_keys(self, markets: dict[str, dict], requested: list[str]) -> dict[str, str]:
+        with span("hash_columns") as stage:
+            df = pd.read_csv(self.targets_path)
+            stage.rows = len(df)
+            columns = column_hashes(df)
+        target_columns = {config["target"] for config in markets.values()}
+        features = list(prepare_features(df.head(0), target_columns).columns)
+        extra = split_args(self.args.train_args)
+        shared = digest(extra, code_hash(STAGE_SCRIPTS["train"]), library_versions())
+        keys = {}
+        for market in requested:
+            config = markets[market]
+            used = sorted(set(features) | {config["target"], "season"})
+            data = {name: columns.get(name) for name in used}
+            keys[market] = digest(shared, config, data)
+        return keys
+
+    def run_train(self) -> None:
+        markets = load_markets()
+        requested = list(markets) if self.args.markets == "all" else self.requested()
+        unknown = [market for market in requested if market not in markets]
+        if unknown:
+            raise SystemExit(f"Unknown markets: {', '.join(unknown)}")
+        if not self.targets_path.exists():
+            raise SystemExit(f"Targets table not found: {self.targets_path}")
+
+        keys = self.market_keys(markets, requested)
+        recorded = self.state.setdefault("train", {})
+        stale = [
+            market
+            for market in requested
+            if self.forced("train", market)
+            or not self.up_to_date(recorded.get(market), keys[market], self.train_outputs(market))
+        ]
+        self.report("train", requested, stale)
+        if not stale or self.args.dry_run:
+            return
+
+        summary_path = self.model_dir / "summary.json"
+        previous = json.loads(summary_path.read_text()) if summary_path.exists() else []
+        run_command(
+            "train",
+            [
+                "--input", str(self.targets_path),
+                "--out-dir", str(self.model_dir),
+                "--markets", ",".join(stale),
+                *split_args(self.args.train_args),
+            ],
+        )
+        # train-markets writes a summary for this run only; keep the others.
+        current = json.loads(summary_path.read_text()) if summary_path.exists() else []
+        retrained = {entry.get("market") for entry in current}
+        merged = [entry for entry in previous if entry.get("market") not in retrained]
+        summary_path.write_text(json.dumps(merged + current, indent=2))
+
+        for market in stale:
+            recorded[market] = {
+                "key": keys[market],
+                "outputs": {
+                    name: file_hash(path)
+                    for name, path in self.train_outputs(market).items()
+                },
+            }
+        self.save_state()
+
+    def train_outputs(self, market: str) -> dict[str, Path]:
+        return {"model": self.model_dir / market / "model.pkl"}
+
+    def run_export(self) -> None:
+        extra = split_args(self.args.export_args)
+        shared = digest(extra, code_hash(STAGE_SCRIPTS["export"]))
+        markets = [
+            market
+            for market in self.trained_markets()
+            if self.args.markets == "all" or market in self.requested()
+        ]
+        recorded = self.state.setdefault("export", {})
+        keys = {
+            market: digest(
+                shared,
+                file_hash(self.model_dir / market / "model.pkl"),
+                file_hash(self.model_dir / market / "calibration.json"),
+            )
+            for market in markets
+        }
+        outputs = {market: {"model_json": self.model_dir / market / "model.json"} for market in markets}
+        stale = [
+            market
+            for market in markets
+            if self.forced("export", market)
+            or not self.up_to_date(recorded.get(market), keys[market], outputs[market])
+        ]
+        self.report("export", markets, stale)
+        if not stale or self.args.dry_run:
+            return
+        run_command(
+            "export",
+            ["--model-dir", str(self.model_dir), "--markets", ",".join(stale), *extra],
+        )
+        for market in stale:
+            recorded[market] = {
+                "key": keys[market],
+                "outputs": {
+                    name: file_hash(path) for name, path in outputs[market].items()
+                },
+            }
+        self.save_state()
+
+    def run_weights(self) -> None:
+        extra = split_args(self.args.weights_args)
+        models = {
+            market: file_hash(self.model_dir / market / "model.pkl")
+            for market in self.trained_markets()
+        }
+        key = digest(
+            models,
+            file_hash(self.targets_path),
+            extra,
+            code_hash(STAGE_SCRIPTS["weights"]),
+        )
+        outputs = {"weights": self.weights_out}
+        if self.up_to_date(self.state.get("weights"), key, outputs) and not self.forced("weights"):
+            print("⏭️  weights: unchanged")
+            return
+        print("🔁 weights: models or inputs changed")
+        if self.args.dry_run:
+            return
+        run_command(
+            "weights",
+            [
+                "--model-dir", str(self.model_dir),
+                "--input", str(self.targets_path),
+                "--out", str(self.weights_out),
+                *extra,
+            ],
+        )
+        self.state["weights"] = {
+            "key": key,
+            "outputs": {name: file_hash(path) for name, path in outputs.items()},
+        }
+        self.save_state()
+
+    # ----------------------------------------------------------------- helpers
+
+    def requested(self) -> list[str]:
+        return [m.strip() for m in self.args.markets.split(",") if m.strip()]
+
+    def trained_markets(self) -> list[str]:
+        if not self.model_dir.exists():
+            return []
+        return sorted(
+            path.parent.name for path in self.model_dir.glob("*/model.pkl")
+        )
+
+    @staticmethod
+    def report(stage: str, markets: list[str], stale: list[str]) -> None:
+        if not stale:
+            print(f"⏭️  {stage}: all {len(markets)} markets unchanged")
+            return
+        shown = ", ".join(stale[:8]) + (" ..." if len(stale) > 8 else "")
+        print(f"🔁 {stage}: {len(stale)}/{len(markets)} markets changed ({shown})")
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("run-pipeline", args):
+        run_pipeline(args)
+
+
+def run_pipeline(args: argparse.Namespace) -> None:
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(unknown)}")
+
+    pipeline = Pipeline(args)
+    for stage in STAGES:
+        if stage in stages:
+            with span(stage):
+                getattr(pipeline, f"run_{stage}")()
+    if args.dry_run:
+        print("✅ Dry run: later stages were planned against the current outputs")
+    else:
+        print("✅ Pipeline up to date")
+
+
+if __name__ == "__main__":
+    main()
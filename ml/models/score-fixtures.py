@@ -0,0 +1,168 @@
+"""
+Precompute predictions for upcoming fixtures.
+
+Takes feature rows for scheduled fixtures (same columns as the training
+table plus a fixture id) and scores every exported market in one pass: one
+float64 matrix is built for the union of model features and each booster
+predicts all fixtures at once. Calibration embedded in model.json is applied
+exactly as the TypeScript runtime would.
+
+The output is a compact keyed table the backend serves by lookup (see
+apps/backend/.../ml/prediction-table.ts); tree evaluation is only needed for
+fixtures missing from the table or when its version does not match.
+
+Layout:
+    {
+      "version": "<hash of all model versions>",
+      "generated_at": "...",
+      "models": {"1x2": "<sha256 of model.json>", ...},
+      "layout": [{"market": "1x2", "type": "multiclass", "width": 3}, ...],
+      "fixtures": {"<fixtureId>": [p_home, p_draw, p_away, p_btts, ...]}
+    }
+Binary markets store the positive-class probability, multiclass markets
+HOME/DRAW/AWAY and regression markets the predicted value.
+
+Usage:
+    python ml/models/score-fixtures.py --input upcoming.csv --out predictions.json
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import add_instrumentation_args, run_report, span
+from scoring import load_exported, score_market
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Score upcoming fixtures with every exported market."
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="CSV with feature rows for upcoming fixtures.",
+    )
+    parser.add_argument(
+        "--id-column",
+        default="fixtureId",
+        help="Column holding the fixture id used as lookup key.",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default="ml/models/output",
+        help="Directory with model.pkl/model.json per market.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=None,
+        help="Comma-separated market keys (default: every market with a model.json).",
+    )
+    parser.add_argument(
+        "--out",
+        default="ml/models/output/predictions.json",
+        help="Output prediction table.",
+    )
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        default=4,
+        help="Rounding applied to stored probabilities.",
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("score-fixtures", args):
+        score_fixtures(args)
+
+
+def score_fixtures(args: argparse.Namespace) -> None:
+    model_dir = Path(args.model_dir)
+    if args.markets:
+        markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    else:
+        markets = sorted(path.parent.name for path in model_dir.glob("*/model.json"))
+
+    with span("load") as stage:
+        df = pd.read_csv(args.input)
+        stage.rows = len(df)
+    if args.id_column not in df.columns:
+        raise SystemExit(f"Missing id column: {args.id_column}")
+    if df[args.id_column].duplicated().any():
+        raise SystemExit(f"Duplicate fixture ids in {args.id_column}.")
+
+    with span("models") as stage:
+        entries = []
+        for market in markets:
+            try:
+                entry = load_exported(model_dir, market)
+            except RuntimeError as exc:
+                raise SystemExit(str(exc)) from None
+            if entry is None:
+                print(f"⚠️  Skipping {market}: model.pkl, metrics.json or model.json missing")
+                continue
+            entries.append(entry)
+        stage.meta["markets"] = len(entries)
+    if not entries:
+        raise SystemExit("No exported markets to score.")
+
+    # One matrix for the union of model features, shared by every market.
+    with span("matrix") as stage:
+        feature_names: list[str] = []
+        for entry in entries:
+            for name in entry.booster.feature_name():
+                if name not in feature_names:
+                    feature_names.append(name)
+        missing = [name for name in feature_names if name not in df.columns]
+        if missing:
+            print(f"⚠️  {len(missing)} model features missing from input (scored as NaN)")
+        X = df.reindex(columns=feature_names).to_numpy(dtype=np.float64)
+        columns = {name: idx for idx, name in enumerate(feature_names)}
+        stage.rows = len(X)
+
+    blocks = []
+    layout = []
+    with span("score") as stage:
+        for entry in entries:
+            spec = entry.spec
+            cols = [columns[name] for name in entry.booster.feature_name()]
+            scores = score_market(entry.booster, X[:, cols], spec.market_type, entry.calibration)
+            blocks.append(scores)
+            layout.append(
+                {"market": spec.market, "type": spec.market_type, "width": scores.shape[1]}
+            )
+        stage.rows = len(X) * len(entries)
+
+    table = np.round(np.hstack(blocks), args.decimals)
+    models = {entry.spec.market: entry.version for entry in entries}
+    version = hashlib.sha256(json.dumps(models, sort_keys=True).encode()).hexdigest()[:12]
+    ids = df[args.id_column].astype(str).tolist()
+    output = {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "models": models,
+        "layout": layout,
+        "fixtures": dict(zip(ids, table.tolist())),
+    }
+
+    with span("write"):
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(output, separators=(",", ":")))
+
+    print(
+        f"✅ Scored {len(ids)} fixtures x {len(entries)} markets -> {out_path} "
+        f"({out_path.stat().st_size / 1024:.1f} KB, version {version})"
+    )
+
+
+if __name__ == "__main__":
+    main()
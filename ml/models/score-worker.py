@@ -0,0 +1,684 @@
+"""
+Long-lived scoring worker with hot-reloaded models.
+
+Loads every exported market once (model.pkl + metrics.json, with the
+calibration export-to-json.py embedded in model.json) and answers
+JSONL requests over stdin/stdout or a local Unix socket, so callers do not
+pay for a Python start-up, library imports and `joblib.load` per call.
+
+Requests, one JSON object per line:
+    {"id": "r1", "fixtures": [{"fixtureId": 7, "<feature>": 1.2, ...}, ...],
+     "markets": ["1x2", "btts"]}           # "markets" is optional
+    {"id": "s", "op": "stats"}              # latency stats
+    {"id": "m", "op": "markets"}            # loaded markets and versions
+    {"id": "x", "op": "reload"}             # re-check model files now
+
+Responses carry the request id:
+    {"id": "r1", "predictions": {"7": {"1x2": [h, d, a], "btts": p}},
+     "versions": {"1x2": "<sha256 of model.json>", ...}, "latency_ms": 1.8}
+Binary markets return the positive-class probability, multiclass markets
+HOME/DRAW/AWAY and regression markets the predicted value, calibrated like
+score-fixtures.py. Versions are the model.json hashes score-fixtures.py
+writes to the prediction table. Missing features are scored as NaN; errors come back as
+{"id": ..., "error": "..."}.
+
+Goal markets without a trained model (1x2, btts, ou_*, *_range_*,
+clean_sheet_*) fall back to the Dixon-Coles team-strength model that
+create-targets.py --strength-out saves (team_strength.json, see poisson.py).
+Those fixtures need "homeTeam", "awayTeam" and "leagueId"; their version is
+reported as "poisson:<hash>".
+
+Requests that arrive within --max-wait-ms of each other are micro-batched:
+their fixtures are stacked into one matrix and every booster predicts it
+once. Before a batch, model files are re-checked (at most every
+--reload-interval seconds) and a market whose model.pkl, metrics.json or
+model.json changed is reloaded; a market that fails to load (a file still
+being written, or a model.pkl newer than its model.json) keeps the previous
+model until its files change again.
+
+In stdin mode stdout carries only responses; logs go to stderr.
+
+Usage:
+    python ml/models/score-worker.py [--socket /tmp/ml-score.sock]
+
+Examples:
+    echo '{"id": 1, "fixtures": [{"fixtureId": 1}]}' | python ml/models/score-worker.py
+    python ml/models/score-worker.py --socket /tmp/ml-score.sock --max-wait-ms 5
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import add_instrumentation_args, run_report, span
+from poisson import TeamStrength, goal_market_probabilities, is_goal_market, score_matrix
+from scoring import load_exported, score_market
+
+
+CONTROL_OPS = ("stats", "markets", "reload")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve market predictions from resident models over JSONL."
+    )
+    parser.add_argument(
+        "--model-dir",
+        default="ml/models/output",
+        help="Directory with model.pkl/metrics.json/model.json per market.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=None,
+        help="Comma-separated market keys (default: every market with a model.json).",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Serve on this Unix socket path instead of stdin/stdout.",
+    )
+    parser.add_argument(
+        "--id-column",
+        default="fixtureId",
+        help="Fixture field used as key in responses.",
+    )
+    parser.add_argument(
+        "--max-batch-rows",
+        type=int,
+        default=4096,
+        help="Fixtures per micro-batch before it is scored without waiting.",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=2.0,
+        help="How long the first request of a batch waits for others.",
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks of the model files (0 = before every batch).",
+    )
+    parser.add_argument(
+        "--strength",
+        default=None,
+        help=(
+            "Dixon-Coles model used for goal markets without a trained model "
+            "(default: <model-dir>/team_strength.json when present)."
+        ),
+    )
+    parser.add_argument(
+        "--no-fallback",
+        action="store_true",
+        help="Only serve markets with a trained model.",
+    )
+    parser.add_argument(
+        "--no-calibration",
+        action="store_true",
+        help="Ignore the calibration embedded in model.json and return raw model outputs.",
+    )
+    parser.add_argument(
+        "--stats-window",
+        type=int,
+        default=10_000,
+        help="Most recent requests kept for latency percentiles.",
+    )
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        default=6,
+        help="Rounding applied to returned predictions.",
+    )
+    add_instrumentation_args(parser)
+    return parser.parse_args()
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class LoadedMarket:
+    market: str
+    market_type: str
+    booster: object
+    features: list[str]
+    calibration: dict | None
+    version: str
+    stamp: tuple
+
+
+class ModelRegistry:
+    """Resident models, reloaded when their files change on disk."""
+
+    def __init__(
+        self,
+        model_dir: Path,
+        markets: list[str] | None,
+        calibrated: bool,
+        strength_path: Path | None = None,
+    ) -> None:
+        self.model_dir = model_dir
+        self.requested = markets
+        self.calibrated = calibrated
+        self.models: dict[str, LoadedMarket] = {}
+        self.failed: dict[str, tuple] = {}
+        self.strength_path = strength_path
+        self.strength: TeamStrength | None = None
+        self.strength_version = None
+        self.strength_stamp = None
+        self.checked = 0.0
+
+    def candidates(self) -> list[str]:
+        if self.requested is not None:
+            return self.requested
+        return sorted(path.parent.name for path in self.model_dir.glob("*/model.json"))
+
+    def stamp(self, market: str) -> tuple:
+        directory = self.model_dir / market
+        names = ["model.pkl", "metrics.json", "model.json"]
+        return tuple(file_stamp(directory / name) for name in names)
+
+    def load(self, market: str, stamp: tuple) -> LoadedMarket | None:
+        # Same loader as score-fixtures.py, so the reported model.json version
+        # always comes with that file's calibration.
+        exported = load_exported(self.model_dir, market)
+        if exported is None:
+            return None
+        return LoadedMarket(
+            market=market,
+            market_type=exported.spec.market_type,
+            booster=exported.booster,
+            features=exported.booster.feature_name(),
+            calibration=exported.calibration if self.calibrated else None,
+            version=exported.version,
+            stamp=stamp,
+        )
+
+    def refresh(self) -> tuple[list[str], list[str]]:
+        """Reload changed markets and drop deleted ones; returns (reloaded, removed)."""
+        self.checked = time.monotonic()
+        present = set()
+        reloaded = []
+        for market in self.candidates():
+            stamp = self.stamp(market)
+            if None in stamp:
+                continue
+            present.add(market)
+            current = self.models.get(market)
+            if current is not None and current.stamp == stamp:
+                continue
+            if self.failed.get(market) == stamp:
+                continue
+            try:
+                loaded = self.load(market, stamp)
+            except Exception as exc:  # half-written or stale file: keep the old model
+                log(f"⚠️  {market}: reload failed ({exc}); keeping the current model")
+                self.failed[market] = stamp
+                continue
+            self.failed.pop(market, None)
+            if loaded is not None:
+                self.models[market] = loaded
+                reloaded.append(market)
+        removed = [market for market in self.models if market not in present]
+        for market in removed:
+            del self.models[market]
+        if self.strength_path is not None:
+            self.refresh_strength(reloaded, removed)
+        return reloaded, removed
+
+    def refresh_strength(self, reloaded: list[str], removed: list[str]) -> None:
+        stamp = file_stamp(self.strength_path)
+        if stamp == self.strength_stamp:
+            return
+        if stamp is None:
+            self.strength = self.strength_version = self.strength_stamp = None
+            removed.append("poisson")
+            return
+        try:
+            strength = TeamStrength.load(self.strength_path)
+        except Exception as exc:  # half-written file: keep serving the old model
+            log(f"⚠️  poisson: reload failed ({exc}); keeping the current model")
+            return
+        self.strength, self.strength_stamp = strength, stamp
+        self.strength_version = f"poisson:{strength.version}"
+        reloaded.append("poisson")
+
+    def version(self, market: str) -> str | None:
+        if market in self.models:
+            return self.models[market].version
+        return self.strength_version
+
+    def serves(self, market: str) -> bool:
+        return market in self.models or (self.strength is not None and is_goal_market(market))
+
+    def maybe_refresh(self, interval: float) -> None:
+        if time.monotonic() - self.checked < interval:
+            return
+        reloaded, removed = self.refresh()
+        for market in reloaded:
+            log(f"🔄 {market}: loaded version {self.version(market)}")
+        for market in removed:
+            log(f"🗑️  {market}: model removed")
+
+
+class LatencyStats:
+    """Per-request latency over a sliding window, plus running totals."""
+
+    def __init__(self, window: int) -> None:
+        self.latency = deque(maxlen=window)
+        self.queued = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.batch_rows = 0
+        self.lock = threading.Lock()
+
+    def record_batch(self, rows: int) -> None:
+        with self.lock:
+            self.batches += 1
+            self.batch_rows += rows
+
+    def record(self, latency_ms: float, queued_ms: float, rows: int, error: bool) -> None:
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.rows += rows
+            self.latency.append(latency_ms)
+            self.queued.append(queued_ms)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            latency = np.array(self.latency)
+            queued = np.array(self.queued)
+            result = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rows": self.rows,
+                "batches": self.batches,
+                "mean_batch_rows": round(self.batch_rows / max(self.batches, 1), 2),
+                "window": len(latency),
+            }
+        if len(latency):
+            p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+            result["latency_ms"] = {
+                "mean": round(float(latency.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p90": round(float(p90), 3),
+                "p99": round(float(p99), 3),
+                "max": round(float(latency.max()), 3),
+            }
+            result["queued_ms"] = {
+                "p50": round(float(np.percentile(queued, 50)), 3),
+                "p99": round(float(np.percentile(queued, 99)), 3),
+            }
+        return result
+
+
+def fixture_count(payload: dict) -> int:
+    fixtures = payload.get("fixtures")
+    return len(fixtures) if isinstance(fixtures, list) else 0
+
+
+@dataclass
+class Request:
+    payload: dict
+    received: float = field(default_factory=time.perf_counter)
+    started: float = 0.0
+    response: dict | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+    on_done: object = None
+
+    def finish(self, response: dict) -> None:
+        self.response = response
+        self.done.set()
+        if self.on_done is not None:
+            self.on_done(self)
+
+
+class MicroBatcher:
+    """Collects requests from many callers and scores them in shared batches.
+
+    All model access happens on the batcher thread, so reloads never race
+    with scoring.
+    """
+
+    def __init__(self, registry: ModelRegistry, stats: LatencyStats, args: argparse.Namespace) -> None:
+        self.registry = registry
+        self.stats = stats
+        self.args = args
+        self.queue: queue.Queue[Request | None] = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="micro-batcher", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, payload: dict, on_done=None) -> Request:
+        request = Request(payload, on_done=on_done)
+        self.queue.put(request)
+        return request
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            rows = fixture_count(first.payload)
+            deadline = time.perf_counter() + self.args.max_wait_ms / 1000
+            while rows < self.args.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+                rows += fixture_count(request.payload)
+            self.process(batch)
+
+    def process(self, batch: list[Request]) -> None:
+        started = time.perf_counter()
+        for request in batch:
+            request.started = started
+        self.registry.maybe_refresh(self.args.reload_interval)
+
+        scoring = [request for request in batch if request.payload.get("op") is None]
+        if scoring:
+            try:
+                self.score(scoring)
+            except Exception as exc:  # keep serving other batches
+                for request in scoring:
+                    if request.response is None:
+                        self.complete(request, {"error": f"scoring failed: {exc}"})
+        # Control requests answer after the batch's scoring, so stats include it.
+        for request in batch:
+            op = request.payload.get("op")
+            if op in CONTROL_OPS:
+                self.complete(request, self.control(op))
+            elif op is not None:
+                self.complete(request, {"error": f"unknown op {op!r}"})
+
+    def control(self, op: str) -> dict:
+        if op == "reload":
+            reloaded, removed = self.registry.refresh()
+            return {"reloaded": reloaded, "removed": removed}
+        if op == "markets":
+            return {
+                "markets": {
+                    market: {"type": loaded.market_type, "version": loaded.version}
+                    for market, loaded in self.registry.models.items()
+                },
+                "fallback": self.registry.strength_version,
+            }
+        return {"stats": self.stats.snapshot()}
+
+    def complete(self, request: Request, body: dict) -> None:
+        now = time.perf_counter()
+        latency_ms = (now - request.received) * 1000
+        response = {"id": request.payload.get("id"), **body}
+        if "op" not in request.payload:
+            response["latency_ms"] = round(latency_ms, 3)
+            self.stats.record(
+                latency_ms,
+                (request.started - request.received) * 1000,
+                fixture_count(request.payload),
+                "error" in body,
+            )
+        request.finish(response)
+
+    def score(self, requests: list[Request]) -> None:
+        """Score every fixture of the batch with one matrix per market set."""
+        registry = self.registry
+        models = registry.models
+        checked = []
+        for request in requests:
+            fixtures = request.payload.get("fixtures")
+            wanted = request.payload.get("markets")
+            if not isinstance(fixtures, list) or not all(
+                isinstance(fixture, dict) for fixture in fixtures
+            ):
+                self.complete(request, {"error": "'fixtures' must be a list of objects"})
+                continue
+            if wanted is not None and (
+                not isinstance(wanted, list)
+                or not all(isinstance(market, str) for market in wanted)
+            ):
+                self.complete(request, {"error": "'markets' must be a list of market keys"})
+                continue
+            wanted = wanted or list(models)
+            unknown = [market for market in wanted if not registry.serves(market)]
+            if unknown:
+                self.complete(request, {"error": f"markets not loaded: {unknown}"})
+                continue
+            checked.append((request, fixtures, wanted))
+        if not checked:
+            return
+
+        markets = list(dict.fromkeys(market for _, _, wanted in checked for market in wanted))
+        trained = [market for market in markets if market in models]
+        fallback = [market for market in markets if market not in models]
+        feature_names = list(
+            dict.fromkeys(name for market in trained for name in models[market].features)
+        )
+        # Each request's rows are built on their own, so a request whose
+        # fixtures cannot be converted fails alone instead of the whole batch.
+        valid = []
+        blocks = []
+        team_blocks = []
+        for request, fixtures, wanted in checked:
+            try:
+                frame = pd.DataFrame.from_records(fixtures)
+                block = (
+                    frame.reindex(columns=feature_names)
+                    .apply(pd.to_numeric, errors="coerce")
+                    .to_numpy(dtype=np.float64)
+                )
+                teams = frame.reindex(columns=["homeTeam", "awayTeam", "leagueId"])
+            except Exception as exc:
+                self.complete(request, {"error": f"invalid fixtures: {exc}"})
+                continue
+            valid.append((request, fixtures, wanted))
+            blocks.append(block)
+            team_blocks.append(teams)
+        if not valid:
+            return
+        X = np.vstack(blocks)
+        rows = len(X)
+        self.stats.record_batch(rows)
+
+        scores = {}
+        multiclass = {market for market in trained if models[market].market_type == "multiclass"}
+        if trained:
+            columns = {name: idx for idx, name in enumerate(feature_names)}
+            for market in trained:
+                loaded = models[market]
+                cols = [columns[name] for name in loaded.features]
+                block = score_market(
+                    loaded.booster, X[:, cols], loaded.market_type, loaded.calibration
+                )
+                scores[market] = np.round(block, self.args.decimals)
+        if fallback:
+            teams = pd.concat(team_blocks, ignore_index=True)
+            strength = registry.strength
+            lam_home, lam_away = strength.expected_goals(
+                teams["homeTeam"], teams["awayTeam"], teams["leagueId"]
+            )
+            probabilities = goal_market_probabilities(
+                score_matrix(lam_home, lam_away, strength.rho), fallback
+            )
+            for market, block in probabilities.items():
+                scores[market] = np.round(block.reshape(rows, -1), self.args.decimals)
+            multiclass.update(market for market in fallback if market == "1x2")
+
+        offset = 0
+        for request, fixtures, wanted in valid:
+            predictions = {}
+            for row, fixture in enumerate(fixtures, start=offset):
+                key = str(fixture.get(self.args.id_column, row - offset))
+                predictions[key] = {
+                    market: (
+                        scores[market][row].tolist()
+                        if market in multiclass
+                        else float(scores[market][row, 0])
+                    )
+                    for market in wanted
+                }
+            offset += len(fixtures)
+            self.complete(
+                request,
+                {
+                    "predictions": predictions,
+                    "versions": {market: registry.version(market) for market in wanted},
+                },
+            )
+
+
+def parse_line(line: str) -> dict:
+    try:
+        payload = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return {"op": "invalid", "error": f"invalid JSON: {exc}"}
+    if not isinstance(payload, dict):
+        return {"op": "invalid", "error": "request must be a JSON object"}
+    return payload
+
+
+def encode(response: dict) -> str:
+    return json.dumps(response, separators=(",", ":"))
+
+
+def serve_stdin(batcher: MicroBatcher) -> None:
+    """Read requests until EOF; responses are written as batches finish."""
+    write_lock = threading.Lock()
+    pending = []
+
+    def write(request: Request) -> None:
+        with write_lock:
+            sys.stdout.write(encode(request.response) + "\n")
+            sys.stdout.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        payload = parse_line(line)
+        if payload.get("op") == "invalid":
+            write(Request(payload, response={"id": None, "error": payload["error"]}))
+            continue
+        pending.append(batcher.submit(payload, on_done=write))
+    for request in pending:
+        request.done.wait()
+
+
+def serve_socket(batcher: MicroBatcher, path: str) -> None:
+    """One thread per connection; requests from all connections share batches."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                payload = parse_line(line)
+                if payload.get("op") == "invalid":
+                    response = {"id": None, "error": payload["error"]}
+                else:
+                    request = batcher.submit(payload)
+                    request.done.wait()
+                    response = request.response
+                self.wfile.write((encode(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    def stop(signum, frame) -> None:
+        raise KeyboardInterrupt
+
+    # Service managers stop the worker with SIGTERM; clean up like Ctrl-C.
+    signal.signal(signal.SIGTERM, stop)
+    if os.path.exists(path):
+        os.unlink(path)
+    with Server(path, Handler) as server:
+        log(f"✅ Listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+def main() -> None:
+    args = parse_args()
+    with run_report("score-worker", args):
+        serve(args)
+
+
+def serve(args: argparse.Namespace) -> None:
+    markets = (
+        [m.strip() for m in args.markets.split(",") if m.strip()] if args.markets else None
+    )
+    model_dir = Path(args.model_dir)
+    strength_path = None
+    if not args.no_fallback:
+        strength_path = Path(args.strength) if args.strength else model_dir / "team_strength.json"
+    registry = ModelRegistry(model_dir, markets, not args.no_calibration, strength_path)
+    with span("models") as stage:
+        registry.refresh()
+        stage.meta["markets"] = len(registry.models)
+    if not registry.models and registry.strength is None:
+        raise SystemExit(f"No trained markets in {args.model_dir}.")
+    log(f"✅ Loaded {len(registry.models)} markets: {', '.join(registry.models) or 'none'}")
+    if registry.strength is not None:
+        log(
+            f"✅ Goal-market fallback {registry.strength_version} "
+            f"({len(registry.strength.teams)} teams, through {registry.strength.fitted_through})"
+        )
+
+    stats = LatencyStats(args.stats_window)
+    batcher = MicroBatcher(registry, stats, args)
+    batcher.start()
+    try:
+        if args.socket:
+            serve_socket(batcher, args.socket)
+        else:
+            serve_stdin(batcher)
+    finally:
+        batcher.stop()
+        log(f"📊 {json.dumps(stats.snapshot())}")
+
+
+if __name__ == "__main__":
+    main()
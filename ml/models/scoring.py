@@ -0,0 +1,63 @@
+"""
+Scoring trained markets the way the TypeScript runtime does.
+
+Shared by score-fixtures.py (precomputed prediction table) and
+score-worker.py (resident models), so both return the same values.
+
+Both score with the model.pkl booster but report the hash of the exported
+model.json as its version, so `load_exported` refuses a model.pkl that was
+rewritten after the export (e.g. by train-markets.py --update): the version
+would describe a different model.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from calibration import calibrate_probabilities
+from model_io import MarketSpec, load_booster, load_market_spec, model_version
+
+
+@dataclass
+class ExportedMarket:
+    spec: MarketSpec
+    booster: object
+    version: str
+    calibration: dict | None
+
+
+def load_exported(model_dir: Path, market: str) -> ExportedMarket | None:
+    """Booster, model.json version and embedded calibration of one market.
+
+    Returns None when model.pkl, metrics.json or model.json is missing and
+    raises RuntimeError when model.pkl is newer than model.json.
+    """
+    spec = load_market_spec(model_dir, market)
+    model_json_path = model_dir / market / "model.json"
+    if spec is None or not model_json_path.exists():
+        return None
+    if spec.model_path.stat().st_mtime_ns > model_json_path.stat().st_mtime_ns:
+        raise RuntimeError(
+            f"{market}: model.pkl is newer than model.json; re-run export-to-json.py"
+        )
+    exported = json.loads(model_json_path.read_text())
+    return ExportedMarket(
+        spec=spec,
+        booster=load_booster(spec.model_path),
+        version=model_version(model_json_path),
+        calibration=exported.get("calibration"),
+    )
+
+
+def score_market(booster, X: np.ndarray, market_type: str, calibration: dict | None) -> np.ndarray:
+    """(rows, width) scores for one market, calibrated like the runtime."""
+    preds = booster.predict(X)
+    if market_type == "multiclass":
+        if calibration is not None:
+            preds = calibrate_probabilities(calibration, preds)
+        return preds
+    if market_type == "binary" and calibration is not None:
+        preds = calibrate_probabilities(calibration, preds)
+    return preds.reshape(-1, 1)
@@ -0,0 +1,236 @@
+"""
+Zero-copy numeric datasets shared with process-pool workers.
+
+The parent process copies arrays (feature matrix, target columns, season
+index, ...) into named shared-memory blocks once, or into memory-mapped
+files when a spill directory is given (useful where /dev/shm is small, e.g.
+Docker's 64MB default). Workers receive only a small picklable handle and
+attach read-only NumPy views by name, so per-worker memory does not grow with
+the dataset:
+
+    with SharedDataset.from_frame(df, feature_columns, ["btts_yes"]) as shared:
+        with ProcessPoolExecutor(
+            initializer=_init_worker, initargs=(shared.handle,)
+        ) as pool:
+            ...
+
+    def _init_worker(handle):
+        view = attach(handle)  # view.X, view.arrays["target/btts_yes"], ...
+
+The owner unlinks the blocks on exit; attachments are cached per process.
+"""
+
+import secrets
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+FEATURES = "X"
+SEASONS = "season"
+
+
+@dataclass(frozen=True)
+class SharedArraySpec:
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+    path: str | None = None  # memory-mapped file instead of shared memory
+
+
+@dataclass(frozen=True)
+class SharedDatasetHandle:
+    """Everything a worker needs to attach; cheap to pickle."""
+
+    token: str
+    arrays: dict[str, SharedArraySpec]
+    columns: list[str] = field(default_factory=list)
+    categories: dict[str, list[str]] = field(default_factory=dict)
+
+
+@dataclass
+class SharedView:
+    arrays: dict[str, np.ndarray]
+    columns: list[str]
+    categories: dict[str, list[str]]
+
+    @property
+    def X(self) -> np.ndarray:
+        return self.arrays[FEATURES]
+
+    def target(self, name: str) -> np.ndarray:
+        return self.arrays[f"target/{name}"]
+
+    def frame(self) -> pd.DataFrame:
+        """Feature matrix as a DataFrame backed by the shared buffer."""
+        return pd.DataFrame(self.X, columns=self.columns, copy=False)
+
+
+class SharedDataset:
+    """Owner of a set of shared arrays; use as a context manager."""
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        *,
+        columns: list[str] | None = None,
+        categories: dict[str, list[str]] | None = None,
+        directory: str | Path | None = None,
+    ) -> None:
+        token = secrets.token_hex(6)
+        self._blocks: list[shared_memory.SharedMemory] = []
+        self._spill_dir: Path | None = None
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            self._spill_dir = Path(
+                tempfile.mkdtemp(prefix=f"shared-{token}-", dir=directory)
+            )
+
+        specs: dict[str, SharedArraySpec] = {}
+        try:
+            for idx, (key, array) in enumerate(arrays.items()):
+                array = np.ascontiguousarray(array)
+                specs[key] = self._store(f"ml-{token}-{idx}", array)
+        except BaseException:
+            self.close()
+            raise
+        self.handle = SharedDatasetHandle(
+            token=token,
+            arrays=specs,
+            columns=list(columns or []),
+            categories=dict(categories or {}),
+        )
+
+    def _store(self, name: str, array: np.ndarray) -> SharedArraySpec:
+        if self._spill_dir is not None:
+            path = self._spill_dir / f"{name}.bin"
+            if array.size:
+                target = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape)
+                target[...] = array
+                target.flush()
+                del target
+            return SharedArraySpec(name, array.shape, array.dtype.str, str(path))
+
+        block = shared_memory.SharedMemory(
+            name=name, create=True, size=max(array.nbytes, 1)
+        )
+        self._blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return SharedArraySpec(name, array.shape, array.dtype.str)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        feature_columns: list[str],
+        target_columns: list[str] = (),
+        *,
+        season_column: str | None = SEASONS,
+        directory: str | Path | None = None,
+    ) -> "SharedDataset":
+        """Share a float64 feature matrix, targets and the season index.
+
+        Missing feature columns become NaN. Non-numeric targets (e.g. the
+        1x2 `result`) are stored as float codes with NaN for missing values;
+        their labels are in `handle.categories`.
+        """
+        arrays = {
+            FEATURES: df.reindex(columns=feature_columns).to_numpy(dtype=np.float64)
+        }
+        categories: dict[str, list[str]] = {}
+        for name in target_columns:
+            values = df[name]
+            if pd.api.types.is_numeric_dtype(values):
+                arrays[f"target/{name}"] = values.to_numpy(dtype=np.float64)
+            else:
+                codes, labels = pd.factorize(values, sort=True)
+                encoded = codes.astype(np.float64)
+                encoded[codes < 0] = np.nan
+                arrays[f"target/{name}"] = encoded
+                categories[name] = [str(label) for label in labels]
+        if season_column is not None and season_column in df.columns:
+            arrays[SEASONS] = df[season_column].to_numpy(dtype=np.int64)
+        return cls(
+            arrays,
+            columns=list(feature_columns),
+            categories=categories,
+            directory=directory,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            int(np.prod(spec.shape)) * np.dtype(spec.dtype).itemsize
+            for spec in self.handle.arrays.values()
+        )
+
+    def close(self) -> None:
+        """Release and unlink every block (idempotent)."""
+        if hasattr(self, "handle"):
+            detach(self.handle)
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Views still exist; the mapping goes away with the last one.
+                pass
+            block.unlink()
+        self._blocks = []
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# token -> (open shared-memory blocks kept alive, view)
+_ATTACHED: dict[str, tuple[list[shared_memory.SharedMemory], SharedView]] = {}
+
+
+def attach(handle: SharedDatasetHandle) -> SharedView:
+    """Read-only views onto a shared dataset (cached per process)."""
+    cached = _ATTACHED.get(handle.token)
+    if cached is not None:
+        return cached[1]
+
+    blocks: list[shared_memory.SharedMemory] = []
+    arrays: dict[str, np.ndarray] = {}
+    for key, spec in handle.arrays.items():
+        if spec.path is not None:
+            if int(np.prod(spec.shape)) == 0:
+                array = np.empty(spec.shape, dtype=spec.dtype)
+            else:
+                array = np.memmap(spec.path, dtype=spec.dtype, mode="r", shape=spec.shape)
+        else:
+            block = shared_memory.SharedMemory(name=spec.name)
+            blocks.append(block)
+            array = np.ndarray(spec.shape, dtype=spec.dtype, buffer=block.buf)
+        array.flags.writeable = False
+        arrays[key] = array
+
+    view = SharedView(arrays, handle.columns, handle.categories)
+    _ATTACHED[handle.token] = (blocks, view)
+    return view
+
+
+def detach(handle: SharedDatasetHandle) -> None:
+    """Drop this process's cached views of a shared dataset."""
+    cached = _ATTACHED.pop(handle.token, None)
+    if cached is None:
+        return
+    blocks, view = cached
+    view.arrays.clear()
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass
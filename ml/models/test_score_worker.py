@@ -0,0 +1,90 @@
+"""
+Tests for score-worker.py micro-batching.
+
+Run with: python -m pytest ml/models
+"""
+
+import argparse
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+MODELS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(MODELS_DIR))
+
+
+def load_worker():
+    spec = importlib.util.spec_from_file_location("score_worker", MODELS_DIR / "score-worker.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+worker = load_worker()
+
+
+@pytest.fixture
+def batcher(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 2))
+    y = (X[:, 0] > 0).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=5, verbose=-1).fit(X, y)
+    market_dir = tmp_path / "btts"
+    market_dir.mkdir()
+    joblib.dump(model, market_dir / "model.pkl")
+    (market_dir / "metrics.json").write_text(json.dumps({"target": "btts_yes", "type": "binary"}))
+    # Only its hash and calibration are read; written last so it is not stale.
+    (market_dir / "model.json").write_text("{}")
+
+    registry = worker.ModelRegistry(tmp_path, None, calibrated=True)
+    registry.refresh()
+    args = argparse.Namespace(reload_interval=1000.0, id_column="fixtureId", decimals=6)
+    return worker.MicroBatcher(registry, worker.LatencyStats(100), args)
+
+
+def score_batch(batcher, payloads: list[dict]) -> dict:
+    requests = [worker.Request(payload) for payload in payloads]
+    batcher.process(requests)
+    return {request.payload["id"]: request.response for request in requests}
+
+
+def test_bad_fixtures_fail_alone(batcher):
+    good = {"id": "good", "fixtures": [{"fixtureId": 7, "Column_0": 1.0, "Column_1": 0.0}]}
+    responses = score_batch(batcher, [good, {"id": "bad", "fixtures": [1, 2]}])
+
+    assert responses["bad"]["error"] == "'fixtures' must be a list of objects"
+    assert "error" not in responses["good"]
+    assert 0 <= responses["good"]["predictions"]["7"]["btts"] <= 1
+
+
+def test_bad_markets_fail_alone(batcher):
+    good = {"id": "good", "fixtures": [{"fixtureId": 1}], "markets": ["btts"]}
+    responses = score_batch(
+        batcher,
+        [
+            {"id": "string", "fixtures": [{"fixtureId": 2}], "markets": "btts"},
+            good,
+            {"id": "unknown", "fixtures": [{"fixtureId": 3}], "markets": ["ou_2_5"]},
+        ],
+    )
+
+    assert responses["string"]["error"] == "'markets' must be a list of market keys"
+    assert responses["unknown"]["error"] == "markets not loaded: ['ou_2_5']"
+    assert set(responses["good"]["predictions"]["1"]) == {"btts"}
+
+
+def test_batch_matches_single_requests(batcher):
+    fixtures = [{"fixtureId": idx, "Column_0": value} for idx, value in enumerate([-1.0, 2.0])]
+    together = score_batch(
+        batcher,
+        [{"id": "a", "fixtures": fixtures[:1]}, {"id": "b", "fixtures": fixtures[1:]}],
+    )
+    alone = score_batch(batcher, [{"id": "b", "fixtures": fixtures[1:]}])
+
+    assert together["b"]["predictions"] == alone["b"]["predictions"]
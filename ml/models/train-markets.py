@@ -1,35 +1,87 @@
 import argparse
+import copy
 import json
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import joblib
-import lightgbm as lgb
-import optuna
+import numpy as np
 import pandas as pd
-from sklearn.metrics import log_loss, mean_squared_error
+
+from drift import reference_histograms
+from feature_store import load_table, prepare_features
+from instrumentation import (
+    add_instrumentation_args,
+    count,
+    optuna_callbacks,
+    run_report,
+    span,
+)
+from lazy_imports import lazy_import
+from model_cost import COST_MEASURES, model_cost
+
+joblib = lazy_import("joblib")
+lgb = lazy_import("lightgbm")
+optuna = lazy_import("optuna")
+sk_metrics = lazy_import("sklearn.metrics")
 
 
 MARKETS = {
     "1x2": {"target": "result", "type": "multiclass"},
     "btts": {"target": "btts_yes", "type": "binary"},
-    "ou_0_5": {"target": "ou_over_0_5", "type": "binary"},
-    "ou_1_5": {"target": "ou_over_1_5", "type": "binary"},
-    "ou_2_5": {"target": "ou_over_2_5", "type": "binary"},
-    "ou_3_5": {"target": "ou_over_3_5", "type": "binary"},
-    "ou_4_5": {"target": "ou_over_4_5", "type": "binary"},
-    "ou_5_5": {"target": "ou_over_5_5", "type": "binary"},
+    "ou_0_5": {"target": "ou_over_0_5", "type": "binary", "group": "ou_lines"},
+    "ou_1_5": {"target": "ou_over_1_5", "type": "binary", "group": "ou_lines"},
+    "ou_2_5": {"target": "ou_over_2_5", "type": "binary", "group": "ou_lines"},
+    "ou_3_5": {"target": "ou_over_3_5", "type": "binary", "group": "ou_lines"},
+    "ou_4_5": {"target": "ou_over_4_5", "type": "binary", "group": "ou_lines"},
+    "ou_5_5": {"target": "ou_over_5_5", "type": "binary", "group": "ou_lines"},
     "fh_1x2": {"target": "fh_result", "type": "multiclass"},
     "fh_goals": {"target": "fh_goals_total", "type": "regression"},
     "sh_goals": {"target": "sh_goals_total", "type": "regression"},
     "clean_sheet_home": {"target": "clean_sheet_home", "type": "binary"},
     "clean_sheet_away": {"target": "clean_sheet_away", "type": "binary"},
-    "total_cards": {"target": "total_cards", "type": "regression"},
-    "home_cards": {"target": "home_cards", "type": "regression"},
-    "away_cards": {"target": "away_cards", "type": "regression"},
-    "total_corners": {"target": "total_corners", "type": "regression"},
-    "home_corners": {"target": "home_corners", "type": "regression"},
-    "away_corners": {"target": "away_corners", "type": "regression"},
+    "total_cards": {"target": "total_cards", "type": "regression", "group": "cards"},
+    "home_cards": {"target": "home_cards", "type": "regression", "group": "cards"},
+    "away_cards": {"target": "away_cards", "type": "regression", "group": "cards"},
+    "total_corners": {"target": "total_corners", "type": "regression", "group": "corners"},
+    "home_corners": {"target": "home_corners", "type": "regression", "group": "corners"},
+    "away_corners": {"target": "away_corners", "type": "regression", "group": "corners"},
+}
+
+
+# Successive-halving fidelity ladder per market type (used by --search halving).
+# Each rung trains on a subset of the training seasons: `seasons` keeps the
+# most recent N seasons, `rows` a seeded fraction of rows, `{}` everything.
+# The top 1/eta candidates of a rung are promoted to the next one. A market
+# can override its type's ladder with its own "fidelity" entry in MARKETS.
+FIDELITY = {
+    "binary": {"rungs": [{"seasons": 3}, {"seasons": 8}, {}], "eta": 3},
+    "multiclass": {"rungs": [{"seasons": 4}, {"seasons": 10}, {}], "eta": 3},
+    "regression": {"rungs": [{"rows": 0.2}, {"rows": 0.5}, {}], "eta": 3},
+}
+
+# Optuna search space: name -> (kind, low, high).
+SEARCH_SPACE = {
+    "learning_rate": ("float", 0.01, 0.2),
+    "num_leaves": ("int", 16, 128),
+    "min_child_samples": ("int", 10, 100),
+    "subsample": ("float", 0.6, 1.0),
+    "colsample_bytree": ("float", 0.6, 1.0),
+    "reg_alpha": ("float", 0.0, 1.0),
+    "reg_lambda": ("float", 0.0, 1.0),
+}
+
+# Related markets (MARKETS "group") tuned together by --transfer: the
+# representative gets the full search, its siblings a short search around its
+# best parameters. If the representative is not requested, the group's first
+# requested market takes its place.
+TRANSFER_GROUPS = {
+    "ou_lines": "ou_2_5",
+    "total_range": "total_range_2_4",
+    "side_range": "home_range_1_3",
+    "cards": "total_cards",
+    "corners": "total_corners",
 }
 
 
@@ -55,14 +107,17 @@ def add_range_markets() -> None:
         MARKETS[f"total_range_{low}_{high}"] = {
             "target": f"total_range_{low}_{high}",
             "type": "binary",
+            "group": "total_range",
         }
         MARKETS[f"home_range_{low}_{high}"] = {
             "target": f"home_range_{low}_{high}",
             "type": "binary",
+            "group": "side_range",
         }
         MARKETS[f"away_range_{low}_{high}"] = {
             "target": f"away_range_{low}_{high}",
             "type": "binary",
+            "group": "side_range",
         }
 
 
@@ -79,6 +134,32 @@ def parse_args() -> argparse.Namespace:
         help="Output directory for models and metrics.",
     )
     parser.add_argument("--trials", type=int, default=30, help="Optuna trials.")
+    parser.add_argument(
+        "--search",
+        choices=["full", "halving"],
+        default="full",
+        help=(
+            "full = every trial trains on all training seasons; halving = "
+            "successive halving over the FIDELITY ladder (ignores --timeout)."
+        ),
+    )
+    parser.add_argument(
+        "--cost",
+        choices=COST_MEASURES,
+        default=None,
+        help=(
+            "Also minimize this inference-cost measure (multi-objective); the "
+            "Pareto front is written to metrics.json."
+        ),
+    )
+    parser.add_argument(
+        "--budget",
+        default=None,
+        help=(
+            "Cost budget used to pick a Pareto point: one number for every "
+            "market or market=value pairs (e.g. btts=20000,1x2=40000)."
+        ),
+    )
     parser.add_argument(
         "--timeout",
         type=int,
@@ -102,48 +183,110 @@ def parse_args() -> argparse.Namespace:
         default="all",
         help="Comma-separated market keys or 'all'.",
     )
+    parser.add_argument(
+        "--walk-forward",
+        action="store_true",
+        help="Evaluate every season cutoff instead of training the single split.",
+    )
+    parser.add_argument(
+        "--wf-start",
+        type=int,
+        default=None,
+        help="First walk-forward test season (default: third season in the data).",
+    )
+    parser.add_argument(
+        "--wf-end",
+        type=int,
+        default=None,
+        help="Last walk-forward test season (default: last season in the data).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Walk-forward folds trained concurrently.",
+    )
+    parser.add_argument(
+        "--update",
+        choices=["refit", "boost"],
+        default=None,
+        help=(
+            "Update existing models instead of searching: refit leaf values on "
+            "every labelled row up to the latest matchday, or boost extra trees "
+            "from the current model."
+        ),
+    )
+    parser.add_argument(
+        "--update-trees",
+        type=int,
+        default=20,
+        help=(
+            "Boosting iterations appended per market by --update boost (one tree "
+            "per class each); the model grows with every boost update."
+        ),
+    )
+    parser.add_argument(
+        "--max-update-trees",
+        type=int,
+        default=200,
+        help=(
+            "Boosting iterations --update boost may add after a full training; "
+            "past it the market is retrained from scratch."
+        ),
+    )
+    parser.add_argument(
+        "--refit-decay",
+        type=float,
+        default=0.9,
+        help="Weight of the old leaf values in --update refit (LightGBM decay_rate).",
+    )
+    parser.add_argument(
+        "--update-threshold",
+        type=float,
+        default=0.02,
+        help=(
+            "Relative holdout-loss increase over the current model that makes "
+            "--update fall back to a full training."
+        ),
+    )
+    parser.add_argument(
+        "--update-holdout-days",
+        type=int,
+        default=28,
+        help="Days of the latest results held out to gate --update.",
+    )
+    parser.add_argument(
+        "--transfer",
+        action="store_true",
+        help=(
+            "Tune one representative per group of related markets and seed the "
+            "others' searches with its best parameters (see TRANSFER_GROUPS)."
+        ),
+    )
+    parser.add_argument(
+        "--transfer-trials",
+        type=float,
+        default=0.25,
+        help="Share of --trials run for a market seeded by --transfer.",
+    )
+    parser.add_argument(
+        "--transfer-width",
+        type=float,
+        default=0.25,
+        help="Width of a seeded search space as a share of the full range.",
+    )
+    parser.add_argument(
+        "--feature-store",
+        default=None,
+        help=(
+            "Cache the parsed --input as memory-mapped arrays under this directory "
+            "(keyed by file hash) and read it from there on later runs."
+        ),
+    )
+    add_instrumentation_args(parser)
     return parser.parse_args()
 
 
-def prepare_features(df: pd.DataFrame, target_columns: set[str]) -> pd.DataFrame:
-    numeric_df = df.select_dtypes(include=["number"]).copy()
-    drop_cols = [
-        "homeGoals",
-        "awayGoals",
-        "totalGoals",
-        "HTHome",
-        "HTAway",
-        "HomeCorners",
-        "AwayCorners",
-        "HomeYellow",
-        "AwayYellow",
-        "HomeRed",
-        "AwayRed",
-        "fh_goals_total",
-        "sh_goals_total",
-        "home_cards",
-        "away_cards",
-        "total_cards",
-        "home_corners",
-        "away_corners",
-        "total_corners",
-    ]
-    drop_cols.extend(sorted(target_columns))
-    for col in drop_cols:
-        if col in numeric_df.columns:
-            numeric_df = numeric_df.drop(columns=[col])
-    for col in list(numeric_df.columns):
-        if (
-            col.startswith("ou_over_")
-            or col.startswith("total_range_")
-            or col.startswith("home_range_")
-            or col.startswith("away_range_")
-            or col.startswith("clean_sheet_")
-        ):
-            numeric_df = numeric_df.drop(columns=[col])
-    return numeric_df
-
-
 def split_by_season(
     df: pd.DataFrame, train_end: int, val_season: int, test_start: int
 ):
@@ -153,40 +296,213 @@ def split_by_season(
     return train, val, test
 
 
-def objective(trial, X_train, y_train, X_val, y_val, market_type):
-    params = {
-        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.2),
-        "num_leaves": trial.suggest_int("num_leaves", 16, 128),
-        "min_child_samples": trial.suggest_int("min_child_samples", 10, 100),
-        "subsample": trial.suggest_float("subsample", 0.6, 1.0),
-        "colsample_bytree": trial.suggest_float("colsample_bytree", 0.6, 1.0),
-        "reg_alpha": trial.suggest_float("reg_alpha", 0.0, 1.0),
-        "reg_lambda": trial.suggest_float("reg_lambda", 0.0, 1.0),
-        "verbose": -1,
-    }
+def suggest_params(trial, space: dict | None = None) -> dict:
+    params = {}
+    for name, (kind, low, high) in (space or SEARCH_SPACE).items():
+        if kind == "int":
+            params[name] = trial.suggest_int(name, low, high)
+        else:
+            params[name] = trial.suggest_float(name, low, high)
+    params["verbose"] = -1
+    return params
+
+
+def narrowed_space(best_params: dict, width: float) -> dict:
+    """SEARCH_SPACE shrunk to `width` of each range, centred on best_params."""
+    space = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if name not in best_params:
+            space[name] = (kind, low, high)
+            continue
+        half = (high - low) * width / 2
+        centre = min(max(best_params[name], low), high)
+        # Shift the window back inside the full range rather than clipping it.
+        start = min(max(centre - half, low), high - 2 * half)
+        end = start + 2 * half
+        if kind == "int":
+            start, end = math.floor(start), math.ceil(end)
+        space[name] = (kind, start, end)
+    return space
 
+
+def transfer_order(requested: list[str]) -> list[str]:
+    """Requested markets with each group's representative moved ahead of its
+    siblings."""
+    representatives = {}
+    for market_key in requested:
+        group = MARKETS.get(market_key, {}).get("group")
+        if group is None:
+            continue
+        if group not in representatives or market_key == TRANSFER_GROUPS.get(group):
+            representatives[group] = market_key
+    ordered = []
+    for market_key in requested:
+        group = MARKETS.get(market_key, {}).get("group")
+        if group is not None and representatives[group] not in ordered:
+            ordered.append(representatives[group])
+        if market_key not in ordered:
+            ordered.append(market_key)
+    return ordered
+
+
+def fit_model(params, X_train, y_train, market_type, init_model=None):
     if market_type == "regression":
         model = lgb.LGBMRegressor(**params)
-        model.fit(X_train, y_train)
-        preds = model.predict(X_val)
-        mse = mean_squared_error(y_val, preds)
-        return math.sqrt(mse)
-
-    if market_type == "multiclass":
-        classes = sorted(y_train.unique())
+    elif market_type == "multiclass":
         model = lgb.LGBMClassifier(
             objective="multiclass",
-            num_class=len(classes),
+            num_class=y_train.nunique(),
             **params,
         )
-        model.fit(X_train, y_train)
+    else:
+        model = lgb.LGBMClassifier(objective="binary", **params)
+    model.fit(X_train, y_train, init_model=init_model)
+    return model
+
+
+def score_model(model, X_val, y_val, market_type):
+    if market_type == "regression":
+        preds = model.predict(X_val)
+        mse = sk_metrics.mean_squared_error(y_val, preds)
+        return math.sqrt(mse)
+
+    if market_type == "multiclass":
         preds = model.predict_proba(X_val)
-        return log_loss(y_val, preds, labels=classes)
+        return sk_metrics.log_loss(y_val, preds, labels=model.classes_)
 
-    model = lgb.LGBMClassifier(objective="binary", **params)
-    model.fit(X_train, y_train)
     preds = model.predict_proba(X_val)[:, 1]
-    return log_loss(y_val, preds)
+    return sk_metrics.log_loss(y_val, preds)
+
+
+def evaluate_params(params, X_train, y_train, X_val, y_val, market_type):
+    model = fit_model(params, X_train, y_train, market_type)
+    return score_model(model, X_val, y_val, market_type)
+
+
+def objective(trial, X_train, y_train, X_val, y_val, market_type, space=None):
+    params = suggest_params(trial, space)
+    return evaluate_params(params, X_train, y_train, X_val, y_val, market_type)
+
+
+def cost_objective(trial, X_train, y_train, X_val, y_val, market_type, cost, space=None):
+    """(loss, inference cost) for multi-objective studies.
+
+    Every cost measure is stored as a trial user attribute so the Pareto
+    front can be read against any of them.
+    """
+    model = fit_model(suggest_params(trial, space), X_train, y_train, market_type)
+    costs = model_cost(model.booster_)
+    for key, value in costs.items():
+        trial.set_user_attr(key, value)
+    return score_model(model, X_val, y_val, market_type), costs[cost]
+
+
+def parse_budget(value: str | None, market_key: str) -> float | None:
+    if value is None:
+        return None
+    if "=" not in value:
+        return float(value)
+    for item in value.split(","):
+        key, _, budget = item.partition("=")
+        if key.strip() == market_key:
+            return float(budget)
+    return None
+
+
+def pareto_front(study) -> list[dict]:
+    front = [
+        {
+            "number": trial.number,
+            "loss": trial.values[0],
+            **{key: trial.user_attrs[key] for key in COST_MEASURES},
+            "params": trial.params,
+        }
+        for trial in study.best_trials
+    ]
+    return sorted(front, key=lambda point: point["loss"])
+
+
+def select_pareto_point(front: list[dict], cost: str, budget: float | None) -> dict:
+    """Lowest-loss point within budget, else the cheapest point."""
+    within = [point for point in front if budget is None or point[cost] <= budget]
+    if within:
+        return min(within, key=lambda point: point["loss"])
+    return min(front, key=lambda point: point[cost])
+
+
+def fidelity_mask(seasons: np.ndarray, rung: dict, seed: int = 42) -> np.ndarray:
+    """Rows of the training split used at one fidelity rung."""
+    if "seasons" in rung:
+        recent = np.unique(seasons)[-rung["seasons"] :]
+        return np.isin(seasons, recent)
+    if "rows" in rung:
+        rng = np.random.default_rng(seed)
+        return rng.random(len(seasons)) < rung["rows"]
+    return np.ones(len(seasons), dtype=bool)
+
+
+def successive_halving(
+    study,
+    X_train,
+    y_train,
+    seasons,
+    X_val,
+    y_val,
+    market_type,
+    fidelity,
+    n_trials,
+    callbacks,
+    space=None,
+) -> list[dict]:
+    """Sample n_trials candidates and promote the best 1/eta up each rung.
+
+    Only candidates scored on the last (full) rung complete; the rest are
+    recorded as pruned with their last score reported as intermediate value,
+    so study.best_params is always a full-data result.
+    """
+    eta = fidelity["eta"]
+    # Drop rungs that are no cheaper than the rung above them (e.g. "last 8
+    # seasons" when there are only 6). The final rung is always full data.
+    rungs = [({}, np.ones(len(seasons), dtype=bool))]
+    for rung in reversed(fidelity["rungs"][:-1]):
+        mask = fidelity_mask(seasons, rung)
+        if mask.sum() < rungs[0][1].sum():
+            rungs.insert(0, (rung, mask))
+
+    candidates = [study.ask() for _ in range(n_trials)]
+    params = {trial.number: suggest_params(trial, space) for trial in candidates}
+    summary = []
+    for level, (rung, mask) in enumerate(rungs):
+        last = level == len(rungs) - 1
+        X_rung, y_rung = X_train[mask], y_train[mask]
+        with span(f"rung{level}") as stage:
+            scores = {
+                trial.number: evaluate_params(
+                    params[trial.number], X_rung, y_rung, X_val, y_val, market_type
+                )
+                for trial in candidates
+            }
+            stage.rows = len(X_rung)
+            stage.meta["candidates"] = len(candidates)
+        count("halving_fit_rows", len(X_rung) * len(candidates))
+        summary.append(
+            {"fidelity": rung, "rows": int(len(X_rung)), "candidates": len(candidates)}
+        )
+
+        ranked = sorted(candidates, key=lambda trial: scores[trial.number])
+        keep = len(candidates) if last else max(1, math.ceil(len(candidates) / eta))
+        for trial in ranked[keep:]:
+            trial.report(scores[trial.number], step=level)
+            study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+        candidates = ranked[:keep]
+        if last:
+            for trial in candidates:
+                study.tell(trial, scores[trial.number])
+
+    for frozen in study.trials:
+        for callback in callbacks:
+            callback(study, frozen)
+    return summary
 
 
 def train_market(
@@ -195,7 +511,14 @@ def train_market(
     config: dict,
     args,
     target_columns: set[str],
+    transfer: dict | None = None,
 ) -> dict:
+    """Search, refit and save one market.
+
+    `transfer` ({"source", "params"}) seeds the study with another market's
+    best parameters: they are the first trial, the remaining trials sample a
+    narrowed space around them, and only --transfer-trials of --trials run.
+    """
     target = config["target"]
     market_type = config["type"]
     subset = df[df[target].notna()].copy()
@@ -211,52 +534,120 @@ def train_market(
     if train.empty or val.empty or test.empty:
         return {"market": market_key, "status": "skipped", "reason": "empty split"}
 
-    X_train = prepare_features(train, target_columns)
-    y_train = train[target]
-    X_val = prepare_features(val, target_columns)
-    y_val = val[target]
-    X_test = prepare_features(test, target_columns)
-    y_test = test[target]
+    with span("prepare") as stage:
+        X_train = prepare_features(train, target_columns)
+        y_train = train[target]
+        X_val = prepare_features(val, target_columns)
+        y_val = val[target]
+        X_test = prepare_features(test, target_columns)
+        y_test = test[target]
+        stage.rows = len(subset)
 
     verbosity = optuna.logging.INFO if args.verbose else optuna.logging.WARNING
     optuna.logging.set_verbosity(verbosity)
-    study = optuna.create_study(direction="minimize")
-    study.optimize(
-        lambda trial: objective(
-            trial, X_train, y_train, X_val, y_val, market_type
-        ),
-        n_trials=args.trials,
-        timeout=args.timeout,
-    )
+    search = None
+    pareto = None
+    space = None
+    n_trials = args.trials
+    if transfer is not None:
+        space = narrowed_space(transfer["params"], args.transfer_width)
+        n_trials = max(1, math.ceil(args.trials * args.transfer_trials))
+        seed = {name: transfer["params"][name] for name in space if name in transfer["params"]}
 
-    best_params = study.best_params
-    if market_type == "regression":
-        model = lgb.LGBMRegressor(**best_params)
-        model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
-        preds = model.predict(X_test)
-        metric = math.sqrt(mean_squared_error(y_test, preds))
-        metric_name = "rmse"
-    elif market_type == "multiclass":
-        model = lgb.LGBMClassifier(
-            objective="multiclass",
-            num_class=3,
-            **best_params,
-        )
-        model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
-        preds = model.predict_proba(X_test)
-        metric = log_loss(y_test, preds, labels=[0, 1, 2])
-        metric_name = "log_loss"
-    else:
-        model = lgb.LGBMClassifier(objective="binary", **best_params)
-        model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
-        preds = model.predict_proba(X_test)[:, 1]
-        metric = log_loss(y_test, preds)
-        metric_name = "log_loss"
+    def new_study(**kwargs):
+        study = optuna.create_study(**kwargs)
+        if transfer is not None:
+            study.enqueue_trial(seed)
+        return study
+
+    with span("optuna") as stage:
+        if args.cost is not None:
+            study = new_study(directions=["minimize", "minimize"])
+            study.optimize(
+                lambda trial: cost_objective(
+                    trial, X_train, y_train, X_val, y_val, market_type, args.cost, space
+                ),
+                n_trials=n_trials,
+                timeout=args.timeout,
+                callbacks=optuna_callbacks(market_key),
+            )
+            front = pareto_front(study)
+            budget = parse_budget(args.budget, market_key)
+            selected = select_pareto_point(front, args.cost, budget)
+            pareto = {
+                "cost": args.cost,
+                "budget": budget,
+                "selected": selected["number"],
+                "front": front,
+            }
+        elif args.search == "halving":
+            study = new_study(direction="minimize")
+            fidelity = config.get("fidelity", FIDELITY[market_type])
+            rungs = successive_halving(
+                study,
+                X_train,
+                y_train,
+                train["season"].to_numpy(),
+                X_val,
+                y_val,
+                market_type,
+                fidelity,
+                n_trials,
+                optuna_callbacks(market_key),
+                space,
+            )
+            search = {"mode": "halving", "eta": fidelity["eta"], "rungs": rungs}
+        else:
+            study = new_study(direction="minimize")
+            study.optimize(
+                lambda trial: objective(
+                    trial, X_train, y_train, X_val, y_val, market_type, space
+                ),
+                n_trials=n_trials,
+                timeout=args.timeout,
+                callbacks=optuna_callbacks(market_key),
+            )
+        stage.rows = len(X_train)
+        stage.meta["trials"] = len(study.trials)
+
+    best_params = (
+        study.trials[pareto["selected"]].params
+        if pareto is not None
+        else study.best_params
+    )
+    with span("refit") as stage:
+        if market_type == "regression":
+            model = lgb.LGBMRegressor(**best_params)
+            model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
+            preds = model.predict(X_test)
+            metric = math.sqrt(sk_metrics.mean_squared_error(y_test, preds))
+            metric_name = "rmse"
+        elif market_type == "multiclass":
+            model = lgb.LGBMClassifier(
+                objective="multiclass",
+                num_class=3,
+                **best_params,
+            )
+            model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
+            preds = model.predict_proba(X_test)
+            metric = sk_metrics.log_loss(y_test, preds, labels=[0, 1, 2])
+            metric_name = "log_loss"
+        else:
+            model = lgb.LGBMClassifier(objective="binary", **best_params)
+            model.fit(pd.concat([X_train, X_val]), pd.concat([y_train, y_val]))
+            preds = model.predict_proba(X_test)[:, 1]
+            metric = sk_metrics.log_loss(y_test, preds)
+            metric_name = "log_loss"
+        stage.rows = len(X_train) + len(X_val)
 
     output_dir = Path(args.out_dir) / market_key
     output_dir.mkdir(parents=True, exist_ok=True)
     joblib.dump(model, output_dir / "model.pkl")
 
+    write_drift_reference(
+        model, pd.concat([X_train, X_val]), pd.concat([train, val]), output_dir, market_key
+    )
+
     metrics = {
         "market": market_key,
         "target": target,
@@ -270,15 +661,348 @@ def train_market(
             "test": len(test),
         },
     }
+    if search is not None:
+        metrics["search"] = search
+    if transfer is not None:
+        metrics["transfer"] = {
+            "group": config["group"],
+            "source": transfer["source"],
+            "trials": len(study.trials),
+            "space": {name: [low, high] for name, (_, low, high) in space.items()},
+        }
+    if pareto is not None:
+        metrics["cost"] = model_cost(model.booster_, market_key)
+        metrics["pareto"] = pareto
     (output_dir / "metrics.json").write_text(json.dumps(metrics, indent=2))
     return metrics
 
 
+def write_drift_reference(
+    model, X_fit, fit: pd.DataFrame, output_dir: Path, market_key: str
+) -> None:
+    """Drift reference over the rows the final model was fit on."""
+    with span("drift_reference"):
+        reference = reference_histograms(model.booster_, X_fit)
+        reference["market"] = market_key
+        reference["seasons"] = [int(fit["season"].min()), int(fit["season"].max())]
+        (output_dir / "drift.json").write_text(json.dumps(reference))
+
+
+def update_market(
+    df: pd.DataFrame,
+    market_key: str,
+    config: dict,
+    args,
+    target_columns: set[str],
+) -> dict:
+    """Update an existing model on the extended data instead of re-searching.
+
+    `refit` keeps every tree and re-estimates leaf values (blended with the
+    old ones by --refit-decay); `boost` appends --update-trees trees fitted
+    from the current model's predictions. The update is fitted on every
+    labelled row from the first training season up to the latest matchday.
+
+    The gate uses a held-out slice: the last --update-holdout-days days of
+    results, never earlier than the rows the current model was fitted on
+    (`update.fit_until` in metrics.json, or the end of the validation season
+    after a full training). A candidate update fitted on the rows before the
+    slice is scored on it against the current model; past --update-threshold
+    (relative), the market falls back to a full Optuna search and refit.
+    Otherwise the update is repeated on all rows, slice included, and saved.
+    """
+    market_type = config["type"]
+    output_dir = Path(args.out_dir) / market_key
+    model_path = output_dir / "model.pkl"
+    metrics_path = output_dir / "metrics.json"
+    if not model_path.exists() or not metrics_path.exists():
+        print(f"⚠️  {market_key}: no model to update, running a full training")
+        return train_market(df, market_key, config, args, target_columns)
+
+    previous = json.loads(metrics_path.read_text())
+    model = joblib.load(model_path)
+    subset = market_labels(df, config["target"], market_type)
+    train, val, test = split_by_season(subset, args.train_end, args.val, args.test_start)
+    if train.empty or val.empty or test.empty:
+        return {"market": market_key, "status": "skipped", "reason": "empty split"}
+
+    previous_update = previous.get("update", {})
+    labelled = pd.concat([train, val, test])
+    dates = pd.to_datetime(labelled["date"]).dt.normalize()
+    fitted_until = pd.Timestamp(
+        previous_update.get("fit_until") or pd.to_datetime(val["date"]).max()
+    ).normalize()
+    latest = dates.max()
+    cutoff = max(latest - pd.Timedelta(days=args.update_holdout_days), fitted_until)
+    held_out = (dates > cutoff).to_numpy()
+    if not held_out.any():
+        return {
+            "market": market_key,
+            "status": "skipped",
+            "reason": f"no results after {fitted_until.date()}",
+        }
+
+    with span("prepare") as stage:
+        X_all = prepare_features(labelled, target_columns)
+        y_all = labelled[config["target"]]
+        stage.rows = len(labelled)
+    if list(X_all.columns) != model.booster_.feature_name():
+        print(f"⚠️  {market_key}: feature columns changed, running a full training")
+        return train_market(df, market_key, config, args, target_columns)
+
+    # Scores and size of the model the last full training produced; an update
+    # replaces that model, so its metrics are only kept under this label.
+    full_training = previous_update.get("full_training") or {
+        "value": previous.get("value"),
+        "rows": previous.get("rows"),
+        "iterations": model.booster_.current_iteration(),
+    }
+    boosted = model.booster_.current_iteration() - full_training["iterations"]
+    if args.update == "boost" and boosted + args.update_trees > args.max_update_trees:
+        print(
+            f"⚠️  {market_key}: boosting would exceed --max-update-trees "
+            f"({args.max_update_trees}) since the last full training, running a full training"
+        )
+        result = train_market(df, market_key, config, args, target_columns)
+        result["update"] = {"mode": args.update, "fallback": True, "reason": "tree cap"}
+        if "value" in result:
+            metrics_path.write_text(json.dumps(result, indent=2))
+        return result
+
+    def updated(X_fit: pd.DataFrame, y_fit: pd.Series):
+        if args.update == "refit":
+            # Booster.refit keeps the structure; the wrapper still needs the
+            # classes/feature metadata of the original fit, so swap the booster
+            # into a copy.
+            refit = copy.copy(model)
+            refit._Booster = model.booster_.refit(
+                X_fit,
+                y_fit,
+                decay_rate=args.refit_decay,
+                dataset_params={"verbose": -1},
+            )
+            return refit
+        params = {
+            **previous["best_params"],
+            "n_estimators": args.update_trees,
+            "verbose": -1,
+        }
+        return fit_model(params, X_fit, y_fit, market_type, init_model=model.booster_)
+
+    X_hold, y_hold = X_all[held_out], y_all[held_out]
+    with span(f"update_{args.update}_holdout") as stage:
+        candidate = updated(X_all[~held_out], y_all[~held_out])
+        stage.rows = int((~held_out).sum())
+    before = holdout_loss(model, X_hold, y_hold, market_type)
+    after = holdout_loss(candidate, X_hold, y_hold, market_type)
+
+    if after > before * (1 + args.update_threshold):
+        print(
+            f"⚠️  {market_key}: updated holdout loss {after:.4f} exceeds the current "
+            f"model's {before:.4f} by more than {args.update_threshold:.0%}, "
+            "running a full training"
+        )
+        result = train_market(df, market_key, config, args, target_columns)
+        result["update"] = {
+            "mode": args.update,
+            "fallback": True,
+            "reason": "holdout loss",
+            "holdout_rows": int(held_out.sum()),
+            "before": float(before),
+            "rejected": float(after),
+        }
+        if "value" in result:
+            metrics_path.write_text(json.dumps(result, indent=2))
+        return result
+
+    iterations_before = model.booster_.current_iteration()
+    with span(f"update_{args.update}") as stage:
+        model = updated(X_all, y_all)
+        stage.rows = len(X_all)
+
+    joblib.dump(model, model_path)
+    write_drift_reference(model, X_all, labelled, output_dir, market_key)
+    # The test-season `value` and `rows` described the replaced model (and the
+    # update is fitted on those rows); they live on in update.full_training.
+    metrics = {
+        **{key: value for key, value in previous.items() if key not in ("value", "rows")},
+        "update": {
+            "mode": args.update,
+            "fallback": False,
+            "fit_until": str(latest.date()),
+            "rows": len(labelled),
+            "holdout": {
+                "from": str((cutoff + pd.Timedelta(days=1)).date()),
+                "rows": int(held_out.sum()),
+                "before": float(before),
+                "after": float(after),
+            },
+            "iterations_added": model.booster_.current_iteration() - iterations_before,
+            "updates": previous_update.get("updates", 0) + 1,
+            "full_training": full_training,
+        },
+    }
+    metrics_path.write_text(json.dumps(metrics, indent=2))
+    if (output_dir / "calibration.json").exists():
+        print(f"⚠️  {market_key}: calibration.json predates this update; re-run fit-calibration")
+    return metrics
+
+
+def holdout_loss(model, X: pd.DataFrame, y: pd.Series, market_type: str) -> float:
+    """Loss on rows that may not contain every class."""
+    if market_type == "regression":
+        return score_predictions(y.to_numpy(), model.predict(X), market_type)
+    preds = model.predict_proba(X)
+    if market_type == "binary":
+        preds = preds[:, 1]
+    return score_predictions(y.to_numpy(), preds, market_type)
+
+
+def market_labels(subset: pd.DataFrame, target: str, market_type: str) -> pd.DataFrame:
+    subset = subset[subset[target].notna()].copy()
+    if market_type == "multiclass":
+        subset = subset[subset[target].isin(["HOME", "DRAW", "AWAY"])]
+        label_map = {"HOME": 0, "DRAW": 1, "AWAY": 2}
+        subset[target] = subset[target].map(label_map)
+    return subset
+
+
+def native_params(params: dict, market_type: str, num_threads: int) -> dict:
+    """Translate sklearn-style best_params for lgb.train (aliases are accepted)."""
+    native = {**params, "verbose": -1, "num_threads": num_threads}
+    if market_type == "regression":
+        native["objective"] = "regression"
+    elif market_type == "multiclass":
+        native.update(objective="multiclass", num_class=3)
+    else:
+        native["objective"] = "binary"
+    return native
+
+
+def score_predictions(y_true: np.ndarray, preds: np.ndarray, market_type: str) -> float:
+    if market_type == "regression":
+        return math.sqrt(sk_metrics.mean_squared_error(y_true, preds))
+    if market_type == "multiclass":
+        return sk_metrics.log_loss(y_true, preds, labels=[0, 1, 2])
+    return sk_metrics.log_loss(y_true, preds, labels=[0, 1])
+
+
+def walk_forward_market(
+    df: pd.DataFrame,
+    market_key: str,
+    config: dict,
+    args,
+    target_columns: set[str],
+) -> dict:
+    """Train/evaluate one market for every season cutoff.
+
+    The market's rows are binned once into a single lgb.Dataset; each fold
+    trains on a row subset of it (seasons before the test season), so bin
+    mappers are shared and nothing is re-binned. Folds train in threads
+    (LightGBM releases the GIL), splitting the cores between them.
+    """
+    target = config["target"]
+    market_type = config["type"]
+    subset = market_labels(df, target, market_type)
+    seasons = subset["season"].to_numpy()
+    all_seasons = sorted(np.unique(seasons))
+    if len(all_seasons) < 2:
+        return {"market": market_key, "status": "skipped", "reason": "too few seasons"}
+
+    start = args.wf_start if args.wf_start is not None else all_seasons[min(2, len(all_seasons) - 1)]
+    end = args.wf_end if args.wf_end is not None else all_seasons[-1]
+    test_seasons = [s for s in all_seasons if start <= s <= end and (seasons < s).any()]
+    if not test_seasons:
+        return {"market": market_key, "status": "skipped", "reason": "no folds"}
+
+    metrics_path = Path(args.out_dir) / market_key / "metrics.json"
+    params = (
+        json.loads(metrics_path.read_text()).get("best_params", {})
+        if metrics_path.exists()
+        else {}
+    )
+
+    X_all = prepare_features(subset, target_columns)
+    y_all = subset[target].to_numpy()
+    workers = max(1, min(args.workers, len(test_seasons)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    train_params = native_params(params, market_type, threads)
+
+    with span("bin") as stage:
+        full = lgb.Dataset(
+            X_all,
+            label=y_all,
+            params={"verbose": -1, "feature_pre_filter": False},
+            free_raw_data=False,
+        ).construct()
+        stage.rows = len(X_all)
+
+    folds = []
+    for season in test_seasons:
+        train_idx = np.flatnonzero(seasons < season)
+        test_idx = np.flatnonzero(seasons == season)
+        folds.append((season, full.subset(train_idx).construct(), test_idx, len(train_idx)))
+
+    X_values = X_all.to_numpy(dtype=np.float64)
+
+    def run_fold(fold) -> dict:
+        season, train_set, test_idx, train_rows = fold
+        booster = lgb.train(train_params, train_set, num_boost_round=100)
+        preds = booster.predict(X_values[test_idx])
+        return {
+            "test_season": int(season),
+            "value": float(score_predictions(y_all[test_idx], preds, market_type)),
+            "rows": {"train": int(train_rows), "test": int(len(test_idx))},
+        }
+
+    with span("folds", folds=len(folds), workers=workers):
+        if workers == 1:
+            fold_metrics = [run_fold(fold) for fold in folds]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fold_metrics = list(pool.map(run_fold, folds))
+
+    values = np.array([fold["value"] for fold in fold_metrics])
+    weights = np.array([fold["rows"]["test"] for fold in fold_metrics])
+    result = {
+        "market": market_key,
+        "target": target,
+        "type": market_type,
+        "metric": "rmse" if market_type == "regression" else "log_loss",
+        "params": params,
+        "folds": fold_metrics,
+        "aggregate": {
+            "folds": len(fold_metrics),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "weighted_mean": float(np.average(values, weights=weights)),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        },
+    }
+    output_dir = Path(args.out_dir) / market_key
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "walk_forward.json").write_text(json.dumps(result, indent=2))
+    return result
+
+
 def main() -> None:
     args = parse_args()
+    with run_report("train-markets", args):
+        train_markets(args)
+
+
+def train_markets(args: argparse.Namespace) -> None:
+    if args.cost is not None and args.search == "halving":
+        raise SystemExit("--cost cannot be combined with --search halving.")
+    if args.update and args.walk_forward:
+        raise SystemExit("--update cannot be combined with --walk-forward.")
+    if args.transfer and (args.update or args.walk_forward):
+        raise SystemExit("--transfer cannot be combined with --update or --walk-forward.")
     add_range_markets()
 
-    df = pd.read_csv(args.input)
+    with span("load") as stage:
+        df = load_table(args.input, args.feature_store)
+        stage.rows = len(df)
     target_columns = {config["target"] for config in MARKETS.values()}
     requested = (
         list(MARKETS.keys())
@@ -286,18 +1010,45 @@ def main() -> None:
         else [m.strip() for m in args.markets.split(",") if m.strip()]
     )
 
+    tuned = {}  # group -> {"source", "params"} of its first tuned market
+    if args.transfer:
+        requested = transfer_order(requested)
+        # A representative outside this run seeds its group from its last training.
+        for group, source in TRANSFER_GROUPS.items():
+            metrics_path = Path(args.out_dir) / source / "metrics.json"
+            if source not in requested and metrics_path.exists():
+                params = json.loads(metrics_path.read_text()).get("best_params")
+                if params:
+                    tuned[group] = {"source": source, "params": params}
+
     summary = []
     for market_key in requested:
         config = MARKETS.get(market_key)
         if not config:
             summary.append({"market": market_key, "status": "skipped", "reason": "unknown"})
             continue
-        summary.append(train_market(df, market_key, config, args, target_columns))
+        with span(f"market:{market_key}"):
+            if args.walk_forward:
+                result = walk_forward_market(df, market_key, config, args, target_columns)
+            elif args.update:
+                result = update_market(df, market_key, config, args, target_columns)
+            else:
+                # The representative runs first; if it is skipped, the next
+                # market of the group to train becomes the source instead.
+                group = config.get("group") if args.transfer else None
+                result = train_market(
+                    df, market_key, config, args, target_columns, transfer=tuned.get(group)
+                )
+                if group is not None and group not in tuned and "best_params" in result:
+                    tuned[group] = {"source": market_key, "params": result["best_params"]}
+        count("markets_skipped" if result.get("status") == "skipped" else "markets_trained", 1)
+        summary.append(result)
 
     output_dir = Path(args.out_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    (output_dir / "summary.json").write_text(json.dumps(summary, indent=2))
-    print(f"✅ Training complete. Summary at {output_dir / 'summary.json'}")
+    summary_name = "walk_forward_summary.json" if args.walk_forward else "summary.json"
+    (output_dir / summary_name).write_text(json.dumps(summary, indent=2))
+    print(f"✅ Training complete. Summary at {output_dir / summary_name}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,288 @@
+"""
+Head-to-head features for create-targets.py.
+
+Lives in its own module so process-pool workers can import
+`compute_h2h_rows` by name under every multiprocessing start method
+(spawn/forkserver children cannot resolve functions defined in a script
+that was loaded by path, e.g. through `python -m ml targets`).
+"""
+
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class H2HMatch:
+    date: pd.Timestamp
+    home_team: str
+    away_team: str
+    home_goals: int
+    away_goals: int
+
+
+def build_pair_key(home_team: str, away_team: str) -> str:
+    return "__".join(sorted([home_team, away_team]))
+
+
+def compute_h2h_stats(
+    matches: list[H2HMatch],
+    current_home: str,
+    current_away: str,
+    current_date: pd.Timestamp,
+    max_matches: int = 5,
+    venue_only: bool = False,
+) -> dict[str, float | int | None]:
+    if not matches:
+        return {
+            "matches": 0,
+            "home_win_pct": None,
+            "away_win_pct": None,
+            "draw_pct": None,
+            "avg_goals": None,
+            "btts_pct": None,
+            "over_2_5_pct": None,
+        }
+
+    dates = [m.date for m in matches]
+    cutoff = bisect_left(dates, current_date)
+    if cutoff <= 0:
+        return {
+            "matches": 0,
+            "home_win_pct": None,
+            "away_win_pct": None,
+            "draw_pct": None,
+            "avg_goals": None,
+            "btts_pct": None,
+            "over_2_5_pct": None,
+        }
+
+    if venue_only:
+        selected: list[H2HMatch] = []
+        for idx in range(cutoff - 1, -1, -1):
+            match = matches[idx]
+            if match.home_team == current_home and match.away_team == current_away:
+                selected.append(match)
+                if len(selected) >= max_matches:
+                    break
+        selected = list(reversed(selected))
+    else:
+        selected = matches[:cutoff][-max_matches:]
+
+    if not selected:
+        return {
+            "matches": 0,
+            "home_win_pct": None,
+            "away_win_pct": None,
+            "draw_pct": None,
+            "avg_goals": None,
+            "btts_pct": None,
+            "over_2_5_pct": None,
+        }
+
+    home_wins = 0
+    away_wins = 0
+    draws = 0
+    total_goals = 0
+    btts = 0
+    over_2_5 = 0
+
+    for match in selected:
+        if match.home_team == current_home:
+            home_goals = match.home_goals
+            away_goals = match.away_goals
+        else:
+            home_goals = match.away_goals
+            away_goals = match.home_goals
+
+        if home_goals > away_goals:
+            home_wins += 1
+        elif away_goals > home_goals:
+            away_wins += 1
+        else:
+            draws += 1
+
+        total = home_goals + away_goals
+        total_goals += total
+        if home_goals > 0 and away_goals > 0:
+            btts += 1
+        if total > 2.5:
+            over_2_5 += 1
+
+    count = len(selected)
+    return {
+        "matches": count,
+        "home_win_pct": (home_wins / count) * 100,
+        "away_win_pct": (away_wins / count) * 100,
+        "draw_pct": (draws / count) * 100,
+        "avg_goals": total_goals / count,
+        "btts_pct": (btts / count) * 100,
+        "over_2_5_pct": (over_2_5 / count) * 100,
+    }
+
+
+def build_pair_map(h2h_source: pd.DataFrame) -> dict[str, list[H2HMatch]]:
+    pair_map: dict[str, list[H2HMatch]] = {}
+    for row in h2h_source.itertuples(index=False):
+        if pd.isna(row.FTHome) or pd.isna(row.FTAway):
+            continue
+        key = build_pair_key(row.homeTeam, row.awayTeam)
+        match = H2HMatch(
+            date=row.date,
+            home_team=row.homeTeam,
+            away_team=row.awayTeam,
+            home_goals=int(row.FTHome),
+            away_goals=int(row.FTAway),
+        )
+        pair_map.setdefault(key, []).append(match)
+
+    for key, matches in pair_map.items():
+        matches.sort(key=lambda m: m.date)
+    return pair_map
+
+
+def compute_h2h_rows(
+    h2h_source: pd.DataFrame, rows: pd.DataFrame
+) -> tuple[list[dict], list[dict]]:
+    pair_map = build_pair_map(h2h_source)
+    h2h_overall = []
+    h2h_venue = []
+    for row in rows[["date", "homeTeam", "awayTeam"]].itertuples(index=False):
+        current_date = pd.to_datetime(row.date)
+        key = build_pair_key(row.homeTeam, row.awayTeam)
+        matches = pair_map.get(key, [])
+        overall_stats = compute_h2h_stats(
+            matches,
+            row.homeTeam,
+            row.awayTeam,
+            current_date,
+            max_matches=5,
+            venue_only=False,
+        )
+        venue_stats = compute_h2h_stats(
+            matches,
+            row.homeTeam,
+            row.awayTeam,
+            current_date,
+            max_matches=5,
+            venue_only=True,
+        )
+        h2h_overall.append(overall_stats)
+        h2h_venue.append(venue_stats)
+    return h2h_overall, h2h_venue
+
+
+def pair_keys(home: pd.Series, away: pd.Series) -> pd.Series:
+    home = home.astype(str)
+    away = away.astype(str)
+    ordered = home <= away
+    first = home.where(ordered, away)
+    second = away.where(ordered, home)
+    return first + "__" + second
+
+
+def group_leagues(h2h_source: pd.DataFrame, rows: pd.DataFrame) -> dict:
+    """Map each leagueId to a shard group id.
+
+    Leagues are merged into one group whenever any pair of teams appears in
+    both of them, so every pair's full history always lands in one shard.
+    """
+    keyed = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "league": h2h_source["leagueId"].fillna(-1),
+                    "key": pair_keys(h2h_source["homeTeam"], h2h_source["awayTeam"]),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "league": rows["leagueId"].fillna(-1),
+                    "key": pair_keys(rows["homeTeam"], rows["awayTeam"]),
+                }
+            ),
+        ],
+        ignore_index=True,
+    ).drop_duplicates()
+
+    parent: dict = {league: league for league in keyed["league"].unique()}
+
+    def find(league):
+        while parent[league] != league:
+            parent[league] = parent[parent[league]]
+            league = parent[league]
+        return league
+
+    shared = keyed.groupby("key")["league"].agg(list)
+    for leagues in shared[shared.map(len) > 1]:
+        root = find(leagues[0])
+        for league in leagues[1:]:
+            other = find(league)
+            if other != root:
+                parent[other] = root
+
+    return {league: find(league) for league in parent}
+
+
+def plan_h2h_shards(
+    h2h_source: pd.DataFrame, rows: pd.DataFrame, season_chunk: int
+) -> list[tuple[pd.DataFrame, pd.DataFrame]]:
+    """Split H2H work into independent (history, rows) shards.
+
+    Each shard holds the feature rows of one league group (optionally one
+    range of `season_chunk` seasons) plus that group's raw history up to the
+    last row date, which is all `compute_h2h_stats` can look at.
+    """
+    groups = group_leagues(h2h_source, rows)
+    source_group = h2h_source["leagueId"].fillna(-1).map(groups)
+    row_group = rows["leagueId"].fillna(-1).map(groups)
+    row_dates = pd.to_datetime(rows["date"])
+
+    shards = []
+    for group in sorted(row_group.unique()):
+        group_rows = rows[row_group == group]
+        group_source = h2h_source[source_group == group]
+        if season_chunk <= 0:
+            shards.append((group_source, group_rows))
+            continue
+
+        seasons = sorted(group_rows["season"].dropna().unique())
+        chunks = [
+            group_rows["season"].isin(seasons[start : start + season_chunk])
+            for start in range(0, len(seasons), season_chunk)
+        ]
+        chunks.append(group_rows["season"].isna())
+        for mask in chunks:
+            chunk_rows = group_rows[mask]
+            if chunk_rows.empty:
+                continue
+            last_date = row_dates.loc[chunk_rows.index].max()
+            shards.append(
+                (group_source[group_source["date"] <= last_date], chunk_rows)
+            )
+    return shards
+
+
+def compute_h2h_sharded(
+    h2h_source: pd.DataFrame, rows: pd.DataFrame, workers: int, season_chunk: int
+) -> tuple[list[dict], list[dict]]:
+    rows = rows.reset_index(drop=True)
+    shards = plan_h2h_shards(h2h_source, rows, season_chunk)
+    # Largest shards first so the pool does not idle on a long tail.
+    shards.sort(key=lambda shard: len(shard[1]), reverse=True)
+
+    h2h_overall: list[dict | None] = [None] * len(rows)
+    h2h_venue: list[dict | None] = [None] * len(rows)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (shard_rows.index, pool.submit(compute_h2h_rows, shard_source, shard_rows))
+            for shard_source, shard_rows in shards
+        ]
+        for positions, future in futures:
+            overall, venue = future.result()
+            for position, overall_stats, venue_stats in zip(positions, overall, venue):
+                h2h_overall[position] = overall_stats
+                h2h_venue[position] = venue_stats
+    return h2h_overall, h2h_venue